@@ -0,0 +1,103 @@
+import asyncio
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+from graphql import GraphQLError
+
+_OVERFLOW = object()
+
+
+class BaseBroker:
+    """
+    Publish/subscribe backend for GraphQL subscriptions. Channels are
+    namespaced per organization (see api.subscriptions), so a subscriber
+    only ever receives events of its own tenant.
+    """
+
+    def publish_many(self, messages):
+        """Publish (channel, event) pairs; may be called from any thread"""
+        raise NotImplementedError
+
+    def subscribe(self, channel):
+        """Return an async iterator over the events published on ``channel``"""
+        raise NotImplementedError
+
+
+class Subscriber:
+    """Bounded event queue of one subscription, owned by an event loop"""
+
+    def __init__(self, loop, queue_size):
+        self.loop = loop
+        self.queue = asyncio.Queue()
+        self.queue_size = queue_size
+        self.overflowed = False
+
+    def put_many(self, events):
+        for event in events:
+            if self.overflowed:
+                return
+            if self.queue.qsize() >= self.queue_size:
+                self.overflowed = True
+                event = _OVERFLOW
+            self.queue.put_nowait(event)
+
+
+class InMemoryBroker(BaseBroker):
+    """
+    Process-local broker. Mutations publish from worker threads, so events
+    are handed to each subscriber on its own event loop. A subscriber that
+    falls QUEUE_SIZE events behind is ended with an error rather than
+    buffering without bound.
+    """
+
+    def __init__(self, queue_size=1000):
+        self.queue_size = queue_size
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publish_many(self, messages):
+        deliveries = defaultdict(list)
+        with self._lock:
+            for channel, event in messages:
+                for subscriber in self._subscribers.get(channel, ()):
+                    deliveries[subscriber].append(event)
+        for subscriber, events in deliveries.items():
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.put_many, events)
+            except RuntimeError:
+                # The subscriber's event loop has been closed
+                pass
+
+    async def subscribe(self, channel):
+        subscriber = Subscriber(asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            self._subscribers[channel].add(subscriber)
+        try:
+            while True:
+                event = await subscriber.queue.get()
+                if event is _OVERFLOW:
+                    raise GraphQLError("Subscription fell behind, refetch and subscribe again")
+                yield event
+        finally:
+            with self._lock:
+                subscribers = self._subscribers.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscriber)
+                    if not subscribers:
+                        del self._subscribers[channel]
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            options = getattr(settings, 'GRAPHQL_SUBSCRIPTIONS', {})
+            broker_class = import_string(options.get('BROKER', 'api.broker.InMemoryBroker'))
+            _broker = broker_class(queue_size=options.get('QUEUE_SIZE', 1000))
+    return _broker
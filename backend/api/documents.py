@@ -0,0 +1,132 @@
+import hashlib
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from graphene_django.settings import graphene_settings
+from graphql import parse, print_ast
+from graphql.validation import validate
+
+from core.cache import LRUCache
+
+from .query_cost import operation_cost
+
+
+def query_hash(query):
+    return hashlib.sha256(query.encode()).hexdigest()
+
+
+class ParsedDocument:
+    """A parsed query with its validation errors, normalized text and costs"""
+
+    def __init__(self, document=None, errors=None):
+        self.document = document
+        self.errors = errors or []
+        self._normalized = None
+        self._costs = {}
+
+    @property
+    def normalized(self):
+        if self._normalized is None:
+            self._normalized = print_ast(self.document)
+        return self._normalized
+
+    def cost(self, schema, operation):
+        """Return the (cost, depth) of one of the document's operations"""
+        name = operation.name.value if operation.name else None
+        if name not in self._costs:
+            self._costs[name] = operation_cost(schema, self.document, operation)
+        return self._costs[name]
+
+
+class DocumentCache:
+    """
+    Bounded LRU of parsed and validated documents keyed by the SHA-256 of
+    the query text. Validation only depends on the schema and the
+    document, so a hit skips both steps.
+    """
+
+    def __init__(self, max_size):
+        self.entries = LRUCache(max_size=max_size)
+
+    def get(self, schema, query, validation_rules=None):
+        key = query_hash(query)
+        parsed = self.entries.get(key)
+        if parsed is None:
+            parsed = self.parse_and_validate(schema, query, validation_rules)
+            self.entries.set(key, parsed)
+        return parsed
+
+    @staticmethod
+    def parse_and_validate(schema, query, validation_rules=None):
+        try:
+            document = parse(query)
+        except Exception as e:
+            return ParsedDocument(errors=[e])
+        errors = validate(
+            schema,
+            document,
+            validation_rules,
+            graphene_settings.MAX_VALIDATION_ERRORS,
+        )
+        return ParsedDocument(document, errors)
+
+
+class PersistedQueryStore:
+    """
+    sha256 -> query text registry for automatic persisted queries. Queries
+    are kept in a process-local LRU and, when ALIAS names a Django cache,
+    in that shared cache so every worker can serve a hash registered by
+    another one.
+    """
+
+    key_prefix = 'graphql:persisted:'
+
+    def __init__(self, max_size, alias=None):
+        self.local = LRUCache(max_size=max_size)
+        self.alias = alias
+
+    @property
+    def shared(self):
+        return caches[self.alias] if self.alias else None
+
+    def get(self, sha256):
+        query = self.local.get(sha256)
+        if query is None and self.shared is not None:
+            query = self.shared.get(self.key_prefix + sha256)
+            if query is not None:
+                self.local.set(sha256, query)
+        return query
+
+    def register(self, sha256, query):
+        if query_hash(query) != sha256:
+            return False
+        self.local.set(sha256, query)
+        if self.shared is not None:
+            self.shared.set(self.key_prefix + sha256, query, None)
+        return True
+
+
+_document_cache = None
+_persisted_queries = None
+_lock = threading.Lock()
+
+
+def get_document_cache():
+    global _document_cache
+    with _lock:
+        if _document_cache is None:
+            options = getattr(settings, 'GRAPHQL_DOCUMENT_CACHE', {})
+            _document_cache = DocumentCache(options.get('MAX_SIZE', 500))
+    return _document_cache
+
+
+def get_persisted_queries():
+    global _persisted_queries
+    with _lock:
+        if _persisted_queries is None:
+            options = getattr(settings, 'GRAPHQL_PERSISTED_QUERIES', {})
+            _persisted_queries = PersistedQueryStore(
+                options.get('MAX_SIZE', 1000), options.get('ALIAS')
+            )
+    return _persisted_queries
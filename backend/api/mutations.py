@@ -1,5 +1,14 @@
 import graphene
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+from core import counters, search
+from core.cache import get_organization
 from core.models import Organization, Project, Task, TaskComment
+from .response_cache import ORGANIZATIONS_TAG, invalidate
+from .subscriptions import (
+    TASK_CREATED, TASK_DELETED, TASK_UPDATED, comment_event, publish, task_event,
+)
 from .types import OrganizationType, ProjectType, TaskType, TaskCommentType
 
 
@@ -18,6 +27,7 @@ class CreateOrganization(graphene.Mutation):
                 name=name,
                 contact_email=contact_email
             )
+            invalidate(tags=[ORGANIZATIONS_TAG])
             return CreateOrganization(
                 organization=organization,
                 success=True,
@@ -45,7 +55,7 @@ class CreateProject(graphene.Mutation):
     
     def mutate(self, info, organization_slug, name, description=None, status='ACTIVE', due_date=None):
         try:
-            organization = Organization.objects.get(slug=organization_slug)
+            organization = get_organization(organization_slug, info.context)
             project = Project.objects.create(
                 organization=organization,
                 name=name,
@@ -53,6 +63,7 @@ class CreateProject(graphene.Mutation):
                 status=status,
                 due_date=due_date
             )
+            invalidate(organization_ids=[organization.pk])
             return CreateProject(
                 project=project,
                 success=True,
@@ -98,6 +109,7 @@ class UpdateProject(graphene.Mutation):
                 project.due_date = due_date
             
             project.save()
+            invalidate(organization_ids=[project.organization_id], project_ids=[project.pk])
             
             return UpdateProject(
                 project=project,
@@ -134,14 +146,20 @@ class CreateTask(graphene.Mutation):
     def mutate(self, info, project_id, title, description=None, status='TODO', assignee_email=None, due_date=None):
         try:
             project = Project.objects.get(id=project_id)
-            task = Task.objects.create(
-                project=project,
-                title=title,
-                description=description or '',
-                status=status,
-                assignee_email=assignee_email or '',
-                due_date=due_date
-            )
+            with transaction.atomic():
+                task = Task.objects.create(
+                    organization_id=project.organization_id,
+                    project=project,
+                    title=title,
+                    description=description or '',
+                    status=status,
+                    assignee_email=assignee_email or '',
+                    due_date=due_date
+                )
+                invalidate(organization_ids=[project.organization_id], project_ids=[project.pk])
+                publish([
+                    task_event(TASK_CREATED, project.organization_id, project.pk, task.pk, task)
+                ])
             return CreateTask(
                 task=task,
                 success=True,
@@ -176,20 +194,33 @@ class UpdateTask(graphene.Mutation):
     
     def mutate(self, info, id, title=None, description=None, status=None, assignee_email=None, due_date=None):
         try:
-            task = Task.objects.get(id=id)
-            
-            if title:
-                task.title = title
-            if description is not None:
-                task.description = description
-            if status:
-                task.status = status
-            if assignee_email is not None:
-                task.assignee_email = assignee_email
-            if due_date is not None:
-                task.due_date = due_date
-            
-            task.save()
+            with transaction.atomic():
+                task = (
+                    Task.objects.select_for_update(of=('self',))
+                    .select_related('project')
+                    .get(id=id)
+                )
+                
+                if title:
+                    task.title = title
+                if description is not None:
+                    task.description = description
+                if status:
+                    task.status = status
+                if assignee_email is not None:
+                    task.assignee_email = assignee_email
+                if due_date is not None:
+                    task.due_date = due_date
+                
+                task.save()
+                invalidate(
+                    organization_ids=[task.organization_id],
+                    project_ids=[task.project_id],
+                    task_ids=[task.pk]
+                )
+                publish([task_event(
+                    TASK_UPDATED, task.organization_id, task.project_id, task.pk, task
+                )])
             
             return UpdateTask(
                 task=task,
@@ -224,10 +255,17 @@ class CreateTaskComment(graphene.Mutation):
         try:
             task = Task.objects.get(id=task_id)
             comment = TaskComment.objects.create(
+                organization_id=task.organization_id,
                 task=task,
                 content=content,
                 author_email=author_email
             )
+            invalidate(
+                organization_ids=[task.organization_id],
+                project_ids=[task.project_id],
+                task_ids=[task.pk]
+            )
+            publish([comment_event(task.organization_id, comment)])
             return CreateTaskComment(
                 comment=comment,
                 success=True,
@@ -256,9 +294,11 @@ class DeleteProject(graphene.Mutation):
     
     def mutate(self, info, id):
         try:
-            project = Project.objects.get(id=id)
-            project_name = project.name
-            project.delete()
+            with transaction.atomic():
+                project = Project.objects.select_for_update().get(id=id)
+                project_name = project.name
+                invalidate(organization_ids=[project.organization_id], project_ids=[project.pk])
+                project.delete()
             return DeleteProject(
                 success=True,
                 message=f"Project '{project_name}' deleted successfully"
@@ -284,9 +324,22 @@ class DeleteTask(graphene.Mutation):
     
     def mutate(self, info, id):
         try:
-            task = Task.objects.get(id=id)
-            task_title = task.title
-            task.delete()
+            with transaction.atomic():
+                task = (
+                    Task.objects.select_for_update(of=('self',))
+                    .select_related('project')
+                    .get(id=id)
+                )
+                task_title = task.title
+                invalidate(
+                    organization_ids=[task.organization_id],
+                    project_ids=[task.project_id],
+                    task_ids=[task.pk]
+                )
+                publish([task_event(
+                    TASK_DELETED, task.organization_id, task.project_id, task.pk
+                )])
+                task.delete()
             return DeleteTask(
                 success=True,
                 message=f"Task '{task_title}' deleted successfully"
@@ -303,6 +356,305 @@ class DeleteTask(graphene.Mutation):
             )
 
 
+MAX_BULK_TASKS = 10000
+BULK_BATCH_SIZE = 1000
+
+
+class TaskInput(graphene.InputObjectType):
+    title = graphene.String(required=True)
+    description = graphene.String()
+    status = graphene.String()
+    assignee_email = graphene.String()
+    due_date = graphene.DateTime()
+
+
+class TaskUpdateInput(graphene.InputObjectType):
+    id = graphene.Int(required=True)
+    title = graphene.String()
+    description = graphene.String()
+    status = graphene.String()
+    assignee_email = graphene.String()
+    due_date = graphene.DateTime()
+
+
+class BulkTaskResult(graphene.ObjectType):
+    index = graphene.Int()
+    id = graphene.Int()
+    task = graphene.Field(TaskType)
+    success = graphene.Boolean()
+    message = graphene.String()
+
+
+def validate_task(task):
+    """Return a validation message for ``task``, or None when it is valid"""
+    try:
+        # The project and organization are checked once for the whole batch
+        task.clean_fields(exclude=['project', 'organization'])
+    except ValidationError as e:
+        return '; '.join(
+            f"{field}: {' '.join(messages)}" for field, messages in e.message_dict.items()
+        )
+    return None
+
+
+def check_batch_size(items):
+    if len(items) > MAX_BULK_TASKS:
+        return f"At most {MAX_BULK_TASKS} tasks can be processed per call"
+    return None
+
+
+class BulkCreateTasks(graphene.Mutation):
+    """
+    Create many tasks in one project with a single project lookup and
+    batched INSERTs. Invalid items are reported and skipped; the valid ones
+    are inserted in one transaction.
+    """
+    class Arguments:
+        project_id = graphene.Int(required=True)
+        tasks = graphene.List(graphene.NonNull(TaskInput), required=True)
+    
+    results = graphene.List(BulkTaskResult)
+    created_count = graphene.Int()
+    success = graphene.Boolean()
+    message = graphene.String()
+    
+    def mutate(self, info, project_id, tasks):
+        error = check_batch_size(tasks)
+        if error:
+            return BulkCreateTasks(results=[], created_count=0, success=False, message=error)
+        try:
+            project = Project.objects.get(id=project_id)
+            
+            results = []
+            new_tasks = []
+            for index, data in enumerate(tasks):
+                task = Task(
+                    organization_id=project.organization_id,
+                    project=project,
+                    title=data.title,
+                    description=data.description or '',
+                    status=data.status or 'TODO',
+                    assignee_email=data.assignee_email or '',
+                    due_date=data.due_date
+                )
+                error = validate_task(task)
+                if error:
+                    results.append(BulkTaskResult(index=index, success=False, message=error))
+                else:
+                    new_tasks.append((index, task))
+            
+            with transaction.atomic():
+                Task.objects.bulk_create(
+                    [task for _, task in new_tasks], batch_size=BULK_BATCH_SIZE
+                )
+                search.index(task for _, task in new_tasks)
+                counters.apply_batch(
+                    (project.pk, project.organization_id, counters.task_deltas(task.status))
+                    for _, task in new_tasks
+                )
+                invalidate(organization_ids=[project.organization_id], project_ids=[project.pk])
+                publish(
+                    task_event(TASK_CREATED, project.organization_id, project.pk, task.pk, task)
+                    for _, task in new_tasks
+                )
+            
+            results.extend(
+                BulkTaskResult(
+                    index=index, id=task.pk, task=task, success=True,
+                    message="Task created successfully"
+                )
+                for index, task in new_tasks
+            )
+            results.sort(key=lambda result: result.index)
+            return BulkCreateTasks(
+                results=results,
+                created_count=len(new_tasks),
+                success=True,
+                message=f"Created {len(new_tasks)} of {len(tasks)} tasks"
+            )
+        except Project.DoesNotExist:
+            return BulkCreateTasks(
+                results=[], created_count=0, success=False, message="Project not found"
+            )
+        except Exception as e:
+            return BulkCreateTasks(results=[], created_count=0, success=False, message=str(e))
+
+
+class BulkUpdateTasks(graphene.Mutation):
+    """
+    Update many tasks with one locking SELECT and batched UPDATEs in a
+    single transaction. Unknown, duplicate or invalid items are reported
+    and skipped.
+    """
+    class Arguments:
+        tasks = graphene.List(graphene.NonNull(TaskUpdateInput), required=True)
+    
+    results = graphene.List(BulkTaskResult)
+    updated_count = graphene.Int()
+    success = graphene.Boolean()
+    message = graphene.String()
+    
+    def mutate(self, info, tasks):
+        error = check_batch_size(tasks)
+        if error:
+            return BulkUpdateTasks(results=[], updated_count=0, success=False, message=error)
+        try:
+            with transaction.atomic():
+                existing = (
+                    Task.objects.select_for_update(of=('self',))
+                    .in_bulk([data.id for data in tasks])
+                )
+                
+                results = []
+                changed = []
+                fields = {'updated_at'}
+                counter_changes = []
+                seen = set()
+                now = timezone.now()
+                for index, data in enumerate(tasks):
+                    task = existing.get(data.id)
+                    if task is None or data.id in seen:
+                        message = "Task not found" if task is None else "Duplicate task id"
+                        results.append(BulkTaskResult(
+                            index=index, id=data.id, success=False, message=message
+                        ))
+                        continue
+                    seen.add(data.id)
+                    old_status = task.status
+                    
+                    if data.title:
+                        task.title = data.title
+                        fields.add('title')
+                    if data.description is not None:
+                        task.description = data.description
+                        fields.add('description')
+                    if data.status:
+                        task.status = data.status
+                        fields.add('status')
+                    if data.assignee_email is not None:
+                        task.assignee_email = data.assignee_email
+                        fields.add('assignee_email')
+                    if data.due_date is not None:
+                        task.due_date = data.due_date
+                        fields.add('due_date')
+                    
+                    error = validate_task(task)
+                    if error:
+                        results.append(BulkTaskResult(
+                            index=index, id=data.id, success=False, message=error
+                        ))
+                        continue
+                    
+                    task.updated_at = now
+                    changed.append(task)
+                    if task.status != old_status:
+                        deltas = counters.merge_deltas(
+                            counters.task_deltas(old_status, -1),
+                            counters.task_deltas(task.status)
+                        )
+                        deltas.pop('tasks_total')
+                        counter_changes.append(
+                            (task.project_id, task.organization_id, deltas)
+                        )
+                    results.append(BulkTaskResult(
+                        index=index, id=task.pk, task=task, success=True,
+                        message="Task updated successfully"
+                    ))
+                
+                Task.objects.bulk_update(changed, sorted(fields), batch_size=BULK_BATCH_SIZE)
+                if search.needs_reindex(Task, fields):
+                    search.index(changed)
+                counters.apply_batch(counter_changes)
+                invalidate(
+                    organization_ids={task.organization_id for task in changed},
+                    project_ids={task.project_id for task in changed},
+                    task_ids=[task.pk for task in changed]
+                )
+                publish(
+                    task_event(
+                        TASK_UPDATED, task.organization_id, task.project_id, task.pk, task
+                    )
+                    for task in changed
+                )
+            
+            return BulkUpdateTasks(
+                results=results,
+                updated_count=len(changed),
+                success=True,
+                message=f"Updated {len(changed)} of {len(tasks)} tasks"
+            )
+        except Exception as e:
+            return BulkUpdateTasks(results=[], updated_count=0, success=False, message=str(e))
+
+
+class BulkDeleteTasks(graphene.Mutation):
+    """
+    Delete many tasks in a single transaction. One locking SELECT reads
+    what the counters, cache invalidation and events need; the tasks are
+    then deleted, with their comments and search entries, by Django's
+    collector, and the counters are updated once per project and
+    organization. The number of queries does not depend on the batch size.
+    """
+    class Arguments:
+        ids = graphene.List(graphene.NonNull(graphene.Int), required=True)
+    
+    results = graphene.List(BulkTaskResult)
+    deleted_count = graphene.Int()
+    success = graphene.Boolean()
+    message = graphene.String()
+    
+    def mutate(self, info, ids):
+        error = check_batch_size(ids)
+        if error:
+            return BulkDeleteTasks(results=[], deleted_count=0, success=False, message=error)
+        try:
+            with transaction.atomic():
+                rows = {
+                    row['id']: row
+                    for row in Task.objects.select_for_update(of=('self',))
+                    .filter(id__in=ids)
+                    .values('id', 'status', 'project_id', 'organization_id')
+                }
+                # Not Task.objects...delete(), which would lock and read the rows again
+                Task._base_manager.filter(id__in=list(rows)).delete()
+                counters.tasks_deleted(
+                    (row['project_id'], row['organization_id'], row['status'])
+                    for row in rows.values()
+                )
+                invalidate(
+                    organization_ids={row['organization_id'] for row in rows.values()},
+                    project_ids={row['project_id'] for row in rows.values()},
+                    task_ids=list(rows)
+                )
+                publish(
+                    task_event(
+                        TASK_DELETED, row['organization_id'], row['project_id'], row['id']
+                    )
+                    for row in rows.values()
+                )
+            
+            results = []
+            for index, task_id in enumerate(ids):
+                if rows.pop(task_id, None) is not None:
+                    results.append(BulkTaskResult(
+                        index=index, id=task_id, success=True,
+                        message="Task deleted successfully"
+                    ))
+                else:
+                    results.append(BulkTaskResult(
+                        index=index, id=task_id, success=False, message="Task not found"
+                    ))
+            deleted_count = sum(1 for result in results if result.success)
+            return BulkDeleteTasks(
+                results=results,
+                deleted_count=deleted_count,
+                success=True,
+                message=f"Deleted {deleted_count} of {len(ids)} tasks"
+            )
+        except Exception as e:
+            return BulkDeleteTasks(results=[], deleted_count=0, success=False, message=str(e))
+
+
 class Mutation(graphene.ObjectType):
     create_organization = CreateOrganization.Field()
     create_project = CreateProject.Field()
@@ -312,3 +664,6 @@ class Mutation(graphene.ObjectType):
     update_task = UpdateTask.Field()
     delete_task = DeleteTask.Field()
     create_task_comment = CreateTaskComment.Field()
+    bulk_create_tasks = BulkCreateTasks.Field()
+    bulk_update_tasks = BulkUpdateTasks.Field()
+    bulk_delete_tasks = BulkDeleteTasks.Field()
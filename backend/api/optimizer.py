@@ -0,0 +1,91 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from graphene.utils.str_converters import to_snake_case
+from graphql.language import FieldNode, FragmentSpreadNode, InlineFragmentNode
+
+
+def collect_selections(info, field_nodes):
+    """
+    Merge the sub-selections of the given field nodes into a mapping of
+    field name -> list of field nodes, expanding fragments along the way.
+    """
+    selections = {}
+
+    def visit(selection_set):
+        if selection_set is None:
+            return
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                name = selection.name.value
+                if not name.startswith('__'):
+                    selections.setdefault(name, []).append(selection)
+            elif isinstance(selection, FragmentSpreadNode):
+                visit(info.fragments[selection.name.value].selection_set)
+            elif isinstance(selection, InlineFragmentNode):
+                visit(selection.selection_set)
+
+    for node in field_nodes:
+        visit(node.selection_set)
+    return selections
+
+
+def plan(model, info, selections, prefix=''):
+    """
+    Translate a GraphQL selection over ``model`` into the lists of
+    ``only()`` fields, ``select_related()`` paths and ``Prefetch`` objects
+    needed to load it without per-row queries.
+    """
+    only = [prefix + model._meta.pk.name]
+    select_related = []
+    prefetches = []
+
+    for name, nodes in selections.items():
+        try:
+            field = model._meta.get_field(to_snake_case(name))
+        except FieldDoesNotExist:
+            continue
+
+        if not field.is_relation:
+            only.append(prefix + field.name)
+        elif field.concrete and (field.many_to_one or field.one_to_one):
+            path = prefix + field.name
+            child_only, child_related, child_prefetches = plan(
+                field.related_model, info, collect_selections(info, nodes),
+                prefix=path + '__',
+            )
+            only.append(path)
+            only.extend(child_only)
+            select_related.append(path)
+            select_related.extend(child_related)
+            prefetches.extend(child_prefetches)
+        elif field.one_to_many or field.many_to_many:
+            queryset = optimize(
+                field.related_model._default_manager.all(),
+                info,
+                nodes,
+                required_fields=[field.field.name] if field.one_to_many else [],
+            )
+            prefetches.append(
+                Prefetch(prefix + field.get_accessor_name(), queryset=queryset)
+            )
+
+    return only, select_related, prefetches
+
+
+def optimize(queryset, info, field_nodes=None, required_fields=()):
+    """
+    Apply select_related/prefetch_related/only to ``queryset`` based on the
+    fields requested below ``field_nodes`` (the current field by default).
+    """
+    if field_nodes is None:
+        field_nodes = info.field_nodes
+    only, select_related, prefetches = plan(
+        queryset.model, info, collect_selections(info, field_nodes)
+    )
+    only.extend(required_fields)
+
+    if select_related:
+        queryset = queryset.select_related(*select_related)
+    if prefetches:
+        queryset = queryset.prefetch_related(*prefetches)
+    return queryset.only(*only)
@@ -0,0 +1,140 @@
+import base64
+import json
+
+from django.db.models import F, Q
+from graphene.relay import PageInfo
+from graphene_django.settings import graphene_settings
+from graphql import GraphQLError
+
+from .optimizer import collect_selections, optimize
+
+
+def get_ordering(model):
+    """
+    Return the keyset ordering of ``model`` as (field name, descending)
+    pairs. The model's Meta.ordering must end on a unique column so that
+    cursors are stable.
+    """
+    return [
+        (name.lstrip('-'), name.startswith('-'))
+        for name in model._meta.ordering
+    ]
+
+
+def encode_cursor(node, ordering):
+    values = [getattr(node, name) for name, _ in ordering]
+    data = json.dumps(values, default=str)
+    return base64.urlsafe_b64encode(data.encode()).decode()
+
+
+def decode_cursor(cursor, model, ordering):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        return [
+            model._meta.get_field(name).to_python(value)
+            for (name, _), value in zip(ordering, values, strict=True)
+        ]
+    except Exception:
+        raise GraphQLError(f"Invalid cursor: {cursor}")
+
+
+def keyset_filter(ordering, values, forward, nullable=()):
+    """
+    Build the WHERE clause selecting rows strictly after ``values`` in the
+    given ordering (or strictly before it when ``forward`` is False).
+    NULLs of the ``nullable`` fields sort after every value.
+    """
+    condition = Q()
+    equal = Q()
+    for (name, descending), value in zip(ordering, values):
+        lookup = 'lt' if descending == forward else 'gt'
+        if name not in nullable:
+            beyond = Q(**{f'{name}__{lookup}': value})
+        elif value is None:
+            # Nothing sorts after NULL; every value sorts before it
+            beyond = None if forward else Q(**{f'{name}__isnull': False})
+        else:
+            beyond = Q(**{f'{name}__{lookup}': value})
+            if forward:
+                beyond |= Q(**{f'{name}__isnull': True})
+        if beyond is not None:
+            condition |= equal & beyond
+        equal &= Q(**{f'{name}__isnull': True}) if value is None else Q(**{name: value})
+    return condition
+
+
+def order_by_expressions(ordering, forward, nullable=()):
+    """ORDER BY ``ordering`` (reversed when ``forward`` is False), NULLs last"""
+    order_by = []
+    for name, descending in ordering:
+        expression = F(name).desc if descending == forward else F(name).asc
+        if name not in nullable:
+            order_by.append(expression())
+        elif forward:
+            order_by.append(expression(nulls_last=True))
+        else:
+            order_by.append(expression(nulls_first=True))
+    return order_by
+
+
+def node_field_nodes(info):
+    """Return the ``edges { node }`` field nodes of the current connection"""
+    edges = collect_selections(info, info.field_nodes).get('edges', [])
+    return collect_selections(info, edges).get('node', [])
+
+
+def paginate(queryset, info, connection_type, first=None, last=None, after=None, before=None,
+             ordering=None):
+    """
+    Resolve a Relay connection over ``queryset`` using keyset pagination on
+    the model's Meta.ordering, or on ``ordering`` ((field name, descending)
+    pairs ending on a unique field), so that every page is an index range
+    scan of at most ``first``/``last`` + 1 rows regardless of its depth.
+    """
+    model = queryset.model
+    ordering = ordering or get_ordering(model)
+    nullable = {name for name, _ in ordering if model._meta.get_field(name).null}
+    max_limit = graphene_settings.RELAY_CONNECTION_MAX_LIMIT
+
+    for name, value in (('first', first), ('last', last)):
+        if value is not None and not 0 <= value <= max_limit:
+            raise GraphQLError(f"'{name}' must be between 0 and {max_limit}")
+
+    forward = last is None or first is not None
+    limit = first if forward else last
+    if limit is None:
+        limit = max_limit
+
+    queryset = optimize(
+        queryset, info, node_field_nodes(info),
+        required_fields=[name for name, _ in ordering],
+    )
+    if after is not None:
+        queryset = queryset.filter(
+            keyset_filter(ordering, decode_cursor(after, model, ordering), True, nullable)
+        )
+    if before is not None:
+        queryset = queryset.filter(
+            keyset_filter(ordering, decode_cursor(before, model, ordering), False, nullable)
+        )
+
+    order_by = order_by_expressions(ordering, forward, nullable)
+    nodes = list(queryset.order_by(*order_by)[:limit + 1])
+    has_more = len(nodes) > limit
+    nodes = nodes[:limit]
+    if not forward:
+        nodes.reverse()
+
+    edges = [
+        connection_type.Edge(node=node, cursor=encode_cursor(node, ordering))
+        for node in nodes
+    ]
+    return connection_type(
+        edges=edges,
+        page_info=PageInfo(
+            start_cursor=edges[0].cursor if edges else None,
+            end_cursor=edges[-1].cursor if edges else None,
+            has_next_page=has_more if forward else before is not None,
+            has_previous_page=after is not None if forward else has_more,
+        ),
+    )
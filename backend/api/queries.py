@@ -1,7 +1,37 @@
 import graphene
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
 from graphene_django import DjangoObjectType
+from graphene_django.settings import graphene_settings
+from graphql import GraphQLError
+from core import search
+from core.cache import get_organization
+from core.counters import COUNTER_FIELDS, STATUS_FIELDS
 from core.models import Organization, Project, Task, TaskComment
-from .types import OrganizationType, ProjectType, TaskType, TaskCommentType
+from .types import (
+    OrganizationType, ProjectType, TaskType, TaskCommentType,
+    ProjectConnection, TaskConnection, TaskCommentConnection,
+    get_project_stats_loader,
+)
+from .optimizer import collect_selections, optimize
+from .pagination import paginate
+
+
+class TaskOrder(graphene.Enum):
+    CREATED_AT_DESC = 'created_at_desc'
+    DUE_DATE = 'due_date'
+
+    @property
+    def description(self):
+        if self == TaskOrder.DUE_DATE:
+            return "Earliest due date first, tasks without one last"
+        return "Newest first"
+
+
+TASK_ORDERINGS = {
+    TaskOrder.CREATED_AT_DESC.value: [('created_at', True), ('id', True)],
+    TaskOrder.DUE_DATE.value: [('due_date', False), ('id', False)],
+}
 
 
 class Query(graphene.ObjectType):
@@ -10,23 +40,33 @@ class Query(graphene.ObjectType):
     organization = graphene.Field(OrganizationType, slug=graphene.String(required=True))
     
     # Projects
-    projects = graphene.List(
-        ProjectType,
+    projects = graphene.relay.ConnectionField(
+        ProjectConnection,
         organization_slug=graphene.String(required=True),
         status=graphene.String()
     )
     project = graphene.Field(ProjectType, id=graphene.Int(required=True))
     
     # Tasks
-    tasks = graphene.List(
-        TaskType,
-        project_id=graphene.Int(required=True),
-        status=graphene.String()
+    tasks = graphene.relay.ConnectionField(
+        TaskConnection,
+        project_id=graphene.Int(),
+        organization_slug=graphene.String(),
+        project_ids=graphene.List(graphene.NonNull(graphene.Int)),
+        status=graphene.String(),
+        statuses=graphene.List(graphene.NonNull(graphene.String)),
+        assignee_email=graphene.String(),
+        due_after=graphene.DateTime(),
+        due_before=graphene.DateTime(),
+        order_by=TaskOrder(default_value=TaskOrder.CREATED_AT_DESC.value),
     )
     task = graphene.Field(TaskType, id=graphene.Int(required=True))
     
     # Comments
-    task_comments = graphene.List(TaskCommentType, task_id=graphene.Int(required=True))
+    task_comments = graphene.relay.ConnectionField(
+        TaskCommentConnection,
+        task_id=graphene.Int(required=True)
+    )
     
     # Statistics
     project_statistics = graphene.Field(
@@ -34,78 +74,197 @@ class Query(graphene.ObjectType):
         organization_slug=graphene.String(required=True)
     )
     
+    # Full-text search
+    search = graphene.List(
+        'api.queries.SearchResultType',
+        organization_slug=graphene.String(required=True),
+        text=graphene.String(required=True),
+        kinds=graphene.List(graphene.NonNull(graphene.String)),
+        first=graphene.Int()
+    )
+    
     def resolve_organizations(self, info):
-        return Organization.objects.all()
+        organizations = list(optimize(Organization.objects.all(), info))
+        if 'projects' in collect_selections(info, info.field_nodes):
+            # Prime the loader with the (prefetched) projects of every
+            # organization, so that their counters are read with one query
+            # rather than one per organization
+            loader = get_project_stats_loader(info)
+            for organization in organizations:
+                loader.prime(organization.projects.all())
+        return organizations
     
     def resolve_organization(self, info, slug):
         try:
-            return Organization.objects.get(slug=slug)
+            return get_organization(slug, info.context)
         except Organization.DoesNotExist:
             return None
     
-    def resolve_projects(self, info, organization_slug, status=None):
+    def resolve_projects(self, info, organization_slug, status=None, **kwargs):
         try:
-            org = Organization.objects.get(slug=organization_slug)
+            org = get_organization(organization_slug, info.context)
             projects = Project.objects.filter(organization=org)
             if status:
                 projects = projects.filter(status=status)
-            return projects
+            connection = paginate(projects, info, ProjectConnection, **kwargs)
+            get_project_stats_loader(info).prime(edge.node for edge in connection.edges)
+            return connection
         except Organization.DoesNotExist:
             return []
     
     def resolve_project(self, info, id):
         try:
-            return Project.objects.get(id=id)
+            return optimize(Project.objects.all(), info).get(id=id)
         except Project.DoesNotExist:
             return None
     
-    def resolve_tasks(self, info, project_id, status=None):
-        tasks = Task.objects.filter(project_id=project_id)
+    def resolve_tasks(self, info, project_id=None, organization_slug=None, project_ids=None,
+                      status=None, statuses=None, assignee_email=None, due_after=None,
+                      due_before=None, order_by=TaskOrder.CREATED_AT_DESC.value, **kwargs):
+        """
+        The tasks of one project, or of an organization filtered by projects,
+        statuses, assignee and due window (``dueAfter`` inclusive,
+        ``dueBefore`` exclusive). An assignee or due window is read from the
+        (organization, ...) Task indexes in the requested order; statuses are
+        filtered on the way.
+        """
+        if project_id is not None:
+            tasks = Task.objects.filter(project_id=project_id)
+        elif organization_slug:
+            try:
+                org = get_organization(organization_slug, info.context)
+            except Organization.DoesNotExist:
+                return []
+            tasks = Task.objects.filter(organization=org)
+        else:
+            raise GraphQLError("Either 'projectId' or 'organizationSlug' is required")
+        if project_ids is not None:
+            tasks = tasks.filter(project_id__in=project_ids)
         if status:
             tasks = tasks.filter(status=status)
-        return tasks
+        if statuses is not None:
+            tasks = tasks.filter(status__in=statuses)
+        if assignee_email is not None:
+            tasks = tasks.filter(assignee_email=assignee_email)
+        if due_after is not None:
+            tasks = tasks.filter(due_date__gte=due_after)
+        if due_before is not None:
+            tasks = tasks.filter(due_date__lt=due_before)
+        ordering = TASK_ORDERINGS[getattr(order_by, 'value', order_by)]
+        return paginate(tasks, info, TaskConnection, ordering=ordering, **kwargs)
     
     def resolve_task(self, info, id):
         try:
-            return Task.objects.get(id=id)
+            return optimize(Task.objects.all(), info).get(id=id)
         except Task.DoesNotExist:
             return None
     
-    def resolve_task_comments(self, info, task_id):
-        return TaskComment.objects.filter(task_id=task_id)
+    def resolve_task_comments(self, info, task_id, **kwargs):
+        comments = TaskComment.objects.filter(task_id=task_id)
+        return paginate(comments, info, TaskCommentConnection, **kwargs)
     
     def resolve_project_statistics(self, info, organization_slug):
         try:
-            org = Organization.objects.get(slug=organization_slug)
-            projects = Project.objects.filter(organization=org)
-            
-            total_projects = projects.count()
-            total_tasks = Task.objects.filter(project__organization=org).count()
-            completed_tasks = Task.objects.filter(
-                project__organization=org,
-                status='DONE'
-            ).count()
-            
-            completion_rate = 0
-            if total_tasks > 0:
-                completion_rate = (completed_tasks / total_tasks) * 100
-            
-            return ProjectStatistics(
-                total_projects=total_projects,
-                total_tasks=total_tasks,
-                completed_tasks=completed_tasks,
-                completion_rate=completion_rate
-            )
+            org = get_organization(organization_slug, info.context)
+            return ProjectStatistics.for_organization(org)
         except Organization.DoesNotExist:
             return None
+    
+    def resolve_search(self, info, organization_slug, text, kinds=None, first=None):
+        try:
+            org = get_organization(organization_slug, info.context)
+        except Organization.DoesNotExist:
+            return []
+        limit = min(first or 20, graphene_settings.RELAY_CONNECTION_MAX_LIMIT)
+        entries = search.search(text, organization_id=org.pk, kinds=kinds, limit=max(limit, 0))
+        results = SearchResult.load(entries)
+        get_project_stats_loader(info).prime(result.project for result in results)
+        return results
 
 
 class ProjectStatistics:
-    def __init__(self, total_projects, total_tasks, completed_tasks, completion_rate):
+    def __init__(self, total_projects, total_tasks, completed_tasks, completion_rate,
+                 projects_by_status=None, tasks_by_status=None):
         self.total_projects = total_projects
         self.total_tasks = total_tasks
         self.completed_tasks = completed_tasks
         self.completion_rate = completion_rate
+        self.projects_by_status = projects_by_status or []
+        self.tasks_by_status = tasks_by_status or []
+
+    @classmethod
+    def for_organization(cls, org):
+        """
+        Build the statistics with one aggregate over the organization's
+        projects: filtered counts of the projects by status and the sums of
+        their materialized task counters.
+        """
+        project_statuses = [status for status, _ in Project.STATUS_CHOICES]
+        totals = Project.objects.filter(organization=org).aggregate(
+            total_projects=Count('id'),
+            **{
+                f'projects_{status}': Count('id', filter=Q(status=status))
+                for status in project_statuses
+            },
+            **{field: Coalesce(Sum(field), 0) for field in COUNTER_FIELDS},
+        )
+
+        total_tasks = totals['tasks_total']
+        completed_tasks = totals['tasks_done']
+        completion_rate = 0
+        if total_tasks > 0:
+            completion_rate = (completed_tasks / total_tasks) * 100
+
+        return cls(
+            total_projects=totals['total_projects'],
+            total_tasks=total_tasks,
+            completed_tasks=completed_tasks,
+            completion_rate=completion_rate,
+            projects_by_status=[
+                StatusCount(status, totals[f'projects_{status}']) for status in project_statuses
+            ],
+            tasks_by_status=[
+                StatusCount(status, totals[field]) for status, field in STATUS_FIELDS.items()
+            ],
+        )
+
+
+class SearchResult:
+    def __init__(self, kind, rank, project, task=None, comment=None):
+        self.kind = kind
+        self.rank = rank
+        self.project = project
+        self.task = task
+        self.comment = comment
+
+    @classmethod
+    def load(cls, entries):
+        """Resolve ranked search entries with one query per object type"""
+        projects = Project.objects.in_bulk({entry.project_id for entry in entries})
+        tasks = Task.objects.in_bulk({entry.task_id for entry in entries} - {None})
+        comments = TaskComment.objects.in_bulk({entry.comment_id for entry in entries} - {None})
+        return [
+            cls(
+                kind=entry.kind,
+                rank=entry.rank,
+                project=projects[entry.project_id],
+                task=tasks.get(entry.task_id),
+                comment=comments.get(entry.comment_id),
+            )
+            for entry in entries
+            if entry.project_id in projects
+        ]
+
+
+class StatusCount:
+    def __init__(self, status, count):
+        self.status = status
+        self.count = count
+
+
+class StatusCountType(graphene.ObjectType):
+    status = graphene.String()
+    count = graphene.Int()
 
 
 class ProjectStatisticsType(graphene.ObjectType):
@@ -113,3 +272,13 @@ class ProjectStatisticsType(graphene.ObjectType):
     total_tasks = graphene.Int()
     completed_tasks = graphene.Int()
     completion_rate = graphene.Float()
+    projects_by_status = graphene.List(StatusCountType)
+    tasks_by_status = graphene.List(StatusCountType)
+
+
+class SearchResultType(graphene.ObjectType):
+    kind = graphene.String()
+    rank = graphene.Float()
+    project = graphene.Field(ProjectType)
+    task = graphene.Field(TaskType)
+    comment = graphene.Field(TaskCommentType)
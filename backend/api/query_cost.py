@@ -0,0 +1,171 @@
+from django.conf import settings
+from graphene_django.settings import graphene_settings
+from graphql import (
+    FieldNode,
+    FragmentDefinitionNode,
+    FragmentSpreadNode,
+    GraphQLError,
+    IntValueNode,
+    VariableNode,
+    get_named_type,
+    get_nullable_type,
+    is_composite_type,
+    is_list_type,
+)
+from graphql.validation import ValidationRule
+
+PAGINATION_ARGUMENTS = ('first', 'last')
+
+# Fields that cost more than a plain object/list field, as "Type.field"
+DEFAULT_FIELD_WEIGHTS = {
+    'ProjectType.taskCount': 2,
+    'ProjectType.completedTasks': 2,
+    'ProjectType.completionRate': 2,
+    'Query.projectStatistics': 5,
+}
+
+
+def get_limits():
+    options = getattr(settings, 'GRAPHQL_QUERY_LIMITS', {})
+    return {
+        'MAX_DEPTH': options.get('MAX_DEPTH', 8),
+        'MAX_COST': options.get('MAX_COST', 5000),
+        'DEFAULT_LIST_SIZE': options.get('DEFAULT_LIST_SIZE', 20),
+        'FIELD_WEIGHTS': {**DEFAULT_FIELD_WEIGHTS, **options.get('FIELD_WEIGHTS', {})},
+    }
+
+
+class QueryCost:
+    """
+    Static cost and depth of an operation, computed from the document alone.
+
+    Every object or list field costs its weight once per parent object it
+    may be resolved for, scalars are free unless weighted. Lists multiply
+    the cost of their selections by their page size. For connections that
+    is ``first``/``last`` (a variable counts as its default, or as the
+    maximum page size) or, without either, the maximum page size that the
+    connection then returns. Unpaginated lists count as DEFAULT_LIST_SIZE
+    items, an estimate of their typical length.
+    """
+
+    def __init__(self, schema, get_fragment, limits=None):
+        self.schema = schema
+        self.get_fragment = get_fragment
+        self.limits = limits or get_limits()
+        self.max_page_size = graphene_settings.RELAY_CONNECTION_MAX_LIMIT
+
+    def analyze(self, operation):
+        """Return (cost, depth) of an OperationDefinitionNode"""
+        self.variable_defaults = {
+            definition.variable.name.value: definition.default_value
+            for definition in operation.variable_definitions or ()
+        }
+        root_type = self.schema.get_root_type(operation.operation)
+        if root_type is None:
+            return 0, 0
+        return self._selection_set(root_type, operation.selection_set, 1, None, 0, frozenset())
+
+    def _selection_set(self, parent_type, selection_set, multiplier, page_size, depth, fragments):
+        cost = max_depth = 0
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                field_cost, field_depth = self._field(
+                    parent_type, selection, multiplier, page_size, depth
+                )
+            else:
+                if isinstance(selection, FragmentSpreadNode):
+                    name = selection.name.value
+                    fragment = self.get_fragment(name)
+                    if fragment is None or name in fragments:
+                        continue
+                    fragments = fragments | {name}
+                else:
+                    fragment = selection
+                fragment_type = parent_type
+                if fragment.type_condition is not None:
+                    fragment_type = self.schema.get_type(fragment.type_condition.name.value)
+                if fragment_type is None:
+                    continue
+                field_cost, field_depth = self._selection_set(
+                    fragment_type, fragment.selection_set, multiplier, page_size, depth, fragments
+                )
+            cost += field_cost
+            max_depth = max(max_depth, field_depth)
+        return cost, max_depth
+
+    def _field(self, parent_type, node, multiplier, page_size, depth):
+        name = node.name.value
+        fields = getattr(parent_type, 'fields', {})
+        if name.startswith('__') or name not in fields:
+            return 0, 0
+
+        field_type = get_nullable_type(fields[name].type)
+        named_type = get_named_type(field_type)
+        default_weight = 1 if is_composite_type(named_type) else 0
+        weight = self.limits['FIELD_WEIGHTS'].get(f'{parent_type.name}.{name}', default_weight)
+        cost = weight * multiplier
+        if node.selection_set is None or depth >= self.limits['MAX_DEPTH']:
+            return cost, 1 if node.selection_set is not None else 0
+
+        requested = self._page_size(node, fields[name])
+        if is_list_type(field_type):
+            multiplier *= page_size or requested or self.limits['DEFAULT_LIST_SIZE']
+            page_size = None
+        else:
+            page_size = requested
+        child_cost, child_depth = self._selection_set(
+            named_type, node.selection_set, multiplier, page_size, depth + 1, frozenset()
+        )
+        return cost + child_cost, child_depth + 1
+
+    def _page_size(self, node, field):
+        """The page size of a connection field, None for other fields"""
+        if not any(name in field.args for name in PAGINATION_ARGUMENTS):
+            return None
+        sizes = []
+        for argument in node.arguments or ():
+            if argument.name.value not in PAGINATION_ARGUMENTS:
+                continue
+            value = argument.value
+            if isinstance(value, VariableNode):
+                value = self.variable_defaults.get(value.name.value)
+            if isinstance(value, IntValueNode):
+                sizes.append(min(max(int(value.value), 0), self.max_page_size))
+            else:
+                sizes.append(self.max_page_size)
+        return max(sizes) if sizes else self.max_page_size
+
+
+def operation_cost(schema, document, operation):
+    fragments = {
+        definition.name.value: definition
+        for definition in document.definitions
+        if isinstance(definition, FragmentDefinitionNode)
+    }
+    return QueryCost(schema, fragments.get).analyze(operation)
+
+
+class QueryCostRule(ValidationRule):
+    """
+    Reject operations deeper than GRAPHQL_QUERY_LIMITS['MAX_DEPTH'] or
+    costlier than GRAPHQL_QUERY_LIMITS['MAX_COST'] before they execute.
+    """
+
+    def enter_operation_definition(self, node, *_args):
+        limits = get_limits()
+        cost, depth = QueryCost(
+            self.context.schema, self.context.get_fragment, limits
+        ).analyze(node)
+        name = node.name.value if node.name else 'anonymous'
+        if depth > limits['MAX_DEPTH']:
+            self.report_error(GraphQLError(
+                f"'{name}' exceeds maximum operation depth of {limits['MAX_DEPTH']}.",
+                node,
+                extensions={'code': 'QUERY_TOO_DEEP', 'maxDepth': limits['MAX_DEPTH']},
+            ))
+        elif cost > limits['MAX_COST']:
+            self.report_error(GraphQLError(
+                f"'{name}' has a cost of {cost}, above the maximum of {limits['MAX_COST']}.",
+                node,
+                extensions={'code': 'QUERY_TOO_COMPLEX', 'cost': cost, 'maxCost': limits['MAX_COST']},
+            ))
@@ -0,0 +1,233 @@
+import hashlib
+import json
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import models, transaction
+
+from core import metrics
+from core.cache import LRUCache, get_organization
+
+# Root query arguments that scope a result to a parent object, so that the
+# (possibly empty) list they return is invalidated when children change.
+ROOT_ARGUMENT_TAGS = {
+    'organization_slug': 'organization',
+    'project_id': 'project',
+    'task_id': 'task',
+}
+ORGANIZATIONS_TAG = 'organizations'
+
+
+def tag_for(model_name, pk):
+    return f'{model_name}:{pk}'
+
+
+class LocalBackend:
+    """
+    In-process storage: one LRU for entries and one for tag versions. An
+    evicted tag version only turns the entries that depend on it into misses.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.entries = LRUCache(max_size=max_size, ttl=ttl)
+        self.versions = LRUCache(max_size=max_size * 100)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def set(self, key, value):
+        self.entries.set(key, value)
+
+    def get_versions(self, tags):
+        versions = {tag: self.versions.get(tag) for tag in tags}
+        return {tag: version for tag, version in versions.items() if version is not None}
+
+    def init_versions(self, versions):
+        with self._lock:
+            current = {}
+            for tag, version in versions.items():
+                current[tag] = self.versions.get(tag)
+                if current[tag] is None:
+                    self.versions.set(tag, version)
+                    current[tag] = version
+            return current
+
+    def set_versions(self, versions):
+        with self._lock:
+            for tag, version in versions.items():
+                self.versions.set(tag, version)
+
+
+class DjangoCacheBackend:
+    """Storage in a Django cache, shared by every worker using the same alias"""
+
+    entry_prefix = 'graphql:response:'
+    tag_prefix = 'graphql:tag:'
+
+    def __init__(self, alias, ttl):
+        self.cache = caches[alias]
+        self.ttl = ttl
+
+    def get(self, key):
+        return self.cache.get(self.entry_prefix + key)
+
+    def set(self, key, value):
+        self.cache.set(self.entry_prefix + key, value, self.ttl)
+
+    def get_versions(self, tags):
+        stored = self.cache.get_many([self.tag_prefix + tag for tag in tags])
+        return {key[len(self.tag_prefix):]: version for key, version in stored.items()}
+
+    def init_versions(self, versions):
+        for tag, version in versions.items():
+            self.cache.add(self.tag_prefix + tag, version, None)
+        return self.get_versions(versions)
+
+    def set_versions(self, versions):
+        self.cache.set_many(
+            {self.tag_prefix + tag: version for tag, version in versions.items()}, None
+        )
+
+
+class ResponseCache:
+    """
+    Cache of read-only GraphQL results keyed on the normalized document,
+    variables, operation name and tenant.
+
+    Each entry records the version of every tag (``<model>:<pk>``) it was
+    built from; mutations bump the versions of the objects they touch, which
+    makes every dependent entry miss. Tag versions are invalidation
+    timestamps, so an entry whose execution started before one of its tags
+    was invalidated is never stored.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.invalidations = 0
+
+    def make_key(self, document, variables, operation_name, tenant):
+        payload = json.dumps(
+            [document, variables or {}, operation_name, tenant],
+            sort_keys=True, default=str,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key):
+        entry = self.backend.get(key)
+        if entry is not None:
+            data, versions = entry
+            if self.backend.get_versions(versions) == versions:
+                self.hits += 1
+                return data
+        self.misses += 1
+        return None
+
+    def set(self, key, data, tags, started):
+        now = time.time_ns()
+        versions = self.backend.init_versions(dict.fromkeys(tags, now))
+        if any(version > started for version in versions.values() if version != now):
+            return
+        self.backend.set(key, (data, versions))
+        self.stores += 1
+
+    def invalidate(self, *tags):
+        if tags:
+            self.backend.set_versions(dict.fromkeys(tags, time.time_ns()))
+            self.invalidations += len(tags)
+
+    def stats(self):
+        return {
+            'hit': self.hits,
+            'miss': self.misses,
+            'store': self.stores,
+            'invalidation': self.invalidations,
+        }
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Return the configured ResponseCache, or None when caching is disabled"""
+    global _response_cache
+    options = getattr(settings, 'GRAPHQL_RESPONSE_CACHE', {})
+    if not options.get('ENABLED'):
+        return None
+    with _response_cache_lock:
+        if _response_cache is None:
+            ttl = options.get('TTL', 30)
+            if options.get('BACKEND', 'local') == 'django':
+                backend = DjangoCacheBackend(options.get('ALIAS', 'default'), ttl)
+            else:
+                backend = LocalBackend(options.get('MAX_SIZE', 1000), ttl)
+            _response_cache = ResponseCache(backend)
+    return _response_cache
+
+
+def cache_events():
+    """Values of graphql_response_cache_events_total, by event"""
+    cache = _response_cache
+    if cache is None:
+        return {}
+    return {(event,): count for event, count in cache.stats().items()}
+
+
+metrics.registry.callback(
+    'graphql_response_cache_events_total',
+    "Response cache lookups that hit or missed, results stored and tags invalidated",
+    ['event'], 'counter', cache_events,
+)
+
+
+def invalidate(organization_ids=(), project_ids=(), task_ids=(), tags=()):
+    """
+    Invalidate cached results that depend on the given objects once the
+    current transaction commits. Callers pass every ancestor of what they
+    changed, since parents expose children lists and task counters.
+    """
+    cache = get_response_cache()
+    if cache is None:
+        return
+    tags = set(tags)
+    tags.update(tag_for('organization', pk) for pk in organization_ids)
+    tags.update(tag_for('project', pk) for pk in project_ids)
+    tags.update(tag_for('task', pk) for pk in task_ids)
+    transaction.on_commit(lambda: cache.invalidate(*tags))
+
+
+class CacheTagMiddleware:
+    """
+    Graphene middleware recording which objects a cached query read: every
+    model instance that has a field resolved, plus the parent objects named
+    by root query arguments.
+    """
+
+    def resolve(self, next, root, info, **args):
+        tags = info.context.graphql_cache_tags
+        if isinstance(root, models.Model):
+            tags.add(tag_for(root._meta.model_name, root.pk))
+        elif root is None and info.parent_type.name == 'Query':
+            self.tag_root_field(tags, info, args)
+        return next(root, info, **args)
+
+    def tag_root_field(self, tags, info, args):
+        if info.field_name in ('organizations', 'organization'):
+            tags.add(ORGANIZATIONS_TAG)
+        for argument, model_name in ROOT_ARGUMENT_TAGS.items():
+            value = args.get(argument)
+            if value is None:
+                continue
+            if model_name == 'organization':
+                try:
+                    value = get_organization(value, info.context).pk
+                except models.ObjectDoesNotExist:
+                    tags.add(ORGANIZATIONS_TAG)
+                    continue
+            tags.add(tag_for(model_name, value))
@@ -0,0 +1,174 @@
+import heapq
+import json
+import logging
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from core.models import SlowOperation
+
+logger = logging.getLogger('api.slow_operations')
+
+# Recorder of the operation executed in the current context, so that
+# time_statement only attributes the statements run for this operation to it
+_current_recorder = ContextVar('slow_operation_recorder', default=None)
+
+EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')
+
+
+def get_options():
+    options = getattr(settings, 'GRAPHQL_SLOW_OPERATIONS', {})
+    return {
+        'THRESHOLD_MS': options.get('THRESHOLD_MS', 0),
+        'STATEMENTS': options.get('STATEMENTS', 5),
+        'EXPLAIN': options.get('EXPLAIN', True),
+        'ANALYZE': options.get('ANALYZE', False),
+        'STORE': options.get('STORE', ['log']),
+    }
+
+
+def variables_shape(value):
+    """The structure of ``value`` with type names instead of the values"""
+    if isinstance(value, dict):
+        return {key: variables_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return {'list': len(value), 'items': variables_shape(value[0]) if value else None}
+    if value is None:
+        return 'null'
+    return type(value).__name__
+
+
+class SlowOperationRecorder:
+    """
+    Times one GraphQL operation and keeps its STATEMENTS slowest SQL
+    statements. When the operation took THRESHOLD_MS or more, the
+    statements are explained (EXPLAIN ANALYZE for SELECTs with ANALYZE on
+    PostgreSQL) and the record is logged to the ``api.slow_operations``
+    logger and/or stored as a core.SlowOperation row, per STORE.
+
+    Statements are timed by an execute wrapper installed once on every
+    connection (time_statement), which hands them to the recorder current
+    in the context running them.
+
+    Parameter and variable values are kept in memory for EXPLAIN only; the
+    record holds the SQL text and the shape of the variables.
+    """
+
+    def __init__(self, request, query, variables, operation_name, options):
+        self.request = request
+        self.query = query
+        self.variables = variables
+        self.operation_name = operation_name
+        self.operation_type = None
+        self.options = options
+        self.statements = []
+        self.sql_count = 0
+        self.sql_duration = 0
+        self.sequence = 0
+        self._lock = threading.Lock()
+        self.token = _current_recorder.set(self)
+        self.started = time.perf_counter_ns()
+
+    @classmethod
+    def start(cls, request, query, variables, operation_name):
+        """A recorder for the operation, or None when the log is disabled"""
+        options = get_options()
+        if options['THRESHOLD_MS'] <= 0:
+            return None
+        return cls(request, query, variables, operation_name, options)
+
+    def execute(self, execute, sql, params, many, context):
+        start = time.perf_counter_ns()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter_ns() - start
+            statement = (elapsed, self.sequence, context['connection'].alias, sql, None if many else params)
+            with self._lock:
+                self.sql_count += 1
+                self.sql_duration += elapsed
+                self.sequence += 1
+                if len(self.statements) < self.options['STATEMENTS']:
+                    heapq.heappush(self.statements, statement)
+                else:
+                    heapq.heappushpop(self.statements, statement)
+
+    def stop(self):
+        """Stop timing; returns whether the operation was slow"""
+        self.duration = time.perf_counter_ns() - self.started
+        _current_recorder.reset(self.token)
+        return self.duration >= self.options['THRESHOLD_MS'] * 1e6
+
+    def finish(self):
+        """Stop timing and record the operation when it was slow"""
+        if self.stop():
+            self.record()
+
+    def explain(self, alias, sql, params):
+        if params is None or not sql.lstrip().upper().startswith(EXPLAINABLE):
+            return None
+        connection = connections[alias]
+        options = {}
+        if (
+            self.options['ANALYZE']
+            and connection.vendor == 'postgresql'
+            and sql.lstrip().upper().startswith('SELECT')
+            and 'FOR UPDATE' not in sql.upper()
+        ):
+            options['analyze'] = True
+        try:
+            prefix = connection.ops.explain_query_prefix(**options)
+            with connection.cursor() as cursor:
+                cursor.execute(f'{prefix} {sql}', params)
+                rows = cursor.fetchall()
+        except Exception as e:
+            return f'EXPLAIN failed: {e}'
+        return '\n'.join(' '.join(str(column) for column in row) for row in rows)
+
+    def as_dict(self):
+        statements = sorted(self.statements, reverse=True)
+        organization = getattr(self.request, 'organization', None)
+        return {
+            'operation_name': self.operation_name or '',
+            'operation_type': self.operation_type.value if self.operation_type else '',
+            'tenant': organization.slug if organization is not None else '',
+            'variables': variables_shape(self.variables or {}),
+            'duration': round(self.duration / 1e6, 3),
+            'sql_count': self.sql_count,
+            'sql_duration': round(self.sql_duration / 1e6, 3),
+            'statements': [
+                {
+                    'alias': alias,
+                    'sql': sql,
+                    'duration': round(elapsed / 1e6, 3),
+                    'plan': self.explain(alias, sql, params) if self.options['EXPLAIN'] else None,
+                }
+                for elapsed, _, alias, sql, params in statements
+            ],
+        }
+
+    def record(self):
+        entry = self.as_dict()
+        if 'log' in self.options['STORE']:
+            logger.warning(json.dumps({'event': 'slow_graphql_operation', **entry}))
+        if 'table' in self.options['STORE']:
+            SlowOperation.objects.create(**entry)
+
+
+def time_statement(execute, sql, params, many, context):
+    recorder = _current_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder.execute(execute, sql, params, many, context)
+
+
+def on_connection_created(sender, connection, **kwargs):
+    if time_statement not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_statement)
+
+
+connection_created.connect(on_connection_created, dispatch_uid='api.slow_operations')
@@ -0,0 +1,75 @@
+import graphene
+from django.db import transaction
+from graphql import GraphQLError
+
+from core.models import Project, Task
+from .broker import get_broker
+from .types import TaskCommentType, TaskType
+
+TASK_CREATED = 'CREATED'
+TASK_UPDATED = 'UPDATED'
+TASK_DELETED = 'DELETED'
+
+
+def task_channel(organization_id, project_id):
+    return f'organization:{organization_id}:project:{project_id}:tasks'
+
+
+def comment_channel(organization_id, task_id):
+    return f'organization:{organization_id}:task:{task_id}:comments'
+
+
+class TaskEvent:
+    def __init__(self, kind, task_id, project_id, task=None):
+        self.kind = kind
+        self.task_id = task_id
+        self.project_id = project_id
+        self.task = task
+
+
+def task_event(kind, organization_id, project_id, task_id, task=None):
+    """Return the (channel, event) message for a change to a task"""
+    return task_channel(organization_id, project_id), TaskEvent(kind, task_id, project_id, task)
+
+
+def comment_event(organization_id, comment):
+    return comment_channel(organization_id, comment.task_id), comment
+
+
+def publish(messages):
+    """Publish (channel, event) messages once the current transaction commits"""
+    messages = list(messages)
+    if messages:
+        transaction.on_commit(lambda: get_broker().publish_many(messages))
+
+
+class TaskEventType(graphene.ObjectType):
+    kind = graphene.String()
+    task_id = graphene.Int()
+    project_id = graphene.Int()
+    task = graphene.Field(TaskType)
+
+
+class Subscription(graphene.ObjectType):
+    task_events = graphene.Field(TaskEventType, project_id=graphene.Int(required=True))
+    comment_added = graphene.Field(TaskCommentType, task_id=graphene.Int(required=True))
+
+    async def subscribe_task_events(root, info, project_id):
+        organization = info.context.organization
+        exists = await Project.objects.filter(
+            pk=project_id, organization=organization
+        ).aexists()
+        if not exists:
+            raise GraphQLError("Project not found")
+        async for event in get_broker().subscribe(task_channel(organization.pk, project_id)):
+            yield event
+
+    async def subscribe_comment_added(root, info, task_id):
+        organization = info.context.organization
+        exists = await Task.objects.filter(
+            pk=task_id, organization=organization
+        ).aexists()
+        if not exists:
+            raise GraphQLError("Task not found")
+        async for event in get_broker().subscribe(comment_channel(organization.pk, task_id)):
+            yield event
@@ -0,0 +1,901 @@
+import asyncio
+import contextvars
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from django.core.cache import caches
+from django.db import connection, connections
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from graphql import parse
+
+from core import routers
+from core.cache import organization_cache
+from core.counters import rebuild_counters
+from core.models import Organization, Project, SlowOperation, Task
+from . import documents, response_cache
+from .broker import get_broker
+from .schema import schema
+from .subscriptions import task_channel, task_event
+from .tracing import Trace
+from .views import metrics_label
+from .websockets import PROTOCOL, GraphQLWebSocketApp
+
+
+class GraphQLTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(
+            name="Acme", slug='acme', contact_email='admin@acme.example.com'
+        )
+        cls.project = Project.objects.create(organization=cls.organization, name="Website")
+
+    def setUp(self):
+        organization_cache.clear()
+
+    def execute(self, query, variables=None):
+        request = RequestFactory().post('/graphql/')
+        request.organization = None
+        result = schema.execute(query, variable_values=variables, context_value=request)
+        self.assertIsNone(result.errors)
+        return result.data
+
+    def count_queries(self, query, variables=None):
+        with CaptureQueriesContext(connection) as queries:
+            data = self.execute(query, variables)
+        return len(queries), data
+
+    def create_tasks(self, count, project=None, **fields):
+        project = project or self.project
+        return Task.objects.bulk_create(
+            Task(
+                organization_id=project.organization_id, project=project,
+                title=f"Task {index}", **fields
+            )
+            for index in range(count)
+        )
+
+
+class ProjectStatsLoaderTests(GraphQLTestCase):
+    """Project task counters are read with one query for every listed project"""
+
+    QUERIES = {
+        'organizations': '''{
+          organizations { projects { name taskCount completedTasks completionRate } }
+        }''',
+        'organization': '''{
+          organization(slug: "acme") { projects { name taskCount completedTasks completionRate } }
+        }''',
+        'projects': '''{
+          projects(organizationSlug: "acme") {
+            edges { node { name taskCount completedTasks completionRate } }
+          }
+        }''',
+    }
+
+    def test_query_count_is_constant(self):
+        # Not bulk_create(), which leaves the counters alone
+        for status in ('DONE', 'DONE', 'DONE', 'TODO'):
+            Task.objects.create(project=self.project, title="Task", status=status)
+        for field, query in self.QUERIES.items():
+            with self.subTest(field=field):
+                # Warm the organization cache
+                self.execute(query)
+                few, _ = self.count_queries(query)
+                Project.objects.bulk_create(
+                    Project(organization=self.organization, name=f"Project {index}")
+                    for index in range(10)
+                )
+                many, data = self.count_queries(query)
+                self.assertEqual(few, many)
+
+                if field == 'organizations':
+                    projects = [
+                        project for organization in data['organizations']
+                        for project in organization['projects']
+                    ]
+                elif field == 'organization':
+                    projects = data['organization']['projects']
+                else:
+                    projects = [edge['node'] for edge in data['projects']['edges']]
+                website = next(project for project in projects if project['name'] == "Website")
+                self.assertEqual(
+                    (website['taskCount'], website['completedTasks'], website['completionRate']),
+                    (4, 3, 75.0)
+                )
+
+    def test_organizations_query_count(self):
+        other = Organization.objects.create(
+            name="Other", slug='other', contact_email='admin@other.example.com'
+        )
+        for organization in (self.organization, other):
+            for index in range(3):
+                project = Project.objects.create(organization=organization, name=f"Project {index}")
+                Task.objects.create(project=project, title="Task", status='DONE')
+        # Organizations, their projects and the projects' counters
+        with self.assertNumQueries(3):
+            data = self.execute('{ organizations { projects { taskCount completedTasks } } }')
+        self.assertEqual(
+            [[project['taskCount'] for project in organization['projects']]
+             for organization in data['organizations']],
+            [[1, 1, 1], [1, 1, 1, 0]]
+        )
+
+
+class ProjectStatisticsTests(GraphQLTestCase):
+    QUERY = '''{
+      projectStatistics(organizationSlug: "acme") {
+        totalProjects totalTasks completedTasks completionRate
+        projectsByStatus { status count }
+        tasksByStatus { status count }
+      }
+    }'''
+
+    def test_single_query(self):
+        completed = Project.objects.create(
+            organization=self.organization, name="Launch", status='COMPLETED'
+        )
+        for project, status in ((self.project, 'DONE'), (self.project, 'TODO'), (completed, 'DONE')):
+            Task.objects.create(project=project, title="Task", status=status)
+        self.execute(self.QUERY)
+
+        queries, data = self.count_queries(self.QUERY)
+        self.assertEqual(queries, 1)
+        statistics = data['projectStatistics']
+        self.assertEqual(
+            (statistics['totalProjects'], statistics['totalTasks'],
+             statistics['completedTasks'], round(statistics['completionRate'])),
+            (2, 3, 2, 67)
+        )
+        projects_by_status = {item['status']: item['count'] for item in statistics['projectsByStatus']}
+        self.assertEqual((projects_by_status['ACTIVE'], projects_by_status['COMPLETED']), (1, 1))
+        tasks_by_status = {item['status']: item['count'] for item in statistics['tasksByStatus']}
+        self.assertEqual((tasks_by_status['DONE'], tasks_by_status['TODO']), (2, 1))
+
+    def test_without_projects(self):
+        self.project.delete()
+        statistics = self.execute(self.QUERY)['projectStatistics']
+        self.assertEqual((statistics['totalProjects'], statistics['totalTasks']), (0, 0))
+
+
+class QueryOptimizerTests(GraphQLTestCase):
+    """Nested selections are loaded with select_related/prefetch_related/only"""
+
+    def setUp(self):
+        super().setUp()
+        for index in range(3):
+            Task.objects.create(project=self.project, title=f"Task {index}", status='DONE')
+
+    def test_nested_selection(self):
+        query = '''{
+          project(id: %d) { name organization { name } tasks { title status dueDate } }
+        }''' % self.project.pk
+        # The project joined with its organization, then its tasks
+        with CaptureQueriesContext(connection) as queries, self.assertNumQueries(2):
+            data = self.execute(query)
+        project = data['project']
+        self.assertEqual((project['name'], project['organization']['name']), ("Website", "Acme"))
+        self.assertEqual(
+            [(task['title'], task['status']) for task in project['tasks']],
+            [(f"Task {index}", 'DONE') for index in (2, 1, 0)]
+        )
+        # Fields that were not selected are not loaded
+        self.assertNotIn('"core_project"."description"', queries[0]['sql'])
+        self.assertNotIn('"core_organization"."contact_email"', queries[0]['sql'])
+        self.assertNotIn('"core_task"."description"', queries[1]['sql'])
+
+    def test_fragments(self):
+        query = '''
+          query { task(id: %d) { ...TaskFields } }
+          fragment TaskFields on TaskType {
+            title
+            project { ... on ProjectType { name organization { slug } } }
+          }
+        ''' % Task.objects.first().pk
+        with self.assertNumQueries(1):
+            data = self.execute(query)
+        self.assertEqual(data['task']['project']['organization']['slug'], 'acme')
+
+
+class QueryCostTests(GraphQLTestCase):
+    """Operations are costed statically and rejected above the limits"""
+
+    def setUp(self):
+        super().setUp()
+        # Validation results are cached with the parsed documents
+        documents._document_cache = None
+        self.addCleanup(setattr, documents, '_document_cache', None)
+
+    def post(self, query):
+        return self.client.post('/graphql/', {'query': query}, content_type='application/json').json()
+
+    def test_accepted(self):
+        result = self.post('{ organizations { projects { name taskCount } } }')
+        self.assertNotIn('errors', result)
+        self.assertEqual(result['data']['organizations'][0]['projects'][0]['name'], "Website")
+        # organizations + 20 x (projects + 20 x taskCount)
+        self.assertEqual(
+            result['extensions']['cost'],
+            {'requested': 821, 'maximum': 5000, 'depth': 2, 'maxDepth': 8}
+        )
+
+    def test_page_size(self):
+        query = '{ projects(organizationSlug: "acme"%s) { edges { node { taskCount } } } }'
+        # projects + edges + page size x (node + taskCount)
+        self.assertEqual(self.post(query % ', first: 10')['extensions']['cost']['requested'], 32)
+        self.assertEqual(self.post(query % '')['extensions']['cost']['requested'], 302)
+
+    def test_too_complex(self):
+        with self.assertNumQueries(0):
+            result = self.post('{ organizations { projects { tasks { comments { content } } } } }')
+        self.assertNotIn('data', result)
+        self.assertEqual(result['errors'][0]['extensions']['code'], 'QUERY_TOO_COMPLEX')
+        self.assertEqual(result['errors'][0]['extensions']['cost'], 8421)
+
+    @override_settings(GRAPHQL_QUERY_LIMITS={'MAX_DEPTH': 2})
+    def test_too_deep(self):
+        result = self.post('{ organizations { projects { tasks { title } } } }')
+        self.assertEqual(result['errors'][0]['extensions']['code'], 'QUERY_TOO_DEEP')
+
+
+
+class PersistedQueryTests(GraphQLTestCase):
+    """Automatic persisted queries and the parsed document cache"""
+
+    QUERY = '{ organizations { name } }'
+
+    def setUp(self):
+        super().setUp()
+        documents._document_cache = documents._persisted_queries = None
+        self.addCleanup(setattr, documents, '_document_cache', None)
+        self.addCleanup(setattr, documents, '_persisted_queries', None)
+
+    def post(self, sha256, query=None):
+        data = {'extensions': {'persistedQuery': {'version': 1, 'sha256Hash': sha256}}}
+        if query is not None:
+            data['query'] = query
+        return self.client.post('/graphql/', data, content_type='application/json')
+
+    def test_unknown_hash(self):
+        response = self.post(documents.query_hash(self.QUERY))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['errors'][0]['message'], 'PersistedQueryNotFound')
+
+    def test_hash_mismatch(self):
+        response = self.post(documents.query_hash('{ organizations { id } }'), self.QUERY)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors'][0]['message'], 'provided sha does not match query')
+        # Nothing was registered under either hash
+        self.assertEqual(self.post(documents.query_hash(self.QUERY)).json()['errors'][0]['message'],
+                         'PersistedQueryNotFound')
+
+    def test_register_then_reuse(self):
+        sha256 = documents.query_hash(self.QUERY)
+        with mock.patch.object(documents, 'parse', wraps=documents.parse) as parse:
+            registered = self.post(sha256, self.QUERY).json()
+            reused = self.post(sha256).json()
+        self.assertEqual(registered['data'], {'organizations': [{'name': "Acme"}]})
+        self.assertEqual(reused['data'], registered['data'])
+        # The second request is served from the document cache
+        self.assertEqual(parse.call_count, 1)
+
+    @override_settings(GRAPHQL_PERSISTED_QUERIES={'MAX_SIZE': 10, 'ALIAS': 'default'})
+    def test_shared_between_workers(self):
+        self.addCleanup(caches['default'].clear)
+        sha256 = documents.query_hash(self.QUERY)
+        # Registered by another worker's store
+        self.assertTrue(documents.PersistedQueryStore(10, 'default').register(sha256, self.QUERY))
+        self.assertEqual(self.post(sha256).json()['data'], {'organizations': [{'name': "Acme"}]})
+
+    def test_document_cache_evicts_least_recently_used(self):
+        cache = documents.DocumentCache(max_size=2)
+        first = cache.get(schema.graphql_schema, '{ organizations { id } }')
+        second = cache.get(schema.graphql_schema, '{ organizations { name } }')
+        self.assertIs(cache.get(schema.graphql_schema, '{ organizations { id } }'), first)
+        cache.get(schema.graphql_schema, '{ organizations { slug } }')
+        self.assertIs(cache.get(schema.graphql_schema, '{ organizations { id } }'), first)
+        self.assertIsNot(cache.get(schema.graphql_schema, '{ organizations { name } }'), second)
+
+
+class KeysetPaginationTests(GraphQLTestCase):
+    """Paging a connection forward or backward visits every node once, in order"""
+
+    QUERY = '''query ($first: Int, $last: Int, $after: String, $before: String) {
+      projects(organizationSlug: "acme", first: $first, last: $last,
+               after: $after, before: $before) {
+        pageInfo { hasNextPage hasPreviousPage startCursor endCursor }
+        edges { node { name } }
+      }
+    }'''
+
+    def setUp(self):
+        super().setUp()
+        Project.objects.bulk_create(
+            Project(organization=self.organization, name=f"Project {index}") for index in range(6)
+        )
+        self.expected = list(
+            Project.objects.filter(organization=self.organization).values_list('name', flat=True)
+        )
+
+    def page(self, **variables):
+        projects = self.execute(self.QUERY, variables)['projects']
+        return [edge['node']['name'] for edge in projects['edges']], projects['pageInfo']
+
+    def test_forward(self):
+        seen, after = [], None
+        while True:
+            names, page_info = self.page(first=3, after=after)
+            seen += names
+            if not page_info['hasNextPage']:
+                break
+            after = page_info['endCursor']
+        self.assertEqual(seen, self.expected)
+
+    def test_backward(self):
+        seen, before = [], None
+        while True:
+            names, page_info = self.page(last=3, before=before)
+            seen = names + seen
+            if not page_info['hasPreviousPage']:
+                break
+            before = page_info['startCursor']
+        self.assertEqual(seen, self.expected)
+
+    def test_page_query_count(self):
+        _, page_info = self.page(first=2)
+        with self.assertNumQueries(1):
+            self.page(first=2, after=page_info['endCursor'])
+
+    def test_invalid_arguments(self):
+        request = RequestFactory().post('/graphql/')
+        request.organization = None
+        for variables, message in (
+            ({'after': 'not a cursor'}, "Invalid cursor"),
+            ({'first': -1}, "'first' must be between 0 and"),
+        ):
+            with self.subTest(**variables):
+                result = schema.execute(self.QUERY, variable_values=variables, context_value=request)
+                self.assertIn(message, result.errors[0].message)
+
+
+
+class TaskFilterTests(GraphQLTestCase):
+    """Organization-wide task filters, paged two at a time in either order"""
+
+    QUERY = '''query ($statuses: [String!], $assignee: String, $dueAfter: DateTime,
+                     $dueBefore: DateTime, $orderBy: TaskOrder, $after: String) {
+      tasks(organizationSlug: "acme", statuses: $statuses, assigneeEmail: $assignee,
+            dueAfter: $dueAfter, dueBefore: $dueBefore, orderBy: $orderBy,
+            first: 2, after: $after) {
+        pageInfo { hasNextPage endCursor }
+        edges { node { title } }
+      }
+    }'''
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        other_project = Project.objects.create(organization=cls.organization, name="Mobile")
+        statuses = ['TODO', 'IN_PROGRESS', 'DONE', 'BLOCKED']
+        start = datetime(2026, 3, 1, tzinfo=timezone.utc)
+        Task.objects.bulk_create(
+            Task(
+                organization=cls.organization, project=(cls.project, other_project)[index % 2],
+                title=f"Task {index}", status=statuses[index % 4],
+                assignee_email=('ann@acme.example.com', 'bob@acme.example.com')[index % 3 == 0],
+                # Undated tasks are interleaved with dated ones
+                due_date=None if index % 3 == 1 else start + timedelta(days=(index * 5) % 11),
+            )
+            for index in range(12)
+        )
+        other = Organization.objects.create(
+            name="Other", slug='other', contact_email='admin@other.example.com'
+        )
+        Task.objects.create(
+            project=Project.objects.create(organization=other, name="Intranet"),
+            title="Other task", assignee_email='ann@acme.example.com',
+        )
+
+    def titles(self, **variables):
+        """Every page of the tasks connection, following endCursor"""
+        seen, after = [], None
+        while True:
+            tasks = self.execute(self.QUERY, {**variables, 'after': after})['tasks']
+            self.assertLessEqual(len(tasks['edges']), 2)
+            seen += [edge['node']['title'] for edge in tasks['edges']]
+            if not tasks['pageInfo']['hasNextPage']:
+                return seen
+            after = tasks['pageInfo']['endCursor']
+
+    def expected(self, tasks):
+        return [task.title for task in tasks.filter(organization=self.organization)]
+
+    def test_statuses(self):
+        self.assertEqual(
+            self.titles(statuses=['TODO', 'BLOCKED']),
+            self.expected(Task.objects.filter(status__in=['TODO', 'BLOCKED'])),
+        )
+        self.assertEqual(self.titles(statuses=[]), [])
+
+    def test_assignee(self):
+        titles = self.titles(assignee='ann@acme.example.com')
+        self.assertEqual(titles, self.expected(Task.objects.filter(assignee_email='ann@acme.example.com')))
+        self.assertNotIn("Other task", titles)
+
+    def test_due_window(self):
+        titles = self.titles(dueAfter='2026-03-03T00:00:00+00:00', dueBefore='2026-03-08T00:00:00+00:00')
+        self.assertEqual(titles, self.expected(Task.objects.filter(
+            due_date__gte=datetime(2026, 3, 3, tzinfo=timezone.utc),
+            due_date__lt=datetime(2026, 3, 8, tzinfo=timezone.utc),
+        )))
+        self.assertTrue(titles)
+
+    def test_due_date_order_puts_undated_tasks_last(self):
+        tasks = Task.objects.filter(organization=self.organization)
+        dated = sorted(
+            (task for task in tasks if task.due_date is not None), key=lambda task: (task.due_date, task.pk)
+        )
+        undated = sorted((task for task in tasks if task.due_date is None), key=lambda task: task.pk)
+        self.assertEqual(self.titles(orderBy='DUE_DATE'), [task.title for task in dated + undated])
+        self.assertEqual(
+            self.titles(orderBy='DUE_DATE', statuses=['TODO', 'IN_PROGRESS'], assignee='bob@acme.example.com'),
+            [task.title for task in dated + undated
+             if task.status in ('TODO', 'IN_PROGRESS') and task.assignee_email == 'bob@acme.example.com'],
+        )
+
+
+@override_settings(GRAPHQL_RESPONSE_CACHE={'ENABLED': True, 'BACKEND': 'local'})
+class ResponseCacheTests(GraphQLTestCase):
+    """Cached query results are dropped once a mutation changes what they read"""
+
+    def setUp(self):
+        super().setUp()
+        response_cache._response_cache = None
+        self.addCleanup(setattr, response_cache, '_response_cache', None)
+
+    def post(self, query, variables=None):
+        response = self.client.post(
+            '/graphql/', {'query': query, 'variables': variables or {}},
+            content_type='application/json'
+        )
+        self.assertNotIn('errors', response.json())
+        return response
+
+    def test_mutation_invalidates_cached_query(self):
+        query = '{ project(id: %d) { name taskCount } }' % self.project.pk
+        self.assertEqual(self.post(query)['X-GraphQL-Cache'], 'MISS')
+        response = self.post(query)
+        self.assertEqual(response['X-GraphQL-Cache'], 'HIT')
+        self.assertEqual(response.json()['data']['project']['taskCount'], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post(
+                'mutation ($projectId: Int!) { createTask(projectId: $projectId, title: "New") { success } }',
+                {'projectId': self.project.pk}
+            )
+
+        response = self.post(query)
+        self.assertEqual(response['X-GraphQL-Cache'], 'MISS')
+        self.assertEqual(response.json()['data']['project']['taskCount'], 1)
+
+    def test_cache_is_per_tenant(self):
+        query = '{ project(id: %d) { name } }' % self.project.pk
+        self.post(query)
+        response = self.client.post(
+            '/graphql/', {'query': query}, content_type='application/json',
+            HTTP_X_ORGANIZATION_SLUG='acme'
+        )
+        self.assertEqual(response['X-GraphQL-Cache'], 'MISS')
+
+    def test_events_are_exported(self):
+        query = '{ project(id: %d) { name } }' % self.project.pk
+        self.post(query)
+        self.post(query)
+        output = self.client.get('/metrics').content.decode()
+        self.assertIn('graphql_response_cache_events_total{event="hit"} 1', output)
+        self.assertIn('graphql_response_cache_events_total{event="miss"} 1', output)
+        self.assertIn('graphql_response_cache_events_total{event="store"} 1', output)
+
+
+class BulkMutationTests(GraphQLTestCase):
+    """
+    The bulk mutations run a fixed number of queries whatever the batch
+    size, report the items they skip and keep the task counters exact
+    """
+
+    CREATE = '''mutation ($projectId: Int!, $tasks: [TaskInput!]!) {
+      bulkCreateTasks(projectId: $projectId, tasks: $tasks) { success createdCount }
+    }'''
+    UPDATE = '''mutation ($tasks: [TaskUpdateInput!]!) {
+      bulkUpdateTasks(tasks: $tasks) { success updatedCount }
+    }'''
+    DELETE = '''mutation ($ids: [Int!]!) {
+      bulkDeleteTasks(ids: $ids) { success deletedCount results { id success message } }
+    }'''
+
+    def create(self, count):
+        tasks = [{'title': f"Bulk {index}", 'status': 'DONE'} for index in range(count)]
+        queries, data = self.count_queries(self.CREATE, {'projectId': self.project.pk, 'tasks': tasks})
+        self.assertEqual(data['bulkCreateTasks']['createdCount'], count)
+        return queries
+
+    def assertCountersExact(self):
+        organization = Organization.objects.get(pk=self.organization.pk)
+        self.assertEqual(rebuild_counters(organization, dry_run=True), [])
+
+    def test_create_query_count_is_constant(self):
+        self.assertEqual(self.create(5), self.create(50))
+        self.assertCountersExact()
+
+    def test_update_query_count_is_constant(self):
+        def update(count):
+            tasks = [Task.objects.create(project=self.project, title="Task") for _ in range(count)]
+            items = [{'id': task.pk, 'status': 'DONE', 'title': "Renamed"} for task in tasks]
+            queries, data = self.count_queries(self.UPDATE, {'tasks': items})
+            self.assertEqual(data['bulkUpdateTasks']['updatedCount'], count)
+            return queries
+
+        self.assertEqual(update(5), update(40))
+        self.assertCountersExact()
+
+    def test_delete_query_count_is_constant(self):
+        def delete(count):
+            ids = [Task.objects.create(project=self.project, title="Task").pk for _ in range(count)]
+            queries, data = self.count_queries(self.DELETE, {'ids': ids})
+            self.assertEqual(data['bulkDeleteTasks']['deletedCount'], count)
+            return queries
+
+        self.assertEqual(delete(5), delete(40))
+        self.assertCountersExact()
+
+    def test_delete_reads_the_tasks_once(self):
+        ids = [Task.objects.create(project=self.project, title="Task").pk for _ in range(3)]
+        with CaptureQueriesContext(connection) as queries:
+            self.execute(self.DELETE, {'ids': ids})
+        reads = [
+            query['sql'] for query in queries
+            if query['sql'].startswith('SELECT') and 'FROM "core_task"' in query['sql']
+        ]
+        # The locking read and the collector's, no second locking read
+        self.assertEqual(len(reads), 2)
+
+    def test_delete_reports_unknown_ids(self):
+        task = Task.objects.create(project=self.project, title="Task")
+        data = self.execute(self.DELETE, {'ids': [task.pk, 0]})['bulkDeleteTasks']
+        self.assertEqual(data['deletedCount'], 1)
+        self.assertEqual(
+            [(result['success'], result['message']) for result in data['results']],
+            [(True, "Task deleted successfully"), (False, "Task not found")]
+        )
+        self.assertCountersExact()
+
+
+@override_settings(DATABASE_ROUTING={'REPLICAS': ['replica'], 'STICKY_SECONDS': 5, 'STICKY_ALIAS': None})
+class ReplicaRoutingTests(GraphQLTestCase):
+    """Queries read from a replica; a tenant that wrote stays on the primary"""
+
+    QUERY = '{ projects(organizationSlug: "acme") { edges { node { name } } } }'
+    MUTATION = '''mutation ($projectId: Int!) {
+      createTask(projectId: $projectId, title: "Launch") { task { id } }
+    }'''
+
+    def setUp(self):
+        super().setUp()
+        primary = connections['default']
+        primary.ensure_connection()
+        replica = primary.__class__(dict(primary.settings_dict), alias='replica')
+        # Reading the primary's DB-API connection (and its open test
+        # transaction) through a separate alias stands in for replication
+        replica.connection = primary.connection
+        connections['replica'] = replica
+        self.addCleanup(self.remove_replica, replica)
+        patcher = mock.patch.object(routers, 'sticky_tenants', routers.StickyTenants())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def remove_replica(self, replica):
+        replica.connection = None
+        del connections['replica']
+
+    def post(self, query, variables=None):
+        """Return the response data and the SQL run on the primary and the replica"""
+        with CaptureQueriesContext(connections['default']) as primary:
+            with CaptureQueriesContext(connections['replica']) as replica:
+                response = self.client.post(
+                    '/graphql/', {'query': query, 'variables': variables or {}},
+                    content_type='application/json', HTTP_X_ORGANIZATION_SLUG='acme',
+                )
+        self.assertNotIn('errors', response.json())
+        return response.json()['data'], [q['sql'] for q in primary], [q['sql'] for q in replica]
+
+    def test_queries_read_from_the_replica(self):
+        data, primary, replica = self.post(self.QUERY)
+        self.assertEqual(data['projects']['edges'], [{'node': {'name': "Website"}}])
+        self.assertTrue(any('"core_project"' in sql for sql in replica))
+        self.assertFalse(any('"core_project"' in sql for sql in primary))
+
+    def test_writes_go_to_the_primary_and_stick_for_a_while(self):
+        _, primary, replica = self.post(self.MUTATION, {'projectId': self.project.pk})
+        self.assertTrue(any(sql.startswith('INSERT INTO "core_task"') for sql in primary))
+        self.assertFalse(any(sql.startswith(('INSERT', 'UPDATE', 'DELETE')) for sql in replica))
+
+        # The tenant reads its own write from the primary
+        _, primary, replica = self.post(self.QUERY)
+        self.assertTrue(any('"core_project"' in sql for sql in primary))
+        self.assertEqual(replica, [])
+
+        # Until the sticky window has passed
+        later = time.time() + 6
+        with mock.patch.object(routers.time, 'time', return_value=later):
+            _, primary, replica = self.post(self.QUERY)
+        self.assertTrue(any('"core_project"' in sql for sql in replica))
+
+    def test_other_tenants_are_not_sticky(self):
+        routers.mark_written('other')
+        _, _, replica = self.post(self.QUERY)
+        self.assertTrue(any('"core_project"' in sql for sql in replica))
+
+
+class BatchTests(GraphQLTestCase):
+    """A JSON array of operations is executed in order, each with its own result"""
+
+    TASKS = '''query ($projectId: Int!) {
+      project(id: $projectId) { taskCount }
+      tasks(projectId: $projectId) { edges { node { title } } }
+    }'''
+    CREATE = '''mutation ($projectId: Int!) {
+      createTask(projectId: $projectId, title: "Launch") { task { title } }
+    }'''
+
+    def post(self, batch):
+        return self.client.post(
+            '/graphql/', batch, content_type='application/json', HTTP_X_ORGANIZATION_SLUG='acme'
+        )
+
+    @override_settings(GRAPHQL_BATCH={'MAX_OPERATIONS': 2})
+    def test_size_limit(self):
+        entry = {'query': '{ organizations { name } }'}
+        self.assertEqual(self.post([entry, entry]).status_code, 200)
+        response = self.post([entry, entry, entry])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors'][0]['message'], "A batch may contain at most 2 operations.")
+        self.assertEqual(self.post([]).status_code, 400)
+
+    @override_settings(GRAPHQL_BATCH={'MAX_OPERATIONS': 0})
+    def test_disabled(self):
+        response = self.post([{'query': '{ organizations { name } }'}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors'][0]['message'], "Batched operations are disabled.")
+
+    def test_queries_and_mutations(self):
+        variables = {'projectId': self.project.pk}
+        results = self.post([
+            {'query': self.TASKS, 'variables': variables},
+            {'query': self.CREATE, 'variables': variables},
+            {'query': self.TASKS, 'variables': variables},
+        ]).json()
+        self.assertEqual(
+            [result['data'] for result in results],
+            [
+                {'project': {'taskCount': 0}, 'tasks': {'edges': []}},
+                {'createTask': {'task': {'title': "Launch"}}},
+                # Later operations see the mutation, counters included
+                {'project': {'taskCount': 1}, 'tasks': {'edges': [{'node': {'title': "Launch"}}]}},
+            ],
+        )
+
+    def test_errors_are_reported_per_entry(self):
+        response = self.post([
+            {'query': '{ organizations { name } }'},
+            {'query': '{ organizations { '},
+            {'query': '{ organizations { unknownField } }'},
+            {'extensions': {'persistedQuery': {'version': 1, 'sha256Hash': 'f' * 64}}},
+            {'query': self.CREATE},
+            {'query': '{ organizations { slug } }'},
+        ])
+        self.assertEqual(response.status_code, 200)
+        results = response.json()
+        self.assertEqual(results[0]['data'], {'organizations': [{'name': "Acme"}]})
+        self.assertIn("Syntax Error", results[1]['errors'][0]['message'])
+        self.assertIn("unknownField", results[2]['errors'][0]['message'])
+        self.assertEqual(results[3]['errors'][0]['message'], 'PersistedQueryNotFound')
+        self.assertIn("$projectId", results[4]['errors'][0]['message'])
+        self.assertEqual(results[5]['data'], {'organizations': [{'slug': 'acme'}]})
+
+
+@override_settings(GRAPHQL_SLOW_OPERATIONS={
+    'THRESHOLD_MS': 20, 'STATEMENTS': 5, 'EXPLAIN': True, 'ANALYZE': False, 'STORE': ['table'],
+})
+class SlowOperationTests(GraphQLTestCase):
+    QUERY = '''query Board($projectId: Int!) {
+      tasks(projectId: $projectId) { edges { node { title } } }
+    }'''
+
+    def post(self, delay):
+        """Run QUERY with every statement on core_task slowed down by ``delay`` seconds"""
+        def slow_tasks(execute, sql, params, many, context):
+            if '"core_task"' in sql and not sql.startswith('EXPLAIN'):
+                time.sleep(delay)
+            return execute(sql, params, many, context)
+
+        with CaptureQueriesContext(connection) as queries, connection.execute_wrapper(slow_tasks):
+            response = self.client.post(
+                '/graphql/',
+                {'query': self.QUERY, 'operationName': 'Board', 'variables': {'projectId': self.project.pk}},
+                content_type='application/json',
+            )
+        self.assertNotIn('errors', response.json())
+        return [query['sql'] for query in queries]
+
+    def test_slow_operation_is_recorded_with_its_slowest_statement(self):
+        self.create_tasks(2)
+        executed = self.post(0.03)
+        operation = SlowOperation.objects.get()
+        self.assertEqual((operation.operation_name, operation.operation_type), ('Board', 'query'))
+        self.assertEqual(operation.variables, {'projectId': 'int'})
+        self.assertGreaterEqual(operation.duration, 20)
+
+        slowest = operation.statements[0]
+        self.assertIn('"core_task"', slowest['sql'])
+        self.assertGreaterEqual(slowest['duration'], 30)
+        self.assertIn('core_task', slowest['plan'])
+
+        # The EXPLAINs run for the record (and its INSERT) are not counted
+        explains = [sql for sql in executed if sql.startswith('EXPLAIN')]
+        self.assertEqual(len(explains), len(operation.statements))
+        operation_sql = [
+            sql for sql in executed if not sql.startswith('EXPLAIN') and '"core_slowoperation"' not in sql
+        ]
+        self.assertEqual(operation.sql_count, len(operation_sql))
+        self.assertFalse(any(statement['sql'].startswith('EXPLAIN') for statement in operation.statements))
+
+    def test_fast_operation_is_not_recorded(self):
+        executed = self.post(0)
+        self.assertFalse(SlowOperation.objects.exists())
+        self.assertFalse(any(sql.startswith('EXPLAIN') for sql in executed))
+
+
+class MetricsLabelTests(GraphQLTestCase):
+    """Operation metrics are labelled by schema root fields, not by client names"""
+
+    def label(self, query):
+        operation = parse(query).definitions[0]
+        root_fields = [(None, selection.name.value) for selection in operation.selection_set.selections]
+        return metrics_label(schema.graphql_schema, operation.operation, root_fields)
+
+    def test_labels(self):
+        self.assertEqual(self.label('query Dashboard1234 { organizations { id } }'), 'organizations')
+        self.assertEqual(self.label('{ a: project(id: 1) { id } b: project(id: 2) { id } }'), 'project')
+        self.assertEqual(self.label('{ organizations { id } project(id: 1) { id } }'), 'multiple')
+        self.assertEqual(self.label('{ __schema { queryType { name } } }'), 'other')
+        self.assertEqual(self.label('mutation { deleteTask(id: 1) { success } }'), 'deleteTask')
+
+
+class TraceIsolationTests(GraphQLTestCase):
+    """A trace only counts the SQL run in the context of its operation"""
+
+    def test_statements_of_other_contexts_are_not_counted(self):
+        context = contextvars.copy_context()
+        trace = context.run(Trace)
+        context.run(lambda: list(Project.objects.all()))
+        list(Project.objects.all())
+        context.run(trace.finish)
+        list(Project.objects.all())
+        self.assertEqual(trace.sql_count, 1)
+
+
+class TenantMismatchTests(GraphQLTestCase):
+    QUERY = '''query ($slug: String!) {
+      projects(organizationSlug: $slug) { edges { node { name } } }
+    }'''
+
+    def post(self, slug):
+        return self.client.post(
+            '/graphql/', {'query': self.QUERY, 'variables': {'slug': slug}},
+            content_type='application/json', HTTP_X_ORGANIZATION_SLUG='acme'
+        ).json()
+
+    def test_active_tenant(self):
+        edges = self.post('acme')['data']['projects']['edges']
+        self.assertEqual([edge['node']['name'] for edge in edges], ["Website"])
+
+    def test_other_organization_is_rejected(self):
+        Organization.objects.create(name="Other", slug='other', contact_email='admin@other.example.com')
+        result = self.post('other')
+        self.assertIsNone(result['data']['projects'])
+        self.assertIn("does not match", result['errors'][0]['message'])
+
+
+class WebSocketClient:
+    """Drives GraphQLWebSocketApp through the ASGI interface"""
+
+    def __init__(self, organization_slug):
+        self.organization_slug = organization_slug
+        self.incoming = asyncio.Queue()
+        self.outgoing = asyncio.Queue()
+        scope = {'type': 'websocket', 'path': '/graphql/', 'subprotocols': [PROTOCOL], 'headers': []}
+        self.app = asyncio.ensure_future(
+            GraphQLWebSocketApp(schema)(scope, self.incoming.get, self.outgoing.put)
+        )
+
+    async def connect(self):
+        await self.incoming.put({'type': 'websocket.connect'})
+        assert (await self.outgoing.get())['type'] == 'websocket.accept'
+        await self.send({'type': 'connection_init', 'payload': {'organizationSlug': self.organization_slug}})
+        return await self.receive()
+
+    async def send(self, message):
+        await self.incoming.put({'type': 'websocket.receive', 'text': json.dumps(message)})
+
+    async def receive(self):
+        message = await asyncio.wait_for(self.outgoing.get(), timeout=5)
+        return json.loads(message['text']) if 'text' in message else message
+
+    async def close(self):
+        await self.incoming.put({'type': 'websocket.disconnect'})
+        await asyncio.wait_for(self.app, timeout=5)
+
+
+class SubscriptionTests(GraphQLTestCase):
+    SUBSCRIPTION = '''subscription ($projectId: Int!) {
+      taskEvents(projectId: $projectId) { kind taskId task { title } }
+    }'''
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.other = Organization.objects.create(
+            name="Other", slug='other', contact_email='admin@other.example.com'
+        )
+        cls.other_project = Project.objects.create(organization=cls.other, name="Intranet")
+
+    async def subscribe(self, client, project_id):
+        await client.send({
+            'id': '1', 'type': 'subscribe',
+            'payload': {'query': self.SUBSCRIPTION, 'variables': {'projectId': project_id}},
+        })
+        # The subscriber is registered once the project check has run
+        for _ in range(100):
+            if get_broker()._subscribers.get(task_channel(self.organization.pk, project_id)):
+                return
+            await asyncio.sleep(0.01)
+
+    async def test_subscriber_receives_events_of_its_tenant(self):
+        client = WebSocketClient('acme')
+        self.assertEqual(await client.connect(), {'type': 'connection_ack'})
+        await self.subscribe(client, self.project.pk)
+        task = await Task.objects.acreate(project=self.project, title="Launch")
+
+        # Another tenant's event for a project with the same id is not delivered
+        get_broker().publish_many([
+            task_event('CREATED', self.other.pk, self.project.pk, task.pk, task),
+            task_event('CREATED', self.organization.pk, self.project.pk, task.pk, task),
+        ])
+        message = await client.receive()
+        self.assertEqual(message, {'id': '1', 'type': 'next', 'payload': {'data': {'taskEvents': {
+            'kind': 'CREATED', 'taskId': task.pk, 'task': {'title': "Launch"},
+        }}}})
+        await client.send({'id': '1', 'type': 'complete'})
+        await client.close()
+        self.assertTrue(client.outgoing.empty())
+
+    async def test_other_tenants_projects_cannot_be_subscribed_to(self):
+        client = WebSocketClient('acme')
+        await client.connect()
+        await client.send({
+            'id': '1', 'type': 'subscribe',
+            'payload': {'query': self.SUBSCRIPTION, 'variables': {'projectId': self.other_project.pk}},
+        })
+        message = await client.receive()
+        self.assertEqual(message['type'], 'next')
+        self.assertEqual(message['payload']['errors'][0]['message'], "Project not found")
+        self.assertEqual(await client.receive(), {'id': '1', 'type': 'complete'})
+        await client.close()
+
+    async def test_unknown_organization_is_refused(self):
+        client = WebSocketClient('missing')
+        message = await client.connect()
+        self.assertEqual((message['type'], message['code']), ('websocket.close', 4403))
+        await client.close()
@@ -0,0 +1,158 @@
+import random
+import threading
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+# Trace of the operation executed in the current context
+_current_trace = ContextVar('graphql_trace', default=None)
+# Statistics of the field being resolved in the current thread/task
+_current_field = ContextVar('graphql_tracing_field', default=None)
+
+
+def get_options():
+    options = getattr(settings, 'GRAPHQL_TRACING', {})
+    return {
+        'SAMPLE_RATE': options.get('SAMPLE_RATE', 0.0),
+    }
+
+
+def should_trace():
+    rate = get_options()['SAMPLE_RATE']
+    return rate > 0 and (rate >= 1 or random.random() < rate)
+
+
+class FieldStats:
+    __slots__ = ('path', 'parent_type', 'field_name', 'count', 'duration', 'sql_count', 'sql_duration')
+
+    def __init__(self, path, parent_type, field_name):
+        self.path = path
+        self.parent_type = parent_type
+        self.field_name = field_name
+        self.count = 0
+        self.duration = 0
+        self.sql_count = 0
+        self.sql_duration = 0
+
+    def as_dict(self):
+        return {
+            'path': self.path,
+            'parentType': self.parent_type,
+            'fieldName': self.field_name,
+            'count': self.count,
+            'duration': round(self.duration / 1e6, 3),
+            'sqlCount': self.sql_count,
+            'sqlDuration': round(self.sql_duration / 1e6, 3),
+        }
+
+
+class Trace:
+    """
+    Timings of one sampled operation, aggregated per field path with list
+    indices left out (``projects.edges.node.taskCount``), so its size
+    depends on the document and not on the number of objects returned.
+
+    The trace is current in the context that created it until finish().
+    SQL statements run in that context, including by the worker threads it
+    starts, are timed by an execute wrapper installed once on every
+    connection (time_statement), and attributed to the field that started
+    last in that thread: a lazy QuerySet returned by a resolver is
+    evaluated right after it, before any other field starts. Statements of
+    other requests sharing a worker thread's connection are not seen.
+    """
+
+    def __init__(self):
+        self.started_at = datetime.now(timezone.utc)
+        self.started = time.perf_counter_ns()
+        self.duration = None
+        self.fields = {}
+        self.sql_count = 0
+        self.sql_duration = 0
+        self._lock = threading.Lock()
+        self.token = _current_trace.set(self)
+
+    def field(self, info):
+        path = '.'.join(str(key) for key in info.path.as_list() if not isinstance(key, int))
+        stats = self.fields.get(path)
+        if stats is None:
+            with self._lock:
+                stats = self.fields.setdefault(
+                    path, FieldStats(path, info.parent_type.name, info.field_name)
+                )
+        return stats
+
+    def execute(self, execute, sql, params, many, context):
+        start = time.perf_counter_ns()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter_ns() - start
+            stats = _current_field.get()
+            with self._lock:
+                self.sql_count += 1
+                self.sql_duration += elapsed
+                # Ignore the field left current by an earlier operation
+                if stats is not None and self.fields.get(stats.path) is stats:
+                    stats.sql_count += 1
+                    stats.sql_duration += elapsed
+
+    def finish(self):
+        if self.duration is None:
+            self.duration = time.perf_counter_ns() - self.started
+            _current_trace.reset(self.token)
+
+    def as_dict(self):
+        return {
+            'startTime': self.started_at.isoformat(),
+            'duration': round(self.duration / 1e6, 3),
+            'sql': {
+                'count': self.sql_count,
+                'duration': round(self.sql_duration / 1e6, 3),
+            },
+            'resolvers': [
+                stats.as_dict()
+                for stats in sorted(self.fields.values(), key=lambda stats: -stats.duration)
+            ],
+        }
+
+
+class TracingMiddleware:
+    """
+    Graphene middleware recording the wall time and SQL of every resolver
+    of a traced operation. GraphQLView only adds it to the operations
+    picked by GRAPHQL_TRACING['SAMPLE_RATE'] (see should_trace), so
+    untraced requests pay nothing.
+    """
+
+    def resolve(self, next, root, info, **args):
+        trace = info.context.graphql_trace
+        stats = trace.field(info)
+        # Not reset afterwards: SQL run while the returned value is
+        # completed belongs to this field
+        _current_field.set(stats)
+        start = time.perf_counter_ns()
+        try:
+            return next(root, info, **args)
+        finally:
+            elapsed = time.perf_counter_ns() - start
+            with trace._lock:
+                stats.count += 1
+                stats.duration += elapsed
+
+
+def time_statement(execute, sql, params, many, context):
+    trace = _current_trace.get()
+    if trace is None:
+        return execute(sql, params, many, context)
+    return trace.execute(execute, sql, params, many, context)
+
+
+def on_connection_created(sender, connection, **kwargs):
+    if time_statement not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_statement)
+
+
+connection_created.connect(on_connection_created, dispatch_uid='api.tracing')
@@ -3,10 +3,93 @@ from graphene_django import DjangoObjectType
 from core.models import Organization, Project, Task, TaskComment
 
 
+class ProjectStats:
+    """Task counters for a single project"""
+    def __init__(self, task_count=0, completed_tasks=0):
+        self.task_count = task_count
+        self.completed_tasks = completed_tasks
+
+    @property
+    def completion_rate(self):
+        if self.task_count == 0:
+            return 0
+        return (self.completed_tasks / self.task_count) * 100
+
+
+class ProjectStatsLoader:
+    """
+    Per-request batching of project task counters, keyed by project id.
+    List resolvers prime the loader with every project they return, and the
+    first field that needs counters reads the materialized counter columns
+    of all pending keys with a single query.
+    """
+
+    def __init__(self):
+        self._cache = {}
+        self._pending = set()
+
+    def prime(self, projects):
+        projects = list(projects)
+        self._pending.update(
+            project.id for project in projects if project.id not in self._cache
+        )
+        return projects
+
+    def load(self, project_id):
+        if project_id not in self._cache:
+            self._pending.add(project_id)
+            self._dispatch()
+        return self._cache[project_id]
+
+    def _dispatch(self):
+        keys, self._pending = self._pending, set()
+        rows = Project.objects.filter(pk__in=keys).values_list(
+            'pk', 'tasks_total', 'tasks_done'
+        )
+        for key in keys:
+            self._cache[key] = ProjectStats()
+        for pk, task_count, completed_tasks in rows:
+            self._cache[pk] = ProjectStats(
+                task_count=task_count,
+                completed_tasks=completed_tasks,
+            )
+
+
+def get_loader(info, name, loader_class):
+    """Return the loader stored on the request, creating it on first use"""
+    context = info.context
+    if context is None:
+        return loader_class()
+    # The operations of a batch share the loaders of their HTTP request
+    context = getattr(context, 'request', context)
+    attr = f'_{name}_loader'
+    loader = getattr(context, attr, None)
+    if loader is None:
+        loader = loader_class()
+        setattr(context, attr, loader)
+    return loader
+
+
+def clear_loaders(context):
+    """Drop the loaders of the request, e.g. after a mutation changed their data"""
+    context = getattr(context, 'request', context)
+    loaders = [attr for attr in vars(context) if attr.startswith('_') and attr.endswith('_loader')]
+    for attr in loaders:
+        delattr(context, attr)
+
+
+def get_project_stats_loader(info):
+    return get_loader(info, 'project_stats', ProjectStatsLoader)
+
+
 class OrganizationType(DjangoObjectType):
     class Meta:
         model = Organization
-        fields = '__all__'
+        # The denormalized reverse relations would be unpaginated lists
+        exclude = ('tasks', 'task_comments')
+
+    def resolve_projects(self, info):
+        return get_project_stats_loader(info).prime(self.projects.all())
 
 
 class ProjectType(DjangoObjectType):
@@ -19,13 +102,13 @@ class ProjectType(DjangoObjectType):
         fields = '__all__'
     
     def resolve_task_count(self, info):
-        return self.task_count
+        return get_project_stats_loader(info).load(self.id).task_count
     
     def resolve_completed_tasks(self, info):
-        return self.completed_tasks
+        return get_project_stats_loader(info).load(self.id).completed_tasks
     
     def resolve_completion_rate(self, info):
-        return self.completion_rate
+        return get_project_stats_loader(info).load(self.id).completion_rate
 
 
 class TaskType(DjangoObjectType):
@@ -38,3 +121,18 @@ class TaskCommentType(DjangoObjectType):
     class Meta:
         model = TaskComment
         fields = '__all__'
+
+
+class ProjectConnection(graphene.relay.Connection):
+    class Meta:
+        node = ProjectType
+
+
+class TaskConnection(graphene.relay.Connection):
+    class Meta:
+        node = TaskType
+
+
+class TaskCommentConnection(graphene.relay.Connection):
+    class Meta:
+        node = TaskCommentType
@@ -0,0 +1,458 @@
+import json
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseNotAllowed
+from graphene_django.constants import MUTATION_ERRORS_FLAG
+from graphene_django.settings import graphene_settings
+from graphene_django.utils.utils import set_rollback
+from graphene_django.views import GraphQLView as BaseGraphQLView, HttpError
+from graphql import (
+    ExecutionResult,
+    FieldNode,
+    OperationType,
+    execute,
+    get_operation_ast,
+    specified_rules,
+    validate_schema,
+)
+
+from core import metrics
+from core.routers import mark_written, read_from_replicas
+from .documents import get_document_cache, get_persisted_queries
+from .query_cost import QueryCostRule, get_limits
+from .response_cache import CacheTagMiddleware, get_response_cache
+from .slow_operations import SlowOperationRecorder
+from .tracing import Trace, TracingMiddleware, should_trace
+from .types import clear_loaders
+
+
+def get_batch_options():
+    options = getattr(settings, 'GRAPHQL_BATCH', {})
+    return {
+        'MAX_OPERATIONS': options.get('MAX_OPERATIONS', 10),
+    }
+
+
+class PreparedOperation:
+    """A validated operation on its way to execution"""
+
+    def __init__(self, document, operation_type, variables, operation_name, extensions):
+        self.document = document
+        self.operation_type = operation_type
+        self.variables = variables
+        self.operation_name = operation_name
+        self.extensions = extensions
+        self.cache = None
+        self.cache_key = None
+        self.started = None
+        self.trace = None
+        self.timer = time.perf_counter()
+        # The ``operation`` label of the metrics (see metrics_label)
+        self.label = 'other'
+        # (response key, field name) of the root fields
+        self.root_fields = []
+
+
+def metrics_label(schema, operation_type, root_fields):
+    """
+    Label an operation's metrics by its root field rather than by the
+    client-chosen operation name, so that the number of series is bounded
+    by the schema: the field name when every root field is the same schema
+    field, 'multiple' for several and 'other' for anything else.
+    """
+    names = {name for _, name in root_fields}
+    if len(names) > 1:
+        return 'multiple'
+    root_type = schema.get_root_type(operation_type) if operation_type else None
+    if root_type is not None and len(names) == 1:
+        name = names.pop()
+        if name in root_type.fields:
+            return name
+    return 'other'
+
+
+class ResolverMetricsMiddleware:
+    """
+    Graphene middleware timing the resolvers of root fields in
+    graphql_resolver_duration_seconds, labelled ``<root type>.<field>``.
+    Nested fields are passed through untimed to keep the overhead per
+    resolved object negligible.
+    """
+
+    def resolve(self, next, root, info, **args):
+        if info.path.prev is not None:
+            return next(root, info, **args)
+        field = f'{info.parent_type.name}.{info.field_name}'
+        with metrics.graphql_resolver_duration.time(field=field):
+            return next(root, info, **args)
+
+
+class BatchOperationContext:
+    """
+    The request as seen by one operation of a batch. Attributes set while
+    the operation runs (cache status and tags, trace, mutation error flag)
+    stay on it; everything else, including the tenant and the loaders (see
+    api.types.get_loader), is read from the shared HTTP request.
+    """
+
+    def __init__(self, request):
+        self.request = request
+
+    def __getattr__(self, name):
+        return getattr(self.request, name)
+
+
+class GraphQLView(BaseGraphQLView):
+    """
+    GraphQLView with:
+
+    - automatic persisted queries: clients may send
+      ``extensions.persistedQuery.sha256Hash`` instead of the query text
+    - a bounded cache of parsed and validated documents (api.documents)
+    - the read-only response cache (api.response_cache) when enabled
+    - depth and cost limits (api.query_cost), with the cost of every
+      executed operation reported in the response extensions
+    - queries read from the database replicas, mutations keep the tenant
+      on the primary for a short while (core.routers)
+    - per-resolver timings and SQL counts in ``extensions.tracing`` for a
+      sample of the operations (api.tracing)
+    - operations slower than a threshold logged with their slowest SQL
+      statements and plans (api.slow_operations)
+    - operation latencies and mutation errors recorded in core.metrics
+    - transport-level batching: a JSON array of operations POSTed in one
+      request is answered with the array of their results
+    """
+
+    cache_tag_middleware = CacheTagMiddleware()
+    resolver_metrics_middleware = ResolverMetricsMiddleware()
+    tracing_middleware = TracingMiddleware()
+    validation_rules = (*specified_rules, QueryCostRule)
+
+    def dispatch(self, request, *args, **kwargs):
+        response = super().dispatch(request, *args, **kwargs)
+        cache_status = getattr(request, 'graphql_cache_status', None)
+        if cache_status:
+            response['X-GraphQL-Cache'] = cache_status
+        return response
+
+    def get_middleware(self, request):
+        middleware = super().get_middleware(request)
+        if getattr(request, 'graphql_cache_tags', None) is not None:
+            middleware = [*(middleware or []), self.cache_tag_middleware]
+        if getattr(request, 'graphql_trace', None) is not None:
+            middleware = [*(middleware or []), self.tracing_middleware]
+        if metrics.enabled():
+            middleware = [*(middleware or []), self.resolver_metrics_middleware]
+        return middleware
+
+    def get_graphql_params(self, request, data):
+        query, variables, operation_name, id = super().get_graphql_params(request, data)
+
+        extensions = request.GET.get("extensions") or data.get("extensions")
+        if extensions and isinstance(extensions, str):
+            try:
+                extensions = json.loads(extensions)
+            except Exception:
+                raise HttpError(HttpResponseBadRequest("Extensions are invalid JSON."))
+        persisted = (extensions or {}).get("persistedQuery")
+        if persisted:
+            sha256 = persisted.get("sha256Hash")
+            if persisted.get("version") != 1 or not sha256:
+                raise HttpError(HttpResponseBadRequest("Unsupported persisted query."))
+            store = get_persisted_queries()
+            if query:
+                if not store.register(sha256, query):
+                    raise HttpError(HttpResponseBadRequest("provided sha does not match query"))
+            else:
+                query = store.get(sha256)
+                if query is None:
+                    raise HttpError(HttpResponse(status=200), "PersistedQueryNotFound")
+
+        return query, variables, operation_name, id
+
+    def parse_body(self, request):
+        if self.get_content_type(request) != "application/json":
+            return super().parse_body(request)
+        try:
+            data = json.loads(request.body.decode("utf-8"))
+        except (TypeError, ValueError):
+            raise HttpError(HttpResponseBadRequest("POST body sent invalid JSON."))
+        if isinstance(data, list):
+            return self.check_batch(data)
+        if not isinstance(data, dict):
+            raise HttpError(HttpResponseBadRequest("The received data is not a valid JSON query."))
+        return data
+
+    def check_batch(self, data):
+        max_operations = get_batch_options()['MAX_OPERATIONS']
+        if max_operations <= 0:
+            raise HttpError(HttpResponseBadRequest("Batched operations are disabled."))
+        if not data:
+            raise HttpError(HttpResponseBadRequest("Received an empty list in the batch request."))
+        if len(data) > max_operations:
+            raise HttpError(HttpResponseBadRequest(
+                f"A batch may contain at most {max_operations} operations."
+            ))
+        if not all(isinstance(entry, dict) for entry in data):
+            raise HttpError(HttpResponseBadRequest("The received data is not a valid JSON query."))
+        return data
+
+    def get_response(self, request, data, show_graphiql=False):
+        if isinstance(data, list):
+            return self.get_batch_response(request, data)
+        query, variables, operation_name, id = self.get_graphql_params(request, data)
+
+        execution_result = self.execute_graphql_request(
+            request, data, query, variables, operation_name, show_graphiql
+        )
+        return self.format_response(request, execution_result, id, show_graphiql)
+
+    def get_batch_response(self, request, data):
+        """
+        Execute the operations of a batch one after the other. The response
+        is always 200 with the results in order; an operation that cannot
+        be executed gets an ``errors`` entry without failing the others.
+        """
+        results = [self.get_batch_entry(BatchOperationContext(request), entry) for entry in data]
+        return self.format_batch(results)
+
+    def get_batch_entry(self, context, entry):
+        try:
+            return self.get_response(context, entry)[0]
+        except HttpError as e:
+            return self.format_batch_error(context, e)
+
+    def format_batch_error(self, context, error):
+        return self.json_encode(context, {"errors": [self.format_error(error)]})
+
+    def format_batch(self, results):
+        return "[{}]".format(",".join(results)), 200
+
+    def format_response(self, request, execution_result, id, show_graphiql=False):
+        if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+            set_rollback()
+
+        status_code = 200
+        if execution_result:
+            response = {}
+
+            if execution_result.errors:
+                set_rollback()
+                response["errors"] = [
+                    self.format_error(e) for e in execution_result.errors
+                ]
+
+            if execution_result.errors and any(
+                not getattr(e, "path", None) for e in execution_result.errors
+            ):
+                status_code = 400
+            else:
+                response["data"] = execution_result.data
+
+            if execution_result.extensions:
+                response["extensions"] = execution_result.extensions
+
+            if self.batch:
+                response["id"] = id
+                response["status"] = status_code
+
+            result = self.json_encode(request, response, pretty=show_graphiql)
+        else:
+            result = None
+
+        return result, status_code
+
+    def get_extensions(self, schema, parsed, operation_ast):
+        if operation_ast is None:
+            return None
+        cost, depth = parsed.cost(schema, operation_ast)
+        limits = get_limits()
+        return {
+            'cost': {
+                'requested': cost,
+                'maximum': limits['MAX_COST'],
+                'depth': depth,
+                'maxDepth': limits['MAX_DEPTH'],
+            }
+        }
+
+    def get_tenant(self, request):
+        organization = getattr(request, 'organization', None)
+        return organization.slug if organization is not None else None
+
+    def execute_graphql_request(
+        self, request, data, query, variables, operation_name, show_graphiql=False
+    ):
+        recorder = SlowOperationRecorder.start(request, query, variables, operation_name)
+        try:
+            operation = self.prepare_operation(
+                request, query, variables, operation_name, show_graphiql
+            )
+            if not isinstance(operation, PreparedOperation):
+                return operation
+            if recorder is not None:
+                recorder.operation_type = operation.operation_type
+            try:
+                result = self.execute_operation(request, operation)
+            except Exception as e:
+                return self.fail_operation(request, operation, e)
+            return self.finish_operation(request, operation, result)
+        finally:
+            if recorder is not None:
+                recorder.finish()
+
+    def prepare_operation(self, request, query, variables, operation_name, show_graphiql=False):
+        """
+        Parse and validate the request, returning a PreparedOperation to
+        execute or the ExecutionResult (or None) to answer with directly.
+        """
+        if not query:
+            if show_graphiql:
+                return None
+            raise HttpError(HttpResponseBadRequest("Must provide query string."))
+
+        schema = self.schema.graphql_schema
+        schema_validation_errors = validate_schema(schema)
+        if schema_validation_errors:
+            return ExecutionResult(data=None, errors=schema_validation_errors)
+
+        parsed = get_document_cache().get(schema, query, self.validation_rules)
+        if parsed.document is None:
+            return ExecutionResult(errors=parsed.errors)
+
+        operation_ast = get_operation_ast(parsed.document, operation_name)
+        operation_type = operation_ast.operation if operation_ast is not None else None
+
+        if request.method.lower() == "get" and operation_type not in (None, OperationType.QUERY):
+            if show_graphiql:
+                return None
+            raise HttpError(
+                HttpResponseNotAllowed(
+                    ["POST"],
+                    "Can only perform a {} operation from a POST request.".format(
+                        operation_type.value
+                    ),
+                )
+            )
+
+        if parsed.errors:
+            return ExecutionResult(data=None, errors=parsed.errors)
+
+        operation = PreparedOperation(
+            parsed.document, operation_type, variables, operation_name,
+            self.get_extensions(schema, parsed, operation_ast),
+        )
+        if operation_ast is not None:
+            operation.root_fields = [
+                ((selection.alias or selection.name).value, selection.name.value)
+                for selection in operation_ast.selection_set.selections
+                if isinstance(selection, FieldNode)
+            ]
+            operation.label = metrics_label(schema, operation_type, operation.root_fields)
+        operation.cache = get_response_cache() if operation_type == OperationType.QUERY else None
+        if operation.cache is not None:
+            operation.cache_key = operation.cache.make_key(
+                parsed.normalized, variables, operation_name, self.get_tenant(request)
+            )
+            cached = operation.cache.get(operation.cache_key)
+            if cached is not None:
+                request.graphql_cache_status = 'HIT'
+                result = ExecutionResult(data=cached, extensions=operation.extensions)
+                self.record_metrics(operation, result)
+                return result
+            request.graphql_cache_status = 'MISS'
+            request.graphql_cache_tags = set()
+            operation.started = time.time_ns()
+        request.graphql_trace = operation.trace = Trace() if should_trace() else None
+        return operation
+
+    def get_execute_options(self, request, operation):
+        execute_options = {
+            "root_value": self.get_root_value(request),
+            "context_value": self.get_context(request),
+            "variable_values": operation.variables,
+            "operation_name": operation.operation_name,
+            "middleware": self.get_middleware(request),
+        }
+        if self.execution_context_class:
+            execute_options["execution_context_class"] = self.execution_context_class
+        return execute_options
+
+    def execute_operation(self, request, operation):
+        schema = self.schema.graphql_schema
+        execute_options = self.get_execute_options(request, operation)
+
+        if operation.operation_type == OperationType.QUERY:
+            with read_from_replicas(self.get_tenant(request)):
+                return execute(schema, operation.document, **execute_options)
+
+        try:
+            if (
+                operation.operation_type == OperationType.MUTATION
+                and (
+                    graphene_settings.ATOMIC_MUTATIONS is True
+                    or connection.settings_dict.get("ATOMIC_MUTATIONS", False) is True
+                )
+            ):
+                with transaction.atomic():
+                    result = execute(schema, operation.document, **execute_options)
+                    if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+                        transaction.set_rollback(True)
+                return result
+
+            return execute(schema, operation.document, **execute_options)
+        finally:
+            if operation.operation_type == OperationType.MUTATION:
+                mark_written(self.get_tenant(request))
+                # Later operations of the batch must not read stale counters
+                clear_loaders(execute_options["context_value"])
+
+    def finish_operation(self, request, operation, result):
+        self.finish_trace(request, operation)
+        if operation.cache is not None and not result.errors:
+            operation.cache.set(
+                operation.cache_key, result.data, request.graphql_cache_tags, operation.started
+            )
+        result.extensions = operation.extensions
+        self.record_metrics(operation, result)
+        return result
+
+    def fail_operation(self, request, operation, error):
+        self.finish_trace(request, operation)
+        result = ExecutionResult(errors=[error])
+        self.record_metrics(operation, result)
+        return result
+
+    def record_metrics(self, operation, result):
+        if not metrics.enabled():
+            return
+        metrics.graphql_operation_duration.observe(
+            time.perf_counter() - operation.timer,
+            operation_type=operation.operation_type.value if operation.operation_type else '',
+            operation=operation.label,
+        )
+        if operation.operation_type != OperationType.MUTATION:
+            return
+        error_keys = set()
+        for error in result.errors or ():
+            if not getattr(error, 'path', None):
+                # Not tied to a field: every mutation of the operation failed
+                error_keys.update(key for key, _ in operation.root_fields)
+            else:
+                error_keys.add(error.path[0])
+        data = result.data or {}
+        for key, name in operation.root_fields:
+            payload = data.get(key)
+            if key in error_keys or payload is None or (
+                isinstance(payload, dict) and payload.get('success') is False
+            ):
+                metrics.graphql_mutation_errors.inc(mutation=name)
+
+    def finish_trace(self, request, operation):
+        request.graphql_trace = None
+        if operation.trace is not None:
+            operation.trace.finish()
+            operation.extensions = {**(operation.extensions or {}), 'tracing': operation.trace.as_dict()}
+
@@ -0,0 +1,226 @@
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from graphql import (
+    ExecutionResult,
+    GraphQLError,
+    OperationType,
+    execute,
+    get_operation_ast,
+    located_error,
+)
+from graphql.execution import create_source_event_stream
+
+from core import tenancy
+from core.cache import organization_cache
+from core.routers import mark_written
+from core.models import Organization
+from .documents import get_document_cache
+from .views import GraphQLView
+
+PROTOCOL = 'graphql-transport-ws'
+
+
+class WebSocketContext:
+    """
+    ``info.context`` for operations received over a WebSocket. A new one is
+    made for every execution so per-request loaders never serve stale data.
+    """
+
+    def __init__(self, scope, organization):
+        self.scope = scope
+        self.organization = organization
+
+
+class GraphQLWebSocketConnection:
+    """
+    One WebSocket connection speaking the graphql-transport-ws protocol
+    (https://github.com/enisdenjo/graphql-ws/blob/master/PROTOCOL.md).
+
+    The tenant is taken from ``organizationSlug`` in the connection_init
+    payload, or from the X-Organization-Slug header of the handshake, and
+    scopes the tenant managers (core.tenancy) for the whole connection.
+    Subscription events are executed like queries, off the event loop.
+    """
+
+    def __init__(self, schema, scope, receive, send):
+        self.schema = schema
+        self.scope = scope
+        self.receive = receive
+        self.send = send
+        self.organization = None
+        self.acknowledged = False
+        self.closed = False
+        self.operations = {}
+
+    async def run(self):
+        message = await self.receive()
+        if message['type'] != 'websocket.connect':
+            return
+        if PROTOCOL not in self.scope.get('subprotocols', ()):
+            await self.close(4406, "Subprotocol not acceptable")
+            return
+        await self.send({'type': 'websocket.accept', 'subprotocol': PROTOCOL})
+
+        options = getattr(settings, 'GRAPHQL_SUBSCRIPTIONS', {})
+        init_timeout = asyncio.get_running_loop().call_later(
+            options.get('CONNECTION_INIT_TIMEOUT', 10),
+            lambda: self.acknowledged or asyncio.ensure_future(
+                self.close(4408, "Connection initialisation timeout")
+            ),
+        )
+        try:
+            while not self.closed:
+                message = await self.receive()
+                if message['type'] == 'websocket.disconnect':
+                    break
+                if message['type'] == 'websocket.receive':
+                    await self.handle(message.get('text') or message.get('bytes'))
+        finally:
+            init_timeout.cancel()
+            for task in self.operations.values():
+                task.cancel()
+
+    async def handle(self, text):
+        try:
+            message = json.loads(text)
+            message_type = message['type']
+        except (TypeError, ValueError, KeyError):
+            await self.close(4400, "Invalid message received")
+            return
+
+        if message_type == 'connection_init':
+            await self.connection_init(message.get('payload') or {})
+        elif message_type == 'ping':
+            await self.send_message({'type': 'pong'})
+        elif message_type == 'pong':
+            pass
+        elif message_type == 'subscribe':
+            await self.subscribe(message.get('id'), message.get('payload') or {})
+        elif message_type == 'complete':
+            task = self.operations.pop(message.get('id'), None)
+            if task is not None:
+                task.cancel()
+        else:
+            await self.close(4400, f"Unexpected message type {message_type}")
+
+    async def connection_init(self, payload):
+        if self.acknowledged:
+            await self.close(4429, "Too many initialisation requests")
+            return
+        slug = payload.get('organizationSlug') or self.get_header(b'x-organization-slug')
+        try:
+            self.organization = await sync_to_async(organization_cache.get)(slug or '')
+        except Organization.DoesNotExist:
+            await self.close(4403, "Forbidden")
+            return
+        # Operations are started from this task and inherit the tenant
+        tenancy.activate(self.organization)
+        self.acknowledged = True
+        await self.send_message({'type': 'connection_ack'})
+
+    async def subscribe(self, id, payload):
+        if not self.acknowledged:
+            await self.close(4401, "Unauthorized")
+            return
+        if not id or id in self.operations:
+            await self.close(4409, f"Subscriber for {id} already exists")
+            return
+        task = asyncio.ensure_future(self.run_operation(id, payload))
+        self.operations[id] = task
+        task.add_done_callback(lambda _: self.forget(id, task))
+
+    def forget(self, id, task):
+        if self.operations.get(id) is task:
+            del self.operations[id]
+
+    async def run_operation(self, id, payload):
+        schema = self.schema.graphql_schema
+        variables = payload.get('variables')
+        operation_name = payload.get('operationName')
+
+        parsed = get_document_cache().get(
+            schema, payload.get('query') or '', GraphQLView.validation_rules
+        )
+        errors = parsed.errors
+        if not errors and get_operation_ast(parsed.document, operation_name) is None:
+            errors = [GraphQLError("Must provide operation name if query contains multiple operations.")]
+        if errors:
+            await self.send_message({
+                'id': id, 'type': 'error', 'payload': [error.formatted for error in errors]
+            })
+            return
+
+        operation = get_operation_ast(parsed.document, operation_name).operation
+        try:
+            if operation == OperationType.SUBSCRIPTION:
+                await self.stream(id, parsed.document, variables, operation_name)
+            else:
+                result = await sync_to_async(execute)(
+                    schema, parsed.document, None, self.get_context(), variables, operation_name
+                )
+                if operation == OperationType.MUTATION:
+                    mark_written(self.organization.slug)
+                await self.send_result(id, result)
+        except Exception as error:
+            await self.send_result(id, ExecutionResult(data=None, errors=[located_error(error)]))
+        await self.send_message({'id': id, 'type': 'complete'})
+
+    async def stream(self, id, document, variables, operation_name):
+        schema = self.schema.graphql_schema
+        events = await create_source_event_stream(
+            schema, document, None, self.get_context(), variables, operation_name
+        )
+        if isinstance(events, ExecutionResult):
+            await self.send_result(id, events)
+            return
+        try:
+            async for event in events:
+                result = await sync_to_async(execute)(
+                    schema, document, event, self.get_context(), variables, operation_name
+                )
+                await self.send_result(id, result)
+        finally:
+            aclose = getattr(events, 'aclose', None)
+            if aclose is not None:
+                await aclose()
+
+    def get_context(self):
+        return WebSocketContext(self.scope, self.organization)
+
+    def get_header(self, name):
+        for key, value in self.scope.get('headers', ()):
+            if key == name:
+                return value.decode()
+        return None
+
+    async def send_result(self, id, result):
+        await self.send_message({'id': id, 'type': 'next', 'payload': result.formatted})
+
+    async def send_message(self, message):
+        if not self.closed:
+            await self.send({'type': 'websocket.send', 'text': json.dumps(message)})
+
+    async def close(self, code, reason):
+        if not self.closed:
+            self.closed = True
+            await self.send({'type': 'websocket.close', 'code': code, 'reason': reason})
+
+
+class GraphQLWebSocketApp:
+    """ASGI application for GraphQL over WebSockets on ``path``"""
+
+    def __init__(self, schema=None, path='/graphql/'):
+        if schema is None:
+            from .schema import schema
+        self.schema = schema
+        self.path = path
+
+    async def __call__(self, scope, receive, send):
+        if scope['path'] != self.path:
+            await receive()
+            await send({'type': 'websocket.close', 'code': 4404})
+            return
+        await GraphQLWebSocketConnection(self.schema, scope, receive, send).run()
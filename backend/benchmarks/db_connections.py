@@ -0,0 +1,96 @@
+"""
+Connection overhead per request under concurrent load.
+
+Sends the dashboard queries of benchmarks/graphql_load.py through the WSGI
+application from a pool of threads, once per connection mode, each in its
+own process against the configured database:
+
+- per-request: CONN_MAX_AGE=0, a new connection for every request
+- persistent: connections kept by each thread (CONN_MAX_AGE=600)
+- persistent+checks: the same, with CONN_HEALTH_CHECKS before reuse
+
+Requests/sec, latency percentiles and database connections opened per
+request are printed per mode. The difference is largest against a remote
+PostgreSQL server (TCP + authentication per connection); SQLite only pays
+for opening the file.
+
+Usage:
+    python benchmarks/db_connections.py [requests] [concurrency]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from graphql_load import BACKEND_DIR, request_bodies, run_wsgi
+
+MODES = {
+    'per-request': {'DATABASE_CONN_MAX_AGE': '0', 'DATABASE_CONN_HEALTH_CHECKS': 'False'},
+    'persistent': {'DATABASE_CONN_MAX_AGE': '600', 'DATABASE_CONN_HEALTH_CHECKS': 'False'},
+    'persistent+checks': {'DATABASE_CONN_MAX_AGE': '600', 'DATABASE_CONN_HEALTH_CHECKS': 'True'},
+}
+
+
+def run_mode(requests, concurrency):
+    sys.path.append(BACKEND_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project_management.settings')
+
+    import django
+    django.setup()
+
+    from django.db.backends.signals import connection_created
+
+    from core.models import Organization
+
+    opened = []
+    connection_created.connect(lambda sender, connection, **kwargs: opened.append(1), weak=False)
+
+    slug = Organization.objects.values_list('slug', flat=True).first()
+    bodies = request_bodies(slug)
+    run_wsgi(bodies, concurrency * 2, concurrency, slug)  # warm up
+    opened.clear()
+
+    start = time.perf_counter()
+    results = run_wsgi(bodies, requests, concurrency, slug)
+    elapsed = time.perf_counter() - start
+    latencies = sorted(latency * 1000 for latency, _ in results)
+    print(json.dumps({
+        'errors': sum(status != 200 for _, status in results),
+        'rps': requests / elapsed,
+        'p50': statistics.median(latencies),
+        'p99': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        'connections': len(opened) / requests,
+    }))
+
+
+def main(requests, concurrency):
+    print(f"{requests} requests, concurrency {concurrency}")
+    print(
+        f"{'mode':<18} {'req/s':>8} {'p50 (ms)':>10} {'p99 (ms)':>10} "
+        f"{'conn/req':>9} {'errors':>7}"
+    )
+    for mode, env in MODES.items():
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--run', str(requests), str(concurrency)],
+            check=True, capture_output=True, text=True, env={**os.environ, **env},
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(
+            f"{mode:<18} {result['rps']:>8.1f} {result['p50']:>10.2f} {result['p99']:>10.2f} "
+            f"{result['connections']:>9.3f} {result['errors']:>7}"
+        )
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    run = args[:1] == ['--run']
+    if run:
+        args = args[1:]
+    requests = int(args[0]) if args else 600
+    concurrency = int(args[1]) if len(args) > 1 else 16
+    if run:
+        run_mode(requests, concurrency)
+    else:
+        main(requests, concurrency)
@@ -0,0 +1,202 @@
+"""
+Load test of /graphql/ through the WSGI and the ASGI application.
+
+Each mode runs in its own process against the existing database:
+
+- wsgi: project_management.wsgi (GraphQLView) called from a pool of
+  threads, like a threaded WSGI worker
+- asgi: project_management.asgi driven by concurrent tasks on one event
+  loop, like a single ASGI worker; Django runs GraphQLView in its thread
+  pool
+
+The workload cycles through the dashboard queries the frontend sends,
+including one that asks for projects and projectStatistics in the same
+request. Requests/sec and latency percentiles are printed per mode.
+
+Usage:
+    python benchmarks/graphql_load.py [requests] [concurrency]
+"""
+import asyncio
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROJECTS_QUERY = '''
+query GetProjects($organizationSlug: String!, $first: Int) {
+  projects(organizationSlug: $organizationSlug, first: $first) {
+    edges { node { id name status dueDate taskCount completedTasks completionRate } }
+    pageInfo { hasNextPage endCursor }
+  }
+}
+'''
+STATISTICS_QUERY = '''
+query GetProjectStatistics($organizationSlug: String!) {
+  projectStatistics(organizationSlug: $organizationSlug) {
+    totalProjects totalTasks completedTasks completionRate
+  }
+}
+'''
+DASHBOARD_QUERY = '''
+query Dashboard($organizationSlug: String!, $first: Int) {
+  projects(organizationSlug: $organizationSlug, first: $first) {
+    edges { node { id name status taskCount completionRate } }
+  }
+  projectStatistics(organizationSlug: $organizationSlug) {
+    totalProjects totalTasks completedTasks completionRate
+  }
+}
+'''
+
+
+def request_bodies(slug):
+    variables = {'organizationSlug': slug, 'first': 20}
+    return [
+        json.dumps({'query': query, 'variables': variables}).encode()
+        for query in (PROJECTS_QUERY, STATISTICS_QUERY, DASHBOARD_QUERY)
+    ]
+
+
+def wsgi_call(application, body, slug):
+    """POST ``body`` to /graphql/; returns (latency in seconds, status, content)"""
+    environ = {
+        'REQUEST_METHOD': 'POST',
+        'PATH_INFO': '/graphql/',
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '8000',
+        'HTTP_HOST': 'localhost',
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(body)),
+        'HTTP_X_ORGANIZATION_SLUG': slug,
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.url_scheme': 'http',
+        'wsgi.errors': sys.stderr,
+    }
+    statuses = []
+    start = time.perf_counter()
+    content = b''.join(application(environ, lambda status, headers: statuses.append(int(status[:3]))))
+    return time.perf_counter() - start, statuses[0], content
+
+
+def run_wsgi(bodies, requests, concurrency, slug):
+    from project_management.wsgi import application
+
+    def call(body):
+        latency, status, _ = wsgi_call(application, body, slug)
+        return latency, status
+
+    with ThreadPoolExecutor(concurrency) as executor:
+        return list(executor.map(call, (bodies[i % len(bodies)] for i in range(requests))))
+
+
+def run_asgi(bodies, requests, concurrency, slug):
+    from project_management.asgi import application
+
+    async def call(body):
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'POST',
+            'scheme': 'http',
+            'path': '/graphql/',
+            'raw_path': b'/graphql/',
+            'query_string': b'',
+            'server': ('localhost', 8000),
+            'headers': [
+                (b'host', b'localhost'),
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(body)).encode()),
+                (b'x-organization-slug', slug.encode()),
+            ],
+        }
+        messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            await asyncio.Event().wait()
+
+        statuses = []
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                statuses.append(message['status'])
+
+        start = time.perf_counter()
+        await application(scope, receive, send)
+        return time.perf_counter() - start, statuses[0]
+
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def limited(body):
+            async with semaphore:
+                return await call(body)
+
+        return await asyncio.gather(*(
+            limited(bodies[i % len(bodies)]) for i in range(requests)
+        ))
+
+    return asyncio.run(main())
+
+
+def run_mode(mode, requests, concurrency):
+    sys.path.append(BACKEND_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project_management.settings')
+
+    import django
+    django.setup()
+
+    from core.models import Organization
+
+    slug = Organization.objects.values_list('slug', flat=True).first()
+    bodies = request_bodies(slug)
+    runner = run_asgi if mode == 'asgi' else run_wsgi
+    runner(bodies, len(bodies) * 2, concurrency, slug)  # warm up
+
+    start = time.perf_counter()
+    results = runner(bodies, requests, concurrency, slug)
+    elapsed = time.perf_counter() - start
+    latencies = sorted(latency * 1000 for latency, _ in results)
+    print(json.dumps({
+        'errors': sum(status != 200 for _, status in results),
+        'rps': requests / elapsed,
+        'p50': statistics.median(latencies),
+        'p99': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+    }))
+
+
+def main(requests, concurrency):
+    print(f"{requests} requests, concurrency {concurrency}")
+    print(f"{'mode':<6} {'req/s':>8} {'p50 (ms)':>10} {'p99 (ms)':>10} {'errors':>7}")
+    for mode in ('wsgi', 'asgi'):
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--mode', mode,
+             str(requests), str(concurrency)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(
+            f"{mode:<6} {result['rps']:>8.1f} {result['p50']:>10.2f} "
+            f"{result['p99']:>10.2f} {result['errors']:>7}"
+        )
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    mode = None
+    if args[:1] == ['--mode']:
+        mode, args = args[1], args[2:]
+    requests = int(args[0]) if args else 600
+    concurrency = int(args[1]) if len(args) > 1 else 16
+    if mode:
+        run_mode(mode, requests, concurrency)
+    else:
+        main(requests, concurrency)
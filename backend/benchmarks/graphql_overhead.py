@@ -0,0 +1,81 @@
+"""
+Benchmark of per-request GraphQL overhead before execution.
+
+For every operation the frontend sends (frontend/src/graphql/*.ts) this
+times parsing + validation against api.schema.schema on every request
+(the stock GraphQLView behaviour) against a DocumentCache hit, and
+compares the request body size of the full query with a persisted query
+hash.
+
+Usage:
+    python benchmarks/graphql_overhead.py [iterations]
+"""
+import json
+import os
+import re
+import statistics
+import sys
+import time
+
+import django
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project_management.settings')
+django.setup()
+
+from api.documents import DocumentCache, query_hash
+from api.schema import schema
+
+FRONTEND_GRAPHQL = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'frontend', 'src', 'graphql'
+)
+GQL_TEMPLATE = re.compile(r'export const (\w+) = gql`(.*?)`', re.S)
+
+
+def load_operations():
+    operations = {}
+    for filename in sorted(os.listdir(FRONTEND_GRAPHQL)):
+        with open(os.path.join(FRONTEND_GRAPHQL, filename)) as f:
+            operations.update(GQL_TEMPLATE.findall(f.read()))
+    return operations
+
+
+def median_us(func, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(samples)
+
+
+def main(iterations):
+    graphql_schema = schema.graphql_schema
+    cache = DocumentCache(max_size=100)
+    print(
+        f"{'operation':<24} {'parse+validate (us)':>20} {'cached (us)':>12} "
+        f"{'body (B)':>9} {'hash body (B)':>14}"
+    )
+    for name, query in load_operations().items():
+        parsed = DocumentCache.parse_and_validate(graphql_schema, query)
+        assert not parsed.errors, (name, parsed.errors)
+        cache.get(graphql_schema, query)
+
+        uncached = median_us(
+            lambda: DocumentCache.parse_and_validate(graphql_schema, query), iterations
+        )
+        cached = median_us(lambda: cache.get(graphql_schema, query), iterations)
+        extensions = {'persistedQuery': {'version': 1, 'sha256Hash': query_hash(query)}}
+        full_body = len(json.dumps({'query': query, 'variables': {}}))
+        hash_body = len(json.dumps({'extensions': extensions, 'variables': {}}))
+        print(
+            f"{name:<24} {uncached:>20.1f} {cached:>12.1f} {full_body:>9} {hash_body:>14}"
+        )
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
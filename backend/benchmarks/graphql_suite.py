@@ -0,0 +1,476 @@
+"""
+Benchmark suite replaying representative GraphQL operations.
+
+Every field of Query and every Mutation class is sent to /graphql/ through
+the WSGI application with realistic variables: the organization of each
+request is drawn with probability proportional to its number of tasks, so
+large tenants get most of the traffic, as with data from
+benchmarks/synthetic_data.py. Targets (projects, tasks) are drawn from
+that organization.
+
+- Per operation, requests are sent one at a time and latency percentiles
+  and the number of SQL queries per request are recorded. Mutations run in
+  a transaction that is rolled back, so the database is left unchanged.
+- Throughput: the query operations are mixed and sent from a pool of
+  threads for requests/sec under concurrency.
+
+Results are written to benchmarks/results/<name>.json together with the
+data set size, database and git revision, and compared with a baseline
+(the previous result by default).
+
+Usage:
+    python benchmarks/graphql_suite.py [--requests 50] [--concurrency 16]
+        [--operations tasks,createTask] [--name NAME] [--baseline FILE]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from datetime import datetime
+
+from graphql_load import BACKEND_DIR, wsgi_call
+
+sys.path.append(BACKEND_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project_management.settings')
+
+import django
+django.setup()
+
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections, connections, transaction
+from django.db.models import Count
+
+from core.models import Organization, Project, Task, TaskComment
+from project_management.wsgi import application
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+SAMPLE_TARGETS = 200
+BULK_SIZE = 100
+
+QUERIES = {
+    'organizations': (
+        'query { organizations { id name slug } }',
+        lambda t: {},
+    ),
+    'organization': (
+        'query ($slug: String!) { organization(slug: $slug) { id name contactEmail } }',
+        lambda t: {'slug': t.slug},
+    ),
+    'projects': (
+        '''query ($organizationSlug: String!, $first: Int) {
+          projects(organizationSlug: $organizationSlug, first: $first) {
+            edges { node { id name status dueDate taskCount completedTasks completionRate } }
+            pageInfo { hasNextPage endCursor }
+          }
+        }''',
+        lambda t: {'organizationSlug': t.slug, 'first': 20},
+    ),
+    'project': (
+        'query ($id: Int!) { project(id: $id) { id name description status taskCount completionRate } }',
+        lambda t: {'id': t.project()},
+    ),
+    'tasks': (
+        '''query ($projectId: Int!, $first: Int) {
+          tasks(projectId: $projectId, first: $first) {
+            edges { node { id title status assigneeEmail dueDate createdAt } }
+            pageInfo { hasNextPage endCursor }
+          }
+        }''',
+        lambda t: {'projectId': t.project(), 'first': 50},
+    ),
+    'assigneeTasks': (
+        '''query ($organizationSlug: String!, $assigneeEmail: String!, $first: Int) {
+          tasks(organizationSlug: $organizationSlug, assigneeEmail: $assigneeEmail,
+                statuses: ["TODO", "IN_PROGRESS", "BLOCKED"], orderBy: DUE_DATE, first: $first) {
+            edges { node { id title status dueDate project { id name } } }
+            pageInfo { hasNextPage endCursor }
+          }
+        }''',
+        lambda t: {'organizationSlug': t.slug, 'assigneeEmail': t.assignee(), 'first': 50},
+    ),
+    'task': (
+        'query ($id: Int!) { task(id: $id) { id title description status assigneeEmail } }',
+        lambda t: {'id': t.task()},
+    ),
+    'taskComments': (
+        '''query ($taskId: Int!, $first: Int) {
+          taskComments(taskId: $taskId, first: $first) {
+            edges { node { id content authorEmail createdAt } }
+          }
+        }''',
+        lambda t: {'taskId': t.commented_task(), 'first': 20},
+    ),
+    'projectStatistics': (
+        '''query ($organizationSlug: String!) {
+          projectStatistics(organizationSlug: $organizationSlug) {
+            totalProjects totalTasks completedTasks completionRate
+            tasksByStatus { status count }
+          }
+        }''',
+        lambda t: {'organizationSlug': t.slug},
+    ),
+    'search': (
+        '''query ($organizationSlug: String!, $text: String!) {
+          search(organizationSlug: $organizationSlug, text: $text, first: 20) {
+            kind rank task { id title } project { id name }
+          }
+        }''',
+        lambda t: {'organizationSlug': t.slug, 'text': t.word()},
+    ),
+}
+
+MUTATIONS = {
+    'createOrganization': (
+        '''mutation ($name: String!, $contactEmail: String!) {
+          createOrganization(name: $name, contactEmail: $contactEmail) { success organization { id } }
+        }''',
+        lambda t: {'name': f"Benchmark {t.unique()}", 'contactEmail': 'bench@example.com'},
+    ),
+    'createProject': (
+        '''mutation ($organizationSlug: String!, $name: String!) {
+          createProject(organizationSlug: $organizationSlug, name: $name) { success project { id } }
+        }''',
+        lambda t: {'organizationSlug': t.slug, 'name': f"Benchmark {t.unique()}"},
+    ),
+    'updateProject': (
+        'mutation ($id: Int!, $status: String) { updateProject(id: $id, status: $status) { success } }',
+        lambda t: {'id': t.project(), 'status': t.rng.choice(['ACTIVE', 'ON_HOLD'])},
+    ),
+    'deleteProject': (
+        'mutation ($id: Int!) { deleteProject(id: $id) { success } }',
+        lambda t: {'id': t.project(consume=True)},
+    ),
+    'createTask': (
+        '''mutation ($projectId: Int!, $title: String!, $assigneeEmail: String) {
+          createTask(projectId: $projectId, title: $title, assigneeEmail: $assigneeEmail) {
+            success task { id }
+          }
+        }''',
+        lambda t: {'projectId': t.project(), 'title': t.word(), 'assigneeEmail': 'bench@example.com'},
+    ),
+    'updateTask': (
+        'mutation ($id: Int!, $status: String) { updateTask(id: $id, status: $status) { success } }',
+        lambda t: {'id': t.task(), 'status': t.rng.choice(['TODO', 'IN_PROGRESS', 'DONE'])},
+    ),
+    'deleteTask': (
+        'mutation ($id: Int!) { deleteTask(id: $id) { success } }',
+        lambda t: {'id': t.task(consume=True)},
+    ),
+    'createTaskComment': (
+        '''mutation ($taskId: Int!, $content: String!) {
+          createTaskComment(taskId: $taskId, content: $content, authorEmail: "bench@example.com") {
+            success
+          }
+        }''',
+        lambda t: {'taskId': t.task(), 'content': t.word()},
+    ),
+    'bulkCreateTasks': (
+        '''mutation ($projectId: Int!, $tasks: [TaskInput!]!) {
+          bulkCreateTasks(projectId: $projectId, tasks: $tasks) { success }
+        }''',
+        lambda t: {'projectId': t.project(), 'tasks': [{'title': t.word()} for _ in range(BULK_SIZE)]},
+    ),
+    'bulkUpdateTasks': (
+        '''mutation ($tasks: [TaskUpdateInput!]!) {
+          bulkUpdateTasks(tasks: $tasks) { success }
+        }''',
+        lambda t: {'tasks': [{'id': id, 'status': 'DONE'} for id in t.tasks(BULK_SIZE)]},
+    ),
+    'bulkDeleteTasks': (
+        'mutation ($ids: [Int!]!) { bulkDeleteTasks(ids: $ids) { success } }',
+        lambda t: {'ids': t.tasks(BULK_SIZE, consume=True)},
+    ),
+}
+
+OPERATIONS = {**QUERIES, **MUTATIONS}
+
+
+class Rollback(Exception):
+    pass
+
+
+class Tenant:
+    """Sampled ids of one organization, handed out to the variable factories"""
+
+    counter = 0
+
+    def __init__(self, organization, rng):
+        self.slug = organization.slug
+        self.rng = rng
+        self.projects = list(
+            Project.all_objects.filter(organization=organization)
+            .order_by('?').values_list('pk', flat=True)[:SAMPLE_TARGETS]
+        )
+        self.task_ids = list(
+            Task.all_objects.filter(organization=organization)
+            .order_by('?').values_list('pk', flat=True)[:SAMPLE_TARGETS * 5]
+        )
+        self.commented = list(
+            TaskComment.all_objects.filter(organization=organization)
+            .values_list('task_id', flat=True).distinct()[:SAMPLE_TARGETS]
+        ) or self.task_ids
+        self.words = list(
+            Task.all_objects.filter(pk__in=self.task_ids[:50]).values_list('title', flat=True)
+        )
+        self.assignees = list(
+            Task.all_objects.filter(pk__in=self.task_ids).exclude(assignee_email='')
+            .values_list('assignee_email', flat=True).distinct()
+        )
+        # Ids deleted by the current operation (restored by its rollback)
+        self.consumed = set()
+
+    def _take(self, ids, consume):
+        if consume:
+            available = [id for id in ids if id not in self.consumed]
+            if not available:
+                return 0
+            id = self.rng.choice(available)
+            self.consumed.add(id)
+            return id
+        return self.rng.choice(ids) if ids else 0
+
+    def project(self, consume=False):
+        return self._take(self.projects, consume)
+
+    def task(self, consume=False):
+        return self._take(self.task_ids, consume)
+
+    def tasks(self, count, consume=False):
+        ids = [self.task(consume) for _ in range(min(count, len(self.task_ids)))]
+        return [id for id in ids if id]
+
+    def assignee(self):
+        return self.rng.choice(self.assignees) if self.assignees else ''
+
+    def commented_task(self):
+        return self._take(self.commented, False)
+
+    def word(self):
+        words = ' '.join(self.words).split() or ['task']
+        return self.rng.choice(words)
+
+    def unique(self):
+        Tenant.counter += 1
+        return f"{os.getpid()}-{Tenant.counter}"
+
+
+class Workload:
+    """Organizations weighted by their number of tasks"""
+
+    def __init__(self, seed=0):
+        self.rng = random.Random(seed)
+        organizations = list(Organization.objects.annotate(size=Count('tasks')).order_by('pk'))
+        if not organizations:
+            sys.exit("No organizations: load data first (see benchmarks/synthetic_data.py)")
+        self.organizations = organizations
+        self.weights = [organization.size + 1 for organization in organizations]
+        self.tenants = {}
+
+    def tenant(self):
+        organization = self.rng.choices(self.organizations, self.weights)[0]
+        if organization.pk not in self.tenants:
+            self.tenants[organization.pk] = Tenant(organization, self.rng)
+        return self.tenants[organization.pk]
+
+    def request(self, operation):
+        query, variables = OPERATIONS[operation]
+        tenant = self.tenant()
+        body = json.dumps({'query': query, 'variables': variables(tenant)}).encode()
+        return tenant.slug, body
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def summarize(latencies, queries, errors, elapsed):
+    latencies = sorted(latency * 1000 for latency in latencies)
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': len(latencies) / elapsed,
+        'p50': statistics.median(latencies),
+        'p95': percentile(latencies, 0.95),
+        'p99': percentile(latencies, 0.99),
+        'queries': statistics.mean(queries) if queries else None,
+    }
+
+
+def failed(status, content):
+    if status != 200:
+        return True
+    data = json.loads(content)
+    if data.get('errors'):
+        return True
+    # Mutations report failures in their payload
+    return any(
+        isinstance(payload, dict) and payload.get('success') is False
+        for payload in (data.get('data') or {}).values()
+    )
+
+
+def measure(workload, operation, requests):
+    """Sequential requests of one operation, counting the SQL queries of each"""
+    latencies, queries, errors = [], [], 0
+    executed = []
+
+    def count(execute, sql, params, many, context):
+        executed.append(sql)
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        slug, body = workload.request(operation)
+        executed.clear()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(count))
+            latency, status, content = wsgi_call(application, body, slug)
+        latencies.append(latency)
+        queries.append(len(executed))
+        errors += failed(status, content)
+    return summarize(latencies, queries, errors, time.perf_counter() - start)
+
+
+def measure_mutation(workload, operation, requests):
+    """``measure`` in a transaction that is rolled back afterwards"""
+    # The request signals would close the connection in the middle of the
+    # transaction (as autocommit is off), like in django.test.Client
+    request_started.disconnect(close_old_connections)
+    request_finished.disconnect(close_old_connections)
+    try:
+        with transaction.atomic():
+            result = measure(workload, operation, requests)
+            raise Rollback
+    except Rollback:
+        pass
+    finally:
+        request_started.connect(close_old_connections)
+        request_finished.connect(close_old_connections)
+        for tenant in workload.tenants.values():
+            tenant.consumed.clear()
+    return result
+
+
+def throughput(workload, requests, concurrency):
+    """The query operations mixed, from ``concurrency`` threads"""
+    bodies = [workload.request(operation) for operation in QUERIES for _ in range(requests)]
+    workload.rng.shuffle(bodies)
+
+    def call(request):
+        slug, body = request
+        latency, status, content = wsgi_call(application, body, slug)
+        return latency, failed(status, content)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        results = list(executor.map(call, bodies))
+    elapsed = time.perf_counter() - start
+    return summarize(
+        [latency for latency, _ in results], [], sum(error for _, error in results), elapsed
+    )
+
+
+def metadata():
+    connection = connections['default']
+    try:
+        revision = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+            capture_output=True, text=True,
+        ).stdout.strip()
+    except OSError:
+        revision = ''
+    return {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'revision': revision,
+        'database': connection.vendor,
+        'organizations': Organization.objects.count(),
+        'projects': Project.all_objects.count(),
+        'tasks': Task.all_objects.count(),
+        'comments': TaskComment.all_objects.count(),
+    }
+
+
+def latest_result(exclude):
+    if not os.path.isdir(RESULTS_DIR):
+        return None
+    paths = [
+        os.path.join(RESULTS_DIR, name) for name in os.listdir(RESULTS_DIR)
+        if name.endswith('.json') and os.path.join(RESULTS_DIR, name) != exclude
+    ]
+    return max(paths, key=os.path.getmtime) if paths else None
+
+
+def change(value, baseline):
+    if value is None or not baseline:
+        return ''
+    return f"{(value - baseline) / baseline * 100:+.0f}%"
+
+
+def report(results, baseline=None):
+    baseline = baseline or {}
+    print(
+        f"{'operation':<20} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9} "
+        f"{'queries':>8} {'req/s':>8} {'errors':>7}  {'p50 vs baseline':>15}"
+    )
+    for operation, result in results.items():
+        previous = baseline.get(operation, {})
+        queries = '-' if result['queries'] is None else f"{result['queries']:.1f}"
+        print(
+            f"{operation:<20} {result['p50']:>9.2f} {result['p95']:>9.2f} {result['p99']:>9.2f} "
+            f"{queries:>8} {result['rps']:>8.1f} {result['errors']:>7}  "
+            f"{change(result['p50'], previous.get('p50')):>15}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=50, help="Requests per operation")
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--operations', help="Comma separated subset of the operations")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--name', help="Result file name (default: the date and time)")
+    parser.add_argument('--baseline', help="Result file to compare with (default: the latest)")
+    args = parser.parse_args()
+
+    operations = args.operations.split(',') if args.operations else list(OPERATIONS)
+    unknown = set(operations) - set(OPERATIONS)
+    if unknown:
+        sys.exit(f"Unknown operation(s): {', '.join(sorted(unknown))}")
+
+    workload = Workload(args.seed)
+    info = metadata()
+    print(
+        f"{info['database']} @ {info['revision'] or '?'}: {info['organizations']} organizations, "
+        f"{info['projects']} projects, {info['tasks']} tasks, {info['comments']} comments"
+    )
+    results = {}
+    for operation in operations:
+        run = measure_mutation if operation in MUTATIONS else measure
+        results[operation] = run(workload, operation, args.requests)
+    results['throughput'] = throughput(workload, args.requests, args.concurrency)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    name = args.name or datetime.now().strftime('%Y%m%d-%H%M%S')
+    path = os.path.join(RESULTS_DIR, f"{name}.json")
+    baseline_path = args.baseline or latest_result(exclude=path)
+    baseline = None
+    if baseline_path:
+        with open(baseline_path) as stream:
+            baseline = json.load(stream)['results']
+        print(f"Baseline: {baseline_path}")
+    report(results, baseline)
+
+    with open(path, 'w') as stream:
+        json.dump({'metadata': {**info, **vars(args)}, 'results': results}, stream, indent=2)
+    print(f"Results written to {path}")
+
+
+if __name__ == '__main__':
+    main()
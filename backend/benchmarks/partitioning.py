@@ -0,0 +1,160 @@
+"""
+Per-tenant query latency with one whale organization among many small
+ones, before and after partitioning the task and comment tables by
+organization (PostgreSQL only, see core.partitioning).
+
+Seeds the whale and the small organizations inside a transaction that is
+rolled back afterwards, times tenant-scoped ORM queries (the ones the
+resolvers issue, scoped by core.tenancy), converts the tables, gives the
+whale its own partitions and times the same queries again.
+
+Usage:
+    python benchmarks/partitioning.py [whale tasks] [small orgs] [tasks per small org]
+    python benchmarks/partitioning.py 2000000 500 200
+"""
+import os
+import random
+import statistics
+import sys
+import time
+
+import django
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project_management.settings')
+django.setup()
+
+from django.db import connection, transaction
+
+from core import tenancy
+from core.models import Organization, Project, Task, TaskComment
+from core.partitioning import (
+    PARTITIONED_TABLES,
+    dedicate_partition,
+    is_partitioned,
+    partition_tables,
+)
+
+PROJECTS_PER_ORG = 5
+HASH_PARTITIONS = 16
+SAMPLED_SMALL_ORGS = 25
+REPEAT = 5
+# One comment per COMMENT_EVERY tasks
+COMMENT_EVERY = 4
+
+
+class Rollback(Exception):
+    pass
+
+
+def seed_organization(index, tasks):
+    org = Organization.objects.create(
+        name=f"Partition benchmark {index}",
+        slug=f"benchmark-partitioning-{index}",
+        contact_email="bench@example.com"
+    )
+    projects = Project.objects.bulk_create([
+        Project(organization=org, name=f"Project {i}") for i in range(PROJECTS_PER_ORG)
+    ])
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            INSERT INTO core_task (organization_id, project_id, title, description, status,
+                                   assignee_email, created_at, updated_at)
+            SELECT %s, (%s::bigint[])[1 + i %% %s], 'Task ' || i, '',
+                   (ARRAY['TODO', 'IN_PROGRESS', 'DONE', 'BLOCKED'])[1 + i %% 4], '',
+                   now() - i * interval '1 second', now()
+            FROM generate_series(1, %s) i
+            """,
+            [org.pk, [project.pk for project in projects], len(projects), tasks],
+        )
+        cursor.execute(
+            """
+            INSERT INTO core_taskcomment (organization_id, task_id, content, author_email,
+                                          created_at, updated_at)
+            SELECT organization_id, id, 'Comment', 'bench@example.com', created_at, now()
+            FROM core_task WHERE organization_id = %s AND id %% %s = 0
+            """,
+            [org.pk, COMMENT_EVERY],
+        )
+    return org
+
+
+def analyze():
+    with connection.cursor() as cursor:
+        for table in PARTITIONED_TABLES:
+            cursor.execute(f'ANALYZE {table}')
+
+
+QUERIES = {
+    'task page': lambda: list(
+        Task.objects.filter(status='TODO').order_by('-created_at', '-id')[:20]
+    ),
+    'task count': lambda: Task.objects.filter(status='DONE').count(),
+    'comment page': lambda: list(TaskComment.objects.order_by('-created_at', '-id')[:20]),
+}
+
+
+def timed(organizations):
+    """Median latency (ms) of every query, run while each tenant is active"""
+    results = {}
+    for name, query in QUERIES.items():
+        samples = []
+        for _ in range(REPEAT):
+            for org in organizations:
+                with tenancy.tenant(org):
+                    start = time.perf_counter()
+                    query()
+                    samples.append((time.perf_counter() - start) * 1000)
+        results[name] = statistics.median(samples)
+    return results
+
+
+def report(layout, whale, small):
+    for tenant, organizations in (('whale', [whale]), ('small', small)):
+        results = timed(organizations)
+        print(f"{layout:<14} {tenant:<6} " + ' '.join(
+            f"{results[name]:>14.2f}" for name in QUERIES
+        ))
+
+
+def main(whale_tasks, small_orgs, small_tasks):
+    if connection.vendor != 'postgresql':
+        sys.exit("This benchmark requires PostgreSQL")
+    already_partitioned = is_partitioned(connection, 'core_task')
+
+    print(f"whale: {whale_tasks} tasks, {small_orgs} small orgs x {small_tasks} tasks")
+    print(f"{'layout':<14} {'tenant':<6} " + ' '.join(f"{name + ' (ms)':>14}" for name in QUERIES))
+    try:
+        with transaction.atomic():
+            whale = seed_organization(0, whale_tasks)
+            small = [seed_organization(i, small_tasks) for i in range(1, small_orgs + 1)]
+            sample = random.Random(0).sample(small, min(SAMPLED_SMALL_ORGS, len(small)))
+            # Fire the deferred foreign key checks of the seed rows now, so
+            # that the tables can be altered in this transaction
+            with connection.cursor() as cursor:
+                cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+            if already_partitioned:
+                dedicate_partition(connection, whale.pk)
+                analyze()
+                report('partitioned', whale, sample)
+            else:
+                analyze()
+                report('single table', whale, sample)
+                partition_tables(connection, HASH_PARTITIONS)
+                dedicate_partition(connection, whale.pk)
+                analyze()
+                report('partitioned', whale, sample)
+            raise Rollback
+    except Rollback:
+        pass
+
+
+if __name__ == '__main__':
+    args = [int(arg) for arg in sys.argv[1:]]
+    defaults = [1000000, 200, 500]
+    main(*(args + defaults[len(args):]))
@@ -0,0 +1,111 @@
+"""
+Benchmark for Query.projectStatistics.
+
+Seeds one organization per size (tasks per org) inside a transaction that
+is rolled back afterwards, then times:
+
+- legacy: the original three COUNT queries (no per-status breakdown)
+- per-counter: one COUNT per counter, including the per-status breakdown
+- counters: ProjectStatistics.for_organization (materialized counters)
+
+Usage:
+    python benchmarks/project_statistics.py [task counts...]
+    python benchmarks/project_statistics.py 1000 100000 1000000
+"""
+import os
+import statistics
+import sys
+import time
+
+import django
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project_management.settings')
+django.setup()
+
+from django.db import transaction
+
+from api.queries import ProjectStatistics
+from core.counters import rebuild_counters
+from core.models import Organization, Project, Task
+
+PROJECTS_PER_ORG = 50
+REPEAT = 7
+BATCH_SIZE = 5000
+
+
+class Rollback(Exception):
+    pass
+
+
+def seed(size):
+    org = Organization.objects.create(
+        name=f"Benchmark {size}",
+        slug=f"benchmark-stats-{size}",
+        contact_email="bench@example.com"
+    )
+    statuses = [status for status, _ in Project.STATUS_CHOICES]
+    projects = Project.objects.bulk_create([
+        Project(organization=org, name=f"Project {i}", status=statuses[i % len(statuses)])
+        for i in range(PROJECTS_PER_ORG)
+    ])
+    task_statuses = [status for status, _ in Task.TASK_STATUS_CHOICES]
+    for start in range(0, size, BATCH_SIZE):
+        Task.objects.bulk_create([
+            Task(
+                organization=org,
+                project=projects[i % len(projects)],
+                title=f"Task {i}",
+                status=task_statuses[i % len(task_statuses)]
+            )
+            for i in range(start, min(start + BATCH_SIZE, size))
+        ], batch_size=BATCH_SIZE)
+    rebuild_counters(org)
+    return org
+
+
+def legacy_statistics(org):
+    total_projects = Project.objects.filter(organization=org).count()
+    total_tasks = Task.objects.filter(project__organization=org).count()
+    completed_tasks = Task.objects.filter(project__organization=org, status='DONE').count()
+    return total_projects, total_tasks, completed_tasks
+
+
+def per_counter_statistics(org):
+    counts = list(legacy_statistics(org))
+    for status, _ in Project.STATUS_CHOICES:
+        counts.append(Project.objects.filter(organization=org, status=status).count())
+    for status, _ in Task.TASK_STATUS_CHOICES:
+        counts.append(Task.objects.filter(project__organization=org, status=status).count())
+    return counts
+
+
+def timed(func, *args):
+    samples = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        func(*args)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main(sizes):
+    print(f"{'tasks':>10} {'legacy (ms)':>12} {'per-counter (ms)':>17} {'counters (ms)':>15}")
+    for size in sizes:
+        try:
+            with transaction.atomic():
+                org = seed(size)
+                legacy = timed(legacy_statistics, org)
+                per_counter = timed(per_counter_statistics, org)
+                materialized = timed(ProjectStatistics.for_organization, org)
+                print(f"{size:>10} {legacy:>12.2f} {per_counter:>17.2f} {materialized:>15.2f}")
+                raise Rollback
+        except Rollback:
+            pass
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [1000, 100000, 1000000])
@@ -0,0 +1,159 @@
+"""
+Synthetic production-scale data with skewed (Zipfian) tenants.
+
+Writes organizations, projects, tasks and comments as gzipped NDJSON in the
+format of manage.py import_tenant. Sizes follow a Zipf distribution with
+exponent ``--skew`` at every level: a few organizations own most of the
+tasks, within an organization a few projects hold most of them, and a few
+tasks attract most of the comments. The same seed gives the same data.
+
+Usage:
+    python benchmarks/synthetic_data.py [organizations] [tasks] [--load]
+    python benchmarks/synthetic_data.py 200 500000 --skew 1.1 --load
+"""
+import argparse
+import gzip
+import itertools
+import json
+import os
+import random
+import sys
+from datetime import datetime, timedelta, timezone
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TASKS_PER_PROJECT = 40
+COMMENTS_PER_TASK = 0.5
+ASSIGNEES_PER_ORG = 25
+HISTORY_DAYS = 365
+PROJECT_STATUSES = (('ACTIVE', 60), ('COMPLETED', 25), ('ON_HOLD', 10), ('CANCELLED', 5))
+TASK_STATUSES = (('TODO', 35), ('IN_PROGRESS', 20), ('DONE', 40), ('BLOCKED', 5))
+WORDS = (
+    'api billing dashboard deploy design docs export import invoice login '
+    'migration mobile onboarding payment report search settings signup '
+    'sync tenant upload webhook'
+).split()
+
+
+def zipf_split(total, buckets, skew, rng, minimum=0):
+    """Spread ``total`` items over ``buckets``, bucket k weighted 1 / (k + 1) ** skew"""
+    counts = [minimum] * buckets
+    remaining = total - minimum * buckets
+    if remaining > 0:
+        cum_weights = list(itertools.accumulate(1 / (k + 1) ** skew for k in range(buckets)))
+        for bucket in rng.choices(range(buckets), cum_weights=cum_weights, k=remaining):
+            counts[bucket] += 1
+    return counts
+
+
+def pick(choices, rng):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights)[0]
+
+
+def sentence(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def timestamp(start, end, rng):
+    return start + (end - start) * rng.random()
+
+
+def generate(organizations, tasks, skew=1.1, seed=0):
+    """Yield the records of the whole data set, parents before children"""
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    history = now - timedelta(days=HISTORY_DAYS)
+    org_tasks = zipf_split(tasks, organizations, skew, rng)
+    org_comments = zipf_split(int(tasks * COMMENTS_PER_TASK), organizations, skew, rng)
+    ids = {'projects': itertools.count(1), 'tasks': itertools.count(1), 'comments': itertools.count(1)}
+
+    for index in range(organizations):
+        slug = f"synthetic-{index}"
+        yield {
+            'type': 'organizations', 'slug': slug,
+            'name': f"Synthetic {index}", 'contact_email': f"admin@{slug}.example.com",
+        }
+        assignees = [f"user{i}@{slug}.example.com" for i in range(ASSIGNEES_PER_ORG)]
+
+        projects = []
+        for _ in range(max(1, org_tasks[index] // TASKS_PER_PROJECT)):
+            created_at = timestamp(history, now, rng)
+            projects.append((next(ids['projects']), created_at))
+            yield {
+                'type': 'projects', 'id': projects[-1][0], 'organization': slug,
+                'name': sentence(rng, 3), 'description': sentence(rng, 12),
+                'status': pick(PROJECT_STATUSES, rng),
+                'due_date': (created_at + timedelta(days=rng.randint(30, 180))).date().isoformat(),
+                'created_at': created_at.isoformat(), 'updated_at': created_at.isoformat(),
+            }
+
+        org_task_list = []
+        per_project = zipf_split(org_tasks[index], len(projects), skew, rng)
+        for (project_id, project_created), count in zip(projects, per_project):
+            for _ in range(count):
+                created_at = timestamp(project_created, now, rng)
+                org_task_list.append((next(ids['tasks']), created_at))
+                yield {
+                    'type': 'tasks', 'id': org_task_list[-1][0], 'project_id': project_id,
+                    'title': sentence(rng, 5), 'description': sentence(rng, 20),
+                    'status': pick(TASK_STATUSES, rng),
+                    'assignee_email': rng.choice(assignees) if rng.random() < 0.8 else '',
+                    'due_date': None,
+                    'created_at': created_at.isoformat(),
+                    'updated_at': timestamp(created_at, now, rng).isoformat(),
+                }
+
+        if not org_task_list:
+            continue
+        per_task = zipf_split(org_comments[index], len(org_task_list), skew, rng)
+        for (task_id, task_created), count in zip(org_task_list, per_task):
+            for _ in range(count):
+                created_at = timestamp(task_created, now, rng).isoformat()
+                yield {
+                    'type': 'comments', 'id': next(ids['comments']), 'task_id': task_id,
+                    'content': sentence(rng, 15), 'author_email': rng.choice(assignees),
+                    'created_at': created_at, 'updated_at': created_at,
+                }
+
+
+def write(records, path):
+    counts = {}
+    with gzip.open(path, 'wt', encoding='utf-8') as stream:
+        for record in records:
+            stream.write(json.dumps(record) + '\n')
+            counts[record['type']] = counts.get(record['type'], 0) + 1
+    return counts
+
+
+def load(path, batch_size):
+    sys.path.append(BACKEND_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project_management.settings')
+
+    import django
+    django.setup()
+
+    from django.core.management import call_command
+
+    call_command('import_tenant', path, batch_size=batch_size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('organizations', type=int, nargs='?', default=50)
+    parser.add_argument('tasks', type=int, nargs='?', default=100000)
+    parser.add_argument('--skew', type=float, default=1.1, help="Zipf exponent (default: %(default)s)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='synthetic.ndjson.gz')
+    parser.add_argument('--load', action='store_true', help="Import the file with import_tenant")
+    parser.add_argument('--batch-size', type=int, default=5000)
+    args = parser.parse_args()
+
+    counts = write(generate(args.organizations, args.tasks, args.skew, args.seed), args.output)
+    print(f"Wrote {args.output}: " + ', '.join(f"{kind} {count}" for kind, count in counts.items()))
+    if args.load:
+        load(args.output, args.batch_size)
+
+
+if __name__ == '__main__':
+    main()
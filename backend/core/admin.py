@@ -1,5 +1,27 @@
 from django.contrib import admin
-from .models import Organization, Project, Task, TaskComment
+from . import search
+from .models import Organization, Project, SearchEntry, SlowOperation, Task, TaskComment
+
+
+class IndexedSearchMixin:
+    """
+    Look up the admin search term in the full-text index (core.search)
+    instead of ILIKE '%term%' over ``search_fields``, which scans the whole
+    table. Every term matches the words it starts ("logi" finds "login")
+    and every match is listed. Fields in ``exact_search_fields`` are
+    matched case-insensitively as a whole.
+    """
+    search_kind = None
+    exact_search_fields = ()
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.split():
+            return queryset, False
+        entries = search.matching_entries(search_term, prefix=True).filter(kind=self.search_kind)
+        results = queryset.filter(pk__in=entries.values('object_id'))
+        for field in self.exact_search_fields:
+            results |= queryset.filter(**{f'{field}__iexact': search_term.strip()})
+        return results, False
 
 
 @admin.register(Organization)
@@ -10,24 +32,44 @@ class OrganizationAdmin(admin.ModelAdmin):
 
 
 @admin.register(Project)
-class ProjectAdmin(admin.ModelAdmin):
+class ProjectAdmin(IndexedSearchMixin, admin.ModelAdmin):
     list_display = ['name', 'organization', 'status', 'due_date', 'created_at']
     list_filter = ['status', 'organization']
     search_fields = ['name', 'description']
+    search_kind = SearchEntry.PROJECT
     date_hierarchy = 'created_at'
 
 
 @admin.register(Task)
-class TaskAdmin(admin.ModelAdmin):
+class TaskAdmin(IndexedSearchMixin, admin.ModelAdmin):
     list_display = ['title', 'project', 'status', 'assignee_email', 'due_date', 'created_at']
-    list_filter = ['status', 'project__organization']
+    list_filter = ['status', 'organization']
     search_fields = ['title', 'description', 'assignee_email']
+    search_kind = SearchEntry.TASK
+    exact_search_fields = ['assignee_email']
     date_hierarchy = 'created_at'
 
 
 @admin.register(TaskComment)
-class TaskCommentAdmin(admin.ModelAdmin):
+class TaskCommentAdmin(IndexedSearchMixin, admin.ModelAdmin):
     list_display = ['task', 'author_email', 'created_at']
-    list_filter = ['task__project__organization']
+    list_filter = ['organization']
     search_fields = ['content', 'author_email']
+    search_kind = SearchEntry.COMMENT
+    exact_search_fields = ['author_email']
     date_hierarchy = 'created_at'
+
+
+@admin.register(SlowOperation)
+class SlowOperationAdmin(admin.ModelAdmin):
+    list_display = ['created_at', 'operation_name', 'operation_type', 'tenant', 'duration', 'sql_count']
+    list_filter = ['operation_type', 'tenant']
+    search_fields = ['operation_name']
+    date_hierarchy = 'created_at'
+    readonly_fields = [
+        'created_at', 'operation_name', 'operation_type', 'tenant', 'variables',
+        'duration', 'sql_count', 'sql_duration', 'statements',
+    ]
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,133 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from . import tenancy
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe, process-local LRU cache with an optional per-entry TTL"""
+
+    def __init__(self, max_size=1024, ttl=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            value, expires = entry
+            if expires is not None and expires < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_where(self, predicate):
+        with self._lock:
+            for key in [key for key, (value, _) in self._data.items() if predicate(key, value)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class OrganizationCache:
+    """
+    slug -> Organization cache used for tenant resolution.
+
+    Lookups go through a process-local LRU first and then, when
+    ORGANIZATION_CACHE['ALIAS'] names a Django cache, through that shared
+    backend before falling back to the database. Task counters are not
+    cached: they are deferred on the returned instance. Entries are dropped on
+    Organization save/delete (see core.signals); other worker processes
+    only see the change once their local entry's TTL runs out.
+    """
+
+    key_prefix = 'organization:slug:'
+
+    def __init__(self):
+        options = getattr(settings, 'ORGANIZATION_CACHE', {})
+        self.ttl = options.get('TTL', 60)
+        self.alias = options.get('ALIAS')
+        self.local = LRUCache(max_size=options.get('MAX_SIZE', 1024), ttl=self.ttl)
+
+    @property
+    def shared(self):
+        return caches[self.alias] if self.alias else None
+
+    def get(self, slug):
+        """Return the organization for ``slug``, raising Organization.DoesNotExist"""
+        from core.counters import COUNTER_FIELDS
+        from core.models import Organization
+
+        values = self.local.get(slug)
+        if values is None and self.shared is not None:
+            values = self.shared.get(self.key_prefix + slug)
+            if values is not None:
+                self.local.set(slug, values)
+        if values is None:
+            organization = Organization.objects.get(slug=slug)
+            values = {
+                field.attname: getattr(organization, field.attname)
+                for field in Organization._meta.concrete_fields
+                if field.attname not in COUNTER_FIELDS
+            }
+            self.local.set(slug, values)
+            if self.shared is not None:
+                self.shared.set(self.key_prefix + slug, values, self.ttl)
+            return organization
+        return Organization.from_db(None, list(values), list(values.values()))
+
+    def invalidate(self, *slugs, pk=None):
+        for slug in slugs:
+            self.local.delete(slug)
+            if self.shared is not None:
+                self.shared.delete(self.key_prefix + slug)
+        if pk is not None:
+            self.local.delete_where(lambda slug, values: values['id'] == pk)
+
+    def clear(self):
+        self.local.clear()
+
+
+organization_cache = OrganizationCache()
+
+
+def get_organization(slug, request=None):
+    """
+    Resolve an organization by slug, reusing the one OrganizationMiddleware
+    attached to ``request`` when it matches. Raises tenancy.TenantMismatch
+    when another organization is the active tenant.
+    """
+    tenant = tenancy.get_current_organization()
+    if tenant is not None and tenant.slug != slug:
+        raise tenancy.TenantMismatch(slug, tenant)
+    organization = getattr(request, 'organization', None)
+    if organization is not None and organization.slug == slug:
+        return organization
+    return organization_cache.get(slug)
@@ -0,0 +1,202 @@
+"""
+Materialized task counters of projects and organizations.
+
+They are kept up to date by Task.save() and Task.delete(), by the delete()
+of task and project querysets (core.models.CountedDeleteQuerySet), by
+Project.delete() and by the bulk task mutations. QuerySet.update(),
+bulk_create() and bulk_update() of tasks bypass them: callers apply the
+deltas themselves (see apply_batch) or run ``manage.py
+rebuild_task_counters`` afterwards, as import_tenant does.
+"""
+from django.db.models import Count, F, Q
+
+from .models import Organization, Project, Task
+
+STATUS_FIELDS = {
+    status: f'tasks_{status.lower()}'
+    for status, _ in Task.TASK_STATUS_CHOICES
+}
+COUNTER_FIELDS = ['tasks_total', *STATUS_FIELDS.values()]
+# Task fields that decide which counters include a task
+COUNTED_TASK_FIELDS = {'project', 'project_id', 'organization', 'organization_id', 'status'}
+
+
+def task_deltas(status, sign=1):
+    """Counter deltas for adding (sign=1) or removing (sign=-1) one task"""
+    deltas = {'tasks_total': sign}
+    if status in STATUS_FIELDS:
+        deltas[STATUS_FIELDS[status]] = sign
+    return deltas
+
+
+def merge_deltas(*deltas):
+    merged = {}
+    for delta in deltas:
+        for field, value in delta.items():
+            merged[field] = merged.get(field, 0) + value
+    return merged
+
+
+def apply_deltas(deltas, project_id=None, organization_id=None):
+    """
+    Apply counter deltas with F() expressions so concurrent writers never
+    lose increments. Must run inside the transaction that changed the tasks.
+    """
+    updates = {field: F(field) + value for field, value in deltas.items() if value}
+    if not updates:
+        return
+    if project_id is not None:
+        Project.objects.filter(pk=project_id).update(**updates)
+    if organization_id is not None:
+        Organization.objects.filter(pk=organization_id).update(**updates)
+
+
+def apply_batch(entries):
+    """
+    Apply many counter changes at once. ``entries`` yields
+    (project_id, organization_id, deltas); deltas are summed per project
+    and per organization so each row is updated once.
+    """
+    by_project = {}
+    by_organization = {}
+    for project_id, organization_id, deltas in entries:
+        by_project[project_id] = merge_deltas(by_project.get(project_id, {}), deltas)
+        by_organization[organization_id] = merge_deltas(
+            by_organization.get(organization_id, {}), deltas
+        )
+    for project_id, deltas in by_project.items():
+        apply_deltas(deltas, project_id=project_id)
+    for organization_id, deltas in by_organization.items():
+        apply_deltas(deltas, organization_id=organization_id)
+
+
+def task_state(task):
+    return (task.project_id, task.organization_id, task.status)
+
+
+def previous_task_state(task):
+    """
+    The (project id, organization id, status) the counters include for
+    ``task``: None for a new task, else the values it was loaded with (see
+    Task.from_db) or, when they are unknown, the ones in the database.
+    """
+    if task._state.adding:
+        return None
+    state = getattr(task, '_counted_state', None)
+    if state is None or None in state:
+        state = (
+            Task.all_objects.filter(pk=task.pk)
+            .values_list('project_id', 'organization_id', 'status')
+            .first()
+        )
+    return state
+
+
+def task_saved(task, previous):
+    """Move a saved task from its ``previous`` state's counters to its current ones"""
+    current = task_state(task)
+    if current != previous:
+        entries = [(current[0], current[1], task_deltas(current[2]))]
+        if previous is not None:
+            entries.append((previous[0], previous[1], task_deltas(previous[2], -1)))
+        apply_batch(entries)
+    task._counted_state = current
+
+
+def task_deleted(previous):
+    if previous is not None:
+        tasks_deleted([previous])
+
+
+def tasks_deleted(states):
+    """Remove deleted tasks, given as (project id, organization id, status), from the counters"""
+    apply_batch(
+        (project_id, organization_id, task_deltas(status, -1))
+        for project_id, organization_id, status in states
+    )
+
+
+def project_deleted(project):
+    """Remove a project's tasks from its organization's counters"""
+    counters = (
+        Project.all_objects.filter(pk=project.pk)
+        .values('pk', 'organization_id', *COUNTER_FIELDS)
+        .first()
+    )
+    if counters:
+        projects_deleted([counters])
+
+
+def projects_deleted(rows):
+    """Remove deleted projects (rows with organization_id and the counters) from their organizations"""
+    by_organization = {}
+    for row in rows:
+        deltas = {field: -row[field] for field in COUNTER_FIELDS}
+        by_organization[row['organization_id']] = merge_deltas(
+            by_organization.get(row['organization_id'], {}), deltas
+        )
+    for organization_id, deltas in by_organization.items():
+        apply_deltas(deltas, organization_id=organization_id)
+
+
+def compute_project_counters(projects):
+    """Recount tasks for ``projects`` with one grouped aggregate query"""
+    aggregates = {'tasks_total': Count('id')}
+    for status, field in STATUS_FIELDS.items():
+        aggregates[field] = Count('id', filter=Q(status=status))
+    rows = (
+        Task.objects.filter(project__in=projects)
+        .order_by()
+        .values('project_id')
+        .annotate(**aggregates)
+    )
+    return {row.pop('project_id'): row for row in rows}
+
+
+def rebuild_counters(organization, batch_size=1000, dry_run=False):
+    """
+    Recompute the counters of ``organization`` and its projects from the
+    task rows. Returns a list of (object, field, stored, actual) tuples for
+    every counter that was out of date; with ``dry_run`` nothing is written.
+    """
+    mismatches = []
+    totals = dict.fromkeys(COUNTER_FIELDS, 0)
+    projects = Project.objects.filter(organization=organization).only('pk', *COUNTER_FIELDS)
+    zero = dict.fromkeys(COUNTER_FIELDS, 0)
+
+    batch = []
+    for project in projects.iterator(chunk_size=batch_size):
+        batch.append(project)
+        if len(batch) >= batch_size:
+            _rebuild_batch(batch, totals, mismatches, zero, dry_run)
+            batch = []
+    if batch:
+        _rebuild_batch(batch, totals, mismatches, zero, dry_run)
+
+    stale = [field for field in COUNTER_FIELDS if getattr(organization, field) != totals[field]]
+    for field in stale:
+        mismatches.append((organization, field, getattr(organization, field), totals[field]))
+        setattr(organization, field, totals[field])
+    if stale and not dry_run:
+        Organization.objects.filter(pk=organization.pk).update(
+            **{field: totals[field] for field in COUNTER_FIELDS}
+        )
+    return mismatches
+
+
+def _rebuild_batch(projects, totals, mismatches, zero, dry_run):
+    counters = compute_project_counters([project.pk for project in projects])
+    changed = []
+    for project in projects:
+        actual = counters.get(project.pk, zero)
+        stale = False
+        for field in COUNTER_FIELDS:
+            totals[field] += actual[field]
+            if getattr(project, field) != actual[field]:
+                mismatches.append((project, field, getattr(project, field), actual[field]))
+                setattr(project, field, actual[field])
+                stale = True
+        if stale:
+            changed.append(project)
+    if changed and not dry_run:
+        Project.objects.bulk_update(changed, COUNTER_FIELDS)
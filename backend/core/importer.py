@@ -0,0 +1,394 @@
+"""
+Bulk import of organizations, projects, tasks and comments.
+
+Input files are CSV or NDJSON (optionally gzipped), in the format written
+by core.export: every record has a ``type`` (organizations, projects,
+tasks or comments; files named after a type may omit it) and the source
+``id`` of the object. Tasks refer to their project and comments to their
+task by source id (``project_id``, ``task_id``); these are resolved to the
+new primary keys through in-memory maps. Projects belong to the
+organization named by their ``organization`` slug, or to the default one.
+
+Records are validated against the model fields (choices, lengths, emails,
+dates); invalid ones are skipped and reported. The rest are buffered and
+written in batches: with PostgreSQL COPY (ids are taken from the table's
+sequence beforehand), elsewhere with bulk_create() followed by a
+bulk_update() restoring the imported timestamps (see bulk_insert).
+Every batch is committed together with a line in the state file holding
+the input position and the new ids, so an interrupted import resumes
+after the last committed batch. Counters and search entries are rebuilt
+at the end, as these bulk writes bypass the model signals.
+"""
+import csv
+import gzip
+import io
+import json
+import os
+import time
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import search
+from .counters import rebuild_counters
+from .models import Organization, Project, Task, TaskComment
+
+RECORD_TYPES = ('organizations', 'projects', 'tasks', 'comments')
+# Resolved through the import's own id maps rather than checked row by row
+RELATION_FIELDS = ['organization', 'project', 'task']
+TIMESTAMP_FIELDS = ['created_at', 'updated_at']
+
+
+def read_records(path):
+    """Yield the records of a CSV or NDJSON file (optionally .gz) as dicts"""
+    name = path[:-3] if path.endswith('.gz') else path
+    stem, extension = os.path.splitext(os.path.basename(name))
+    default_type = stem if stem in RECORD_TYPES else None
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8', newline='') as stream:
+        if extension == '.csv':
+            for row in csv.DictReader(stream):
+                # Empty CSV cells stand for missing values
+                record = {key: value for key, value in row.items() if value != ''}
+                record.setdefault('type', default_type)
+                yield record
+        elif extension in ('.ndjson', '.jsonl'):
+            for line in stream:
+                if line.strip():
+                    record = json.loads(line)
+                    record.setdefault('type', default_type)
+                    yield record
+        else:
+            raise ValueError(f"{path}: expected a .csv or .ndjson file")
+
+
+def _integer(value):
+    return int(value) if value not in (None, '') else None
+
+
+class TenantImporter:
+    """
+    Import ``paths`` in order. ``organization`` is the default organization
+    of projects without an ``organization`` slug. Progress lines are passed
+    to ``log``.
+    """
+
+    MODELS = {'projects': Project, 'tasks': Task, 'comments': TaskComment}
+
+    def __init__(self, paths, state_path, organization=None, batch_size=5000,
+                 use_copy=None, log=print):
+        self.paths = list(paths)
+        self.state_path = state_path
+        self.default_organization = organization
+        self.batch_size = batch_size
+        self.use_copy = connection.vendor == 'postgresql' if use_copy is None else use_copy
+        self.log = log
+
+        self.organizations = {}  # slug -> pk
+        self.projects = {}  # source id -> (pk, organization pk)
+        self.tasks = {}  # source id -> (pk, organization pk)
+        self.position = (0, 0)  # (file index, records consumed)
+        self.buffers = {kind: [] for kind in self.MODELS}
+        self.counts = dict.fromkeys(RECORD_TYPES, 0)
+        self.skipped = 0
+        self.touched = set()  # organization pks written to
+        self.now = timezone.now()
+
+    # State file
+
+    def load_state(self):
+        """Replay the state file of a previous run; returns the batches found"""
+        if not os.path.exists(self.state_path):
+            return 0
+        with open(self.state_path) as stream:
+            entries = [json.loads(line) for line in stream if line.strip()]
+        if entries and not self._committed(entries[-1]):
+            # Written just before a commit that did not happen
+            entries.pop()
+            self._write_state(entries)
+        for entry in entries:
+            self._apply_state(entry)
+        return len(entries)
+
+    def _committed(self, entry):
+        check = entry.get('check')
+        if check is None:
+            return True
+        kind, pk = check
+        if kind == 'organizations':
+            return Organization.objects.filter(pk=pk).exists()
+        return self.MODELS[kind].all_objects.filter(pk=pk).exists()
+
+    def _apply_state(self, entry):
+        self.organizations.update(entry['organizations'])
+        self.projects.update((source, (pk, org)) for source, pk, org in entry['projects'])
+        self.tasks.update((source, (pk, org)) for source, pk, org in entry['tasks'])
+        for kind, count in entry['counts'].items():
+            self.counts[kind] += count
+        self.touched.update(entry['touched'])
+        self.position = tuple(entry['position'])
+
+    def _write_state(self, entries):
+        with open(self.state_path, 'w') as stream:
+            for entry in entries:
+                stream.write(json.dumps(entry) + '\n')
+
+    def _append_state(self, entry):
+        with open(self.state_path, 'a') as stream:
+            stream.write(json.dumps(entry) + '\n')
+            stream.flush()
+            os.fsync(stream.fileno())
+
+    # Import
+
+    def run(self, finalize=True):
+        resumed = self.load_state()
+        if resumed:
+            file_index, consumed = self.position
+            self.log(f"Resuming after {resumed} committed batch(es), file {file_index + 1} record {consumed}")
+
+        started = time.perf_counter()
+        self.resumed_rows = sum(self.counts.values())
+        start_index, start_offset = self.position
+        for file_index, path in enumerate(self.paths):
+            if file_index < start_index:
+                continue
+            offset = start_offset if file_index == start_index else 0
+            consumed = 0
+            for record in read_records(path):
+                consumed += 1
+                if consumed <= offset:
+                    continue
+                self.add(record, path)
+                if any(len(buffer) >= self.batch_size for buffer in self.buffers.values()):
+                    self.flush((file_index, consumed))
+                    self.report(started)
+            self.flush((file_index, consumed))
+        self.flush((len(self.paths), 0))
+        self.report(started, final=True)
+
+        if finalize:
+            self.finalize()
+        return self.counts
+
+    def add(self, record, path):
+        kind = record.get('type')
+        if kind == 'organizations':
+            self.add_organization(record)
+        elif kind in self.buffers:
+            self.buffers[kind].append(record)
+        else:
+            self.skip(f"{path}: unknown record type {kind!r}")
+
+    def add_organization(self, record):
+        slug = record['slug']
+        organization, created = Organization.objects.get_or_create(
+            slug=slug,
+            defaults={'name': record.get('name') or slug, 'contact_email': record.get('contact_email', '')},
+        )
+        self.organizations[slug] = organization.pk
+        if created:
+            self.counts['organizations'] += 1
+            self._append_state(self._state_entry({}, check=('organizations', organization.pk)))
+
+    def skip(self, reason):
+        self.skipped += 1
+        if self.skipped <= 10:
+            self.log(f"Skipped: {reason}")
+
+    def organization_pk(self, slug):
+        if slug is None:
+            if self.default_organization is None:
+                return None
+            return self.default_organization.pk
+        if slug not in self.organizations:
+            pk = Organization.objects.filter(slug=slug).values_list('pk', flat=True).first()
+            if pk is None:
+                return None
+            self.organizations[slug] = pk
+        return self.organizations[slug]
+
+    # Rows
+
+    def project_row(self, record):
+        organization = self.organization_pk(record.get('organization'))
+        if organization is None:
+            self.skip(f"project {record.get('id')}: unknown organization {record.get('organization')!r}")
+            return None
+        return organization, {
+            'organization_id': organization,
+            'name': record.get('name', ''),
+            'description': record.get('description') or '',
+            'status': record.get('status') or 'ACTIVE',
+            'due_date': record.get('due_date'),
+            'created_at': record.get('created_at') or self.now,
+            'updated_at': record.get('updated_at') or self.now,
+        }
+
+    def task_row(self, record):
+        project = self.projects.get(_integer(record.get('project_id')))
+        if project is None:
+            self.skip(f"task {record.get('id')}: unknown project {record.get('project_id')}")
+            return None
+        project_pk, organization = project
+        return organization, {
+            'organization_id': organization,
+            'project_id': project_pk,
+            'title': record.get('title', ''),
+            'description': record.get('description') or '',
+            'status': record.get('status') or 'TODO',
+            'assignee_email': record.get('assignee_email') or '',
+            'due_date': record.get('due_date'),
+            'created_at': record.get('created_at') or self.now,
+            'updated_at': record.get('updated_at') or self.now,
+        }
+
+    def comment_row(self, record):
+        task = self.tasks.get(_integer(record.get('task_id')))
+        if task is None:
+            self.skip(f"comment {record.get('id')}: unknown task {record.get('task_id')}")
+            return None
+        task_pk, organization = task
+        return organization, {
+            'organization_id': organization,
+            'task_id': task_pk,
+            'content': record.get('content', ''),
+            'author_email': record.get('author_email', ''),
+            'created_at': record.get('created_at') or self.now,
+            'updated_at': record.get('updated_at') or self.now,
+        }
+
+    def flush(self, position):
+        """Write every buffer, parents first, and commit them with a state line"""
+        if not any(self.buffers.values()):
+            self.position = position
+            return
+        maps = {'projects': [], 'tasks': []}
+        counts = {}
+        check = None
+        with transaction.atomic():
+            for kind, build in (
+                ('projects', self.project_row),
+                ('tasks', self.task_row),
+                ('comments', self.comment_row),
+            ):
+                records = self.buffers[kind]
+                self.buffers[kind] = []
+                built = []
+                for record in records:
+                    row = build(record)
+                    obj = self.clean(kind, record, row[1]) if row is not None else None
+                    if obj is not None:
+                        built.append((record, row[0], obj))
+                if not built:
+                    continue
+                pks = self.insert(kind, [obj for _, _, obj in built])
+                for (record, organization, _), pk in zip(built, pks):
+                    self.touched.add(organization)
+                    source = _integer(record.get('id'))
+                    if kind in maps and source is not None:
+                        getattr(self, kind)[source] = (pk, organization)
+                        maps[kind].append([source, pk, organization])
+                counts[kind] = len(built)
+                self.counts[kind] += len(built)
+                check = (kind, pks[-1])
+            self.position = position
+            self._append_state(self._state_entry(maps, counts, check))
+
+    def _state_entry(self, maps, counts=None, check=None):
+        return {
+            'position': list(self.position),
+            'organizations': self.organizations,
+            'projects': maps.get('projects', []),
+            'tasks': maps.get('tasks', []),
+            'counts': counts or {},
+            'touched': sorted(self.touched),
+            'check': check,
+        }
+
+    def clean(self, kind, record, row):
+        """The unsaved object for ``row``, or None when a field is invalid"""
+        obj = self.MODELS[kind](**row)
+        try:
+            obj.clean_fields(exclude=RELATION_FIELDS)
+        except ValidationError as e:
+            errors = '; '.join(
+                f"{field}: {' '.join(messages)}" for field, messages in e.message_dict.items()
+            )
+            self.skip(f"{kind} {record.get('id')}: {errors}")
+            return None
+        return obj
+
+    def insert(self, kind, objects):
+        """Insert the unsaved ``objects`` and return their new primary keys"""
+        model = self.MODELS[kind]
+        if self.use_copy:
+            return self.copy(model, objects)
+        return self.bulk_insert(model, objects)
+
+    def bulk_insert(self, model, objects):
+        """
+        bulk_create() the objects, then write back the imported
+        created_at/updated_at that auto_now(_add) replaced on insert.
+        """
+        timestamps = [[getattr(obj, name) for name in TIMESTAMP_FIELDS] for obj in objects]
+        model.all_objects.bulk_create(objects, batch_size=self.batch_size)
+        for obj, values in zip(objects, timestamps):
+            for name, value in zip(TIMESTAMP_FIELDS, values):
+                setattr(obj, name, value)
+        model.all_objects.bulk_update(objects, TIMESTAMP_FIELDS, batch_size=self.batch_size)
+        return [obj.pk for obj in objects]
+
+    def copy(self, model, objects):
+        """PostgreSQL COPY, with the ids drawn from the table's sequence first"""
+        table = model._meta.db_table
+        fields = [field for field in model._meta.concrete_fields if not field.primary_key]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s)",
+                [table, len(objects)],
+            )
+            pks = [pk for pk, in cursor.fetchall()]
+
+            buffer = io.StringIO()
+            # Strings are quoted and None is not, which COPY reads as NULL
+            writer = csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC)
+            for pk, obj in zip(pks, objects):
+                values = [field.get_prep_value(getattr(obj, field.attname)) for field in fields]
+                writer.writerow([pk] + [
+                    value.isoformat() if hasattr(value, 'isoformat') else value
+                    for value in values
+                ])
+            columns = ', '.join(
+                connection.ops.quote_name(column)
+                for column in ['id', *(field.column for field in fields)]
+            )
+            sql = f'COPY {connection.ops.quote_name(table)} ({columns}) FROM STDIN WITH (FORMAT csv)'
+            raw = cursor.cursor
+            if hasattr(raw, 'copy_expert'):
+                # psycopg2
+                buffer.seek(0)
+                raw.copy_expert(sql, buffer)
+            else:
+                # psycopg 3
+                with raw.copy(sql) as copy:
+                    copy.write(buffer.getvalue())
+        return pks
+
+    def report(self, started, final=False):
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        rows = sum(self.counts.values()) - self.resumed_rows
+        summary = ', '.join(f"{kind} {count}" for kind, count in self.counts.items())
+        self.log(
+            f"{'Imported' if final else 'Progress'}: {summary} "
+            f"({rows / elapsed:,.0f} rows/s, {self.skipped} skipped)"
+        )
+
+    def finalize(self):
+        """Rebuild the counters and search entries of the organizations written to"""
+        for organization in Organization.objects.filter(pk__in=self.touched):
+            with transaction.atomic():
+                rebuild_counters(organization)
+                search.rebuild_index(organization)
+            self.log(f"{organization.slug}: counters and search index rebuilt")
@@ -0,0 +1,51 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import export
+from core.models import Organization
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream the projects, tasks and comments of an organization as CSV or "
+        "NDJSON, with constant memory use regardless of its size."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('slug', help="Organization slug")
+        parser.add_argument('--format', choices=export.FORMATS, default='ndjson')
+        parser.add_argument(
+            '--types', default=','.join(export.EXPORTS),
+            help="Comma separated subset of %(default)s",
+        )
+        parser.add_argument('--gzip', action='store_true', help="Compress the output")
+        parser.add_argument(
+            '--output', default='-', help="File to write (default: standard output)",
+        )
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, slug, format, types, gzip, output, chunk_size, **options):
+        try:
+            organization = Organization.objects.get(slug=slug)
+        except Organization.DoesNotExist:
+            raise CommandError(f"Unknown organization: {slug}")
+        try:
+            chunks = export.export_chunks(
+                organization, format, [kind for kind in types.split(',') if kind],
+                gzip, chunk_size,
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        stream = sys.stdout.buffer if output == '-' else open(output, 'wb')
+        try:
+            written = 0
+            for chunk in chunks:
+                stream.write(chunk)
+                written += len(chunk)
+        finally:
+            if stream is not sys.stdout.buffer:
+                stream.close()
+        if output != '-':
+            self.stderr.write(f"Wrote {written} bytes to {output}")
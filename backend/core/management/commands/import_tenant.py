@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importer import TenantImporter
+from core.models import Organization
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk import organizations, projects, tasks and comments from CSV or "
+        "NDJSON files (optionally gzipped), such as those written by "
+        "export_organization. Rows are written in batches (COPY on PostgreSQL) "
+        "and an interrupted import resumes from its state file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help="Files to import, in order")
+        parser.add_argument(
+            '--organization', dest='slug',
+            help="Organization slug for projects without an organization column",
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--state',
+            help="State file used to resume (default: <first path>.import-state)",
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help="Ignore the state of a previous run and import from the start",
+        )
+        parser.add_argument(
+            '--no-copy', dest='use_copy', action='store_false', default=None,
+            help="Use bulk_create on PostgreSQL as well",
+        )
+
+    def handle(self, *args, paths, slug, batch_size, state, restart, use_copy, **options):
+        organization = None
+        if slug:
+            try:
+                organization = Organization.objects.get(slug=slug)
+            except Organization.DoesNotExist:
+                raise CommandError(f"Unknown organization: {slug}")
+
+        state = state or f"{paths[0]}.import-state"
+        if restart:
+            open(state, 'w').close()
+        importer = TenantImporter(
+            paths, state, organization=organization, batch_size=batch_size,
+            use_copy=use_copy, log=self.stdout.write,
+        )
+        try:
+            importer.run()
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"Import complete (state kept in {state})"))
@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core.models import Organization
+from core.partitioning import (
+    PARTITIONED_TABLES,
+    dedicate_partition,
+    is_partitioned,
+    list_partitions,
+    partition_tables,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Convert the task and comment tables to tables partitioned by "
+        "organization (PostgreSQL only), and give large organizations "
+        "partitions of their own. Takes exclusive locks on both tables."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--partitions', type=int, default=8,
+            help="Hash partitions shared by the other organizations (default: %(default)s)",
+        )
+        parser.add_argument(
+            '--dedicate', dest='slugs', action='append', default=[],
+            help="Organization slug to move into its own partitions (repeatable)",
+        )
+        parser.add_argument(
+            '--list', dest='list_only', action='store_true',
+            help="Only list the partitions and their row estimates",
+        )
+
+    def handle(self, *args, partitions, slugs, list_only, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError("Partitioning requires PostgreSQL")
+
+        if not list_only:
+            organizations = Organization.objects.filter(slug__in=slugs)
+            missing = set(slugs) - {organization.slug for organization in organizations}
+            if missing:
+                raise CommandError(f"Unknown organization(s): {', '.join(sorted(missing))}")
+            with transaction.atomic():
+                for table in partition_tables(connection, partitions):
+                    self.stdout.write(f"{table}: partitioned into {partitions} hash partitions")
+                for organization in organizations:
+                    for partition in dedicate_partition(connection, organization.pk):
+                        self.stdout.write(f"{organization.slug}: created {partition}")
+            with connection.cursor() as cursor:
+                for table in PARTITIONED_TABLES:
+                    cursor.execute(f'ANALYZE {connection.ops.quote_name(table)}')
+
+        for table in PARTITIONED_TABLES:
+            if not is_partitioned(connection, table):
+                self.stdout.write(f"{table}: not partitioned")
+                continue
+            for partition, bound, rows in list_partitions(connection, table):
+                self.stdout.write(f"{partition:<32} {bound:<48} ~{max(rows, 0)} rows")
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.models import Organization
+from core.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the full-text search entries of projects, tasks and comments, "
+        "for example after bulk edits made with QuerySet.update() or raw SQL, "
+        "which do not send post_save."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--organization', dest='slugs', action='append', default=[],
+            help="Organization slug to process (repeatable, default: all)",
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, slugs, batch_size, **options):
+        organizations = Organization.objects.order_by('pk')
+        if slugs:
+            organizations = organizations.filter(slug__in=slugs)
+            missing = set(slugs) - set(organizations.values_list('slug', flat=True))
+            if missing:
+                raise CommandError(f"Unknown organization(s): {', '.join(sorted(missing))}")
+
+        for organization in organizations.iterator():
+            with transaction.atomic():
+                indexed = rebuild_index(organization, batch_size=batch_size)
+            self.stdout.write(f"{organization.slug}: {indexed} entries indexed")
+        self.stdout.write(self.style.SUCCESS("Search index is up to date"))
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.counters import rebuild_counters
+from core.models import Organization
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the materialized task counters on projects and organizations "
+        "from the task rows. Use --verify to only report drift (for example "
+        "after edits made through the admin, which bypasses the counters)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--organization', dest='slugs', action='append', default=[],
+            help="Organization slug to process (repeatable, default: all)",
+        )
+        parser.add_argument(
+            '--verify', action='store_true',
+            help="Report mismatching counters without writing; exits non-zero on drift",
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, slugs, verify, batch_size, **options):
+        organizations = Organization.objects.order_by('pk')
+        if slugs:
+            organizations = organizations.filter(slug__in=slugs)
+            missing = set(slugs) - set(organizations.values_list('slug', flat=True))
+            if missing:
+                raise CommandError(f"Unknown organization(s): {', '.join(sorted(missing))}")
+
+        drifted = 0
+        for organization in organizations.iterator():
+            with transaction.atomic():
+                mismatches = rebuild_counters(
+                    organization, batch_size=batch_size, dry_run=verify
+                )
+            for obj, field, stored, actual in mismatches:
+                self.stdout.write(
+                    f"{obj._meta.model_name} {obj.pk} {field}: stored={stored} actual={actual}"
+                )
+            if mismatches:
+                drifted += 1
+            self.stdout.write(
+                f"{organization.slug}: {len(mismatches)} counter(s) "
+                f"{'out of date' if verify else 'fixed'}"
+            )
+
+        if verify and drifted:
+            raise CommandError(f"{drifted} organization(s) have drifted counters")
+        self.stdout.write(self.style.SUCCESS("Task counters are up to date"))
@@ -0,0 +1,404 @@
+"""
+In-process metrics in the Prometheus text format, served at /metrics.
+
+Updates are lock-free: every thread adds to its own shard of values and a
+lock is only taken when a thread creates its shard, or when the thread is
+gone and its shard is folded into the retired totals. Collection sums the
+retired totals and the live shards. With METRICS['DIRECTORY'] set, each
+worker process also writes a snapshot of its values there (every
+FLUSH_SECONDS while it has changes, when /metrics is served and at exit),
+and /metrics sums the snapshots of every process, so any worker answers
+for all of them. Gauges are summed over the processes that are still
+running.
+"""
+import atexit
+import bisect
+import contextlib
+import itertools
+import json
+import os
+import tempfile
+import threading
+import time
+import weakref
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+LOOKUP_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.1)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Statements executed so far by the current request (see start_request)
+_request_queries = ContextVar('metrics_request_queries', default=None)
+
+
+def get_options():
+    options = getattr(settings, 'METRICS', {})
+    return {
+        'ENABLED': options.get('ENABLED', True),
+        'DIRECTORY': options.get('DIRECTORY') or None,
+        'FLUSH_SECONDS': options.get('FLUSH_SECONDS', 5),
+    }
+
+
+class Metric:
+    type = None
+
+    def __init__(self, registry, name, help, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+
+    def key(self, labels):
+        return (self.name, tuple(str(labels.get(name, '')) for name in self.labelnames))
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        values = self.registry.shard()
+        key = self.key(labels)
+        values[key] = values.get(key, 0) + amount
+        self.registry.changed = True
+
+
+class Histogram(Metric):
+    """Stored as per-bucket counts (the last one is +Inf) followed by the sum"""
+
+    type = 'histogram'
+
+    def __init__(self, registry, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(registry, name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        values = self.registry.shard()
+        key = self.key(labels)
+        counts = values.get(key)
+        if counts is None:
+            counts = values[key] = [0] * (len(self.buckets) + 2)
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+        self.registry.changed = True
+
+    @contextlib.contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield labels
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+
+class CallbackMetric(Metric):
+    """A counter or gauge whose values ({label values: value}) are read on collection"""
+
+    def __init__(self, registry, name, help, labelnames, type, callback):
+        super().__init__(registry, name, help, labelnames)
+        self.type = type
+        self.callback = callback
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        # {id of a thread's values: its values}
+        self.shards = {}
+        # Values of the threads that are gone
+        self.retired = {}
+        self.changed = False
+        self._local = threading.local()
+        # Reentrant: dropping the last reference to a thread retires it, which
+        # may happen while the lock is held
+        self._lock = threading.RLock()
+        self._flusher = None
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self.register(Counter(self, name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(self, name, help, labelnames, buckets))
+
+    def callback(self, name, help, labelnames, type, callback):
+        return self.register(CallbackMetric(self, name, help, labelnames, type, callback))
+
+    def shard(self):
+        values = getattr(self._local, 'values', None)
+        if values is None:
+            values = self._local.values = {}
+            with self._lock:
+                self.shards[id(values)] = values
+            # Not at exit: the flush at exit reads the shards as they are
+            weakref.finalize(threading.current_thread(), self.retire, id(values)).atexit = False
+            self.start_flusher()
+        return values
+
+    def retire(self, key):
+        """Fold the shard of a thread that is gone into the retired totals"""
+        with self._lock:
+            for name_labels, value in self.shards.pop(key, {}).items():
+                self.retired[name_labels] = merge(self.retired.get(name_labels), value)
+
+    # Collection
+
+    def local_values(self):
+        """The values of this process: {name: {label values: value}}"""
+        with self._lock:
+            shards = [dict(self.retired), *self.shards.values()]
+        totals = {}
+        for shard in shards:
+            for (name, labels), value in list(shard.items()):
+                metric = totals.setdefault(name, {})
+                metric[labels] = merge(metric.get(labels), value)
+        for metric in self.metrics.values():
+            if isinstance(metric, CallbackMetric):
+                totals[metric.name] = {
+                    tuple(str(label) for label in labels): value
+                    for labels, value in metric.callback().items()
+                }
+        return totals
+
+    def collect(self):
+        directory = get_options()['DIRECTORY']
+        if directory is None:
+            return self.local_values()
+        self.flush()
+        totals = {}
+        for pid, values in read_snapshots(directory):
+            alive = pid == os.getpid() or process_alive(pid)
+            for name, series in values.items():
+                metric = self.metrics.get(name)
+                if metric is None or (metric.type == 'gauge' and not alive):
+                    continue
+                target = totals.setdefault(name, {})
+                for labels, value in series.items():
+                    target[labels] = merge(target.get(labels), value)
+        return totals
+
+    def render(self):
+        """The Prometheus text exposition (format 0.0.4)"""
+        values = self.collect()
+        lines = []
+        for name, metric in sorted(self.metrics.items()):
+            lines.append(f'# HELP {name} {metric.help}')
+            lines.append(f'# TYPE {name} {metric.type}')
+            for labels, value in sorted(values.get(name, {}).items()):
+                pairs = list(zip(metric.labelnames, labels))
+                if metric.type == 'histogram':
+                    cumulative = 0
+                    for bound, count in zip((*metric.buckets, '+Inf'), value):
+                        cumulative += count
+                        lines.append(
+                            f'{name}_bucket{format_labels(pairs + [("le", bound)])} {cumulative}'
+                        )
+                    lines.append(f'{name}_sum{format_labels(pairs)} {value[-1]}')
+                    lines.append(f'{name}_count{format_labels(pairs)} {cumulative}')
+                else:
+                    lines.append(f'{name}{format_labels(pairs)} {value}')
+        return '\n'.join(lines) + '\n'
+
+    # Multi-process snapshots
+
+    def flush(self):
+        directory = get_options()['DIRECTORY']
+        if directory is None:
+            return
+        self.changed = False
+        values = {
+            name: [[list(labels), value] for labels, value in series.items()]
+            for name, series in self.local_values().items()
+        }
+        os.makedirs(directory, exist_ok=True)
+        handle, path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        with os.fdopen(handle, 'w') as stream:
+            json.dump(values, stream)
+        os.replace(path, os.path.join(directory, f'metrics-{os.getpid()}.json'))
+
+    def start_flusher(self):
+        options = get_options()
+        if options['DIRECTORY'] is None:
+            return
+        with self._lock:
+            if self._flusher is not None and self._flusher[0] == os.getpid():
+                return
+            thread = threading.Thread(
+                target=self.flush_periodically, args=(options['FLUSH_SECONDS'],),
+                name='metrics-flush', daemon=True,
+            )
+            # Keyed by pid: a forked worker starts its own thread
+            self._flusher = (os.getpid(), thread)
+        thread.start()
+        atexit.register(self.flush_changes)
+
+    def flush_changes(self):
+        if self.changed:
+            try:
+                self.flush()
+            except OSError:
+                pass
+
+    def flush_periodically(self, interval):
+        while True:
+            time.sleep(interval)
+            self.flush_changes()
+
+
+def merge(total, value):
+    if total is None:
+        return list(value) if isinstance(value, list) else value
+    if isinstance(value, list):
+        return [a + b for a, b in zip(total, value)]
+    return total + value
+
+
+def format_labels(pairs):
+    if not pairs:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def read_snapshots(directory):
+    for filename in os.listdir(directory):
+        if not (filename.startswith('metrics-') and filename.endswith('.json')):
+            continue
+        try:
+            with open(os.path.join(directory, filename)) as stream:
+                values = json.load(stream)
+        except (OSError, ValueError):
+            continue
+        pid = int(filename[len('metrics-'):-len('.json')])
+        yield pid, {
+            name: {tuple(labels): value for labels, value in series}
+            for name, series in values.items()
+        }
+
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+registry = Registry()
+
+graphql_operation_duration = registry.histogram(
+    'graphql_operation_duration_seconds',
+    "Time to execute a GraphQL operation",
+    ['operation_type', 'operation'],
+)
+graphql_resolver_duration = registry.histogram(
+    'graphql_resolver_duration_seconds',
+    "Time spent in the resolver of a root field, nested fields excluded",
+    ['field'],
+)
+graphql_mutation_errors = registry.counter(
+    'graphql_mutation_errors_total',
+    "Mutations that raised an error or returned success=false",
+    ['mutation'],
+)
+request_db_queries = registry.histogram(
+    'http_request_db_queries',
+    "SQL statements executed per HTTP request",
+    ['route'],
+    buckets=QUERY_COUNT_BUCKETS,
+)
+organization_lookup_duration = registry.histogram(
+    'organization_lookup_duration_seconds',
+    "Time OrganizationMiddleware spends resolving the X-Organization-Slug header",
+    ['found'],
+    buckets=LOOKUP_BUCKETS,
+)
+db_connections_opened = registry.counter(
+    'db_connections_opened_total',
+    "Database connections opened",
+    ['alias'],
+)
+
+# Every DatabaseWrapper (one per thread and alias) that connected at least once
+_wrappers = weakref.WeakSet()
+
+
+def open_connections():
+    counts = {(alias,): 0 for alias in connections}
+    for wrapper in list(_wrappers):
+        if wrapper.connection is not None:
+            counts[(wrapper.alias,)] = counts.get((wrapper.alias,), 0) + 1
+    return counts
+
+
+registry.callback(
+    'db_connections_open',
+    "Database connections currently open",
+    ['alias'], 'gauge', open_connections,
+)
+
+
+class QueryCounter:
+    """
+    Statements run by a request, including by the worker threads it starts
+    with a copy of its context. itertools.count is incremented atomically.
+    """
+
+    def __init__(self):
+        self._counter = itertools.count()
+
+    def add(self):
+        next(self._counter)
+
+    def total(self):
+        """The final count; call once, reading it counts as a statement"""
+        return next(self._counter)
+
+
+def count_query(execute, sql, params, many, context):
+    counter = _request_queries.get()
+    if counter is not None:
+        counter.add()
+    return execute(sql, params, many, context)
+
+
+def on_connection_created(sender, connection, **kwargs):
+    db_connections_opened.inc(alias=connection.alias)
+    _wrappers.add(connection)
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_query)
+
+
+connection_created.connect(on_connection_created, dispatch_uid='core.metrics')
+
+
+def enabled():
+    return get_options()['ENABLED']
+
+
+def start_request():
+    """Count the statements of the current request; returns the counter"""
+    counter = QueryCounter()
+    _request_queries.set(counter)
+    return counter
+
+
+def finish_request(counter):
+    """Stop counting; returns the number of statements"""
+    # Not reset with a token: the async middleware calls this from another
+    # context than start_request (see core.tenancy.deactivate)
+    _request_queries.set(None)
+    return counter.total()
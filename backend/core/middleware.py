@@ -1,5 +1,30 @@
+import time
+
 from django.utils.deprecation import MiddlewareMixin
 
+from . import metrics, tenancy
+from .cache import organization_cache
+
+
+class MetricsMiddleware(MiddlewareMixin):
+    """
+    Record the number of SQL statements of every request (by URL route) in
+    core.metrics. Listed first so that the other middleware are counted.
+    """
+
+    def process_request(self, request):
+        request.metrics_queries = metrics.start_request() if metrics.enabled() else None
+        return None
+
+    def process_response(self, request, response):
+        counter = getattr(request, 'metrics_queries', None)
+        if counter is not None:
+            match = request.resolver_match
+            metrics.request_db_queries.observe(
+                metrics.finish_request(counter), route=match.route if match else ''
+            )
+        return response
+
 
 class OrganizationMiddleware(MiddlewareMixin):
     """
@@ -7,7 +32,10 @@ class OrganizationMiddleware(MiddlewareMixin):
     This is a basic implementation - in production, you'd want to:
     - Extract organization from subdomain or header
     - Implement proper authentication and authorization
-    - Cache organization lookups
+
+    Organization lookups go through ``core.cache.organization_cache``. The
+    organization is activated for the tenant-scoped managers (core.tenancy)
+    until the response is returned.
     """
     
     def process_request(self, request):
@@ -16,11 +44,20 @@ class OrganizationMiddleware(MiddlewareMixin):
         
         if org_slug:
             from core.models import Organization
+            started = time.perf_counter()
             try:
-                request.organization = Organization.objects.get(slug=org_slug)
+                request.organization = organization_cache.get(org_slug)
             except Organization.DoesNotExist:
                 request.organization = None
+            metrics.organization_lookup_duration.observe(
+                time.perf_counter() - started, found=request.organization is not None
+            )
         else:
             request.organization = None
         
+        tenancy.activate(request.organization)
         return None
+    
+    def process_response(self, request, response):
+        tenancy.deactivate()
+        return response
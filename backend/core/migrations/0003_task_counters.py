@@ -0,0 +1,101 @@
+# Generated by Django 4.2.9 on 2026-10-17 12:14
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+STATUS_FIELDS = {
+    'TODO': 'tasks_todo',
+    'IN_PROGRESS': 'tasks_in_progress',
+    'DONE': 'tasks_done',
+    'BLOCKED': 'tasks_blocked',
+}
+COUNTER_FIELDS = ['tasks_total', *STATUS_FIELDS.values()]
+
+
+def populate_counters(apps, schema_editor):
+    Organization = apps.get_model('core', 'Organization')
+    Project = apps.get_model('core', 'Project')
+    Task = apps.get_model('core', 'Task')
+
+    aggregates = {'tasks_total': Count('id')}
+    for status, field in STATUS_FIELDS.items():
+        aggregates[field] = Count('id', filter=Q(status=status))
+
+    for organization in Organization.objects.all().iterator():
+        totals = dict.fromkeys(COUNTER_FIELDS, 0)
+        rows = (
+            Task.objects.filter(project__organization=organization)
+            .order_by()
+            .values('project_id')
+            .annotate(**aggregates)
+        )
+        projects = []
+        for row in rows:
+            project = Project(pk=row.pop('project_id'), **row)
+            projects.append(project)
+            for field in COUNTER_FIELDS:
+                totals[field] += row[field]
+        Project.objects.bulk_update(projects, COUNTER_FIELDS, batch_size=1000)
+        Organization.objects.filter(pk=organization.pk).update(**totals)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='organization',
+            name='tasks_blocked',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='organization',
+            name='tasks_done',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='organization',
+            name='tasks_in_progress',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='organization',
+            name='tasks_todo',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='organization',
+            name='tasks_total',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='tasks_blocked',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='tasks_done',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='tasks_in_progress',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='tasks_todo',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='tasks_total',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,137 @@
+# Generated by Django 4.2.9 on 2026-10-17 12:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+POSTGRESQL_INDEX = [
+    """
+    ALTER TABLE core_searchentry ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(body, '')), 'B')
+    ) STORED
+    """,
+    'CREATE INDEX core_searchentry_vector_idx ON core_searchentry USING gin (search_vector)',
+]
+POSTGRESQL_DROP = [
+    'DROP INDEX IF EXISTS core_searchentry_vector_idx',
+    'ALTER TABLE core_searchentry DROP COLUMN IF EXISTS search_vector',
+]
+
+# External content FTS5 table kept in sync with core_searchentry by triggers
+SQLITE_INDEX = [
+    """
+    CREATE VIRTUAL TABLE core_searchentry_fts USING fts5(
+        title, body, content='core_searchentry', content_rowid='id',
+        tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER core_searchentry_fts_insert AFTER INSERT ON core_searchentry BEGIN
+        INSERT INTO core_searchentry_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    """,
+    """
+    CREATE TRIGGER core_searchentry_fts_delete AFTER DELETE ON core_searchentry BEGIN
+        INSERT INTO core_searchentry_fts(core_searchentry_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+    END
+    """,
+    """
+    CREATE TRIGGER core_searchentry_fts_update AFTER UPDATE ON core_searchentry BEGIN
+        INSERT INTO core_searchentry_fts(core_searchentry_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO core_searchentry_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    """,
+]
+SQLITE_DROP = [
+    'DROP TRIGGER IF EXISTS core_searchentry_fts_update',
+    'DROP TRIGGER IF EXISTS core_searchentry_fts_delete',
+    'DROP TRIGGER IF EXISTS core_searchentry_fts_insert',
+    'DROP TABLE IF EXISTS core_searchentry_fts',
+]
+
+
+def run_for_vendor(statements):
+    def run(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, ()):
+            schema_editor.execute(statement)
+    return run
+
+
+def populate_entries(apps, schema_editor):
+    Project = apps.get_model('core', 'Project')
+    Task = apps.get_model('core', 'Task')
+    TaskComment = apps.get_model('core', 'TaskComment')
+    SearchEntry = apps.get_model('core', 'SearchEntry')
+
+    entries = [
+        SearchEntry(
+            organization_id=organization_id, kind='project', object_id=pk,
+            project_id=pk, title=name, body=description,
+        )
+        for pk, organization_id, name, description in Project.objects.values_list(
+            'pk', 'organization_id', 'name', 'description'
+        ).iterator()
+    ]
+    SearchEntry.objects.bulk_create(entries, batch_size=1000)
+
+    entries = [
+        SearchEntry(
+            organization_id=organization_id, kind='task', object_id=pk,
+            project_id=project_id, task_id=pk, title=title, body=description,
+        )
+        for pk, project_id, organization_id, title, description in Task.objects.values_list(
+            'pk', 'project_id', 'project__organization_id', 'title', 'description'
+        ).iterator()
+    ]
+    SearchEntry.objects.bulk_create(entries, batch_size=1000)
+
+    entries = [
+        SearchEntry(
+            organization_id=organization_id, kind='comment', object_id=pk,
+            project_id=project_id, task_id=task_id, comment_id=pk, body=content,
+        )
+        for pk, task_id, project_id, organization_id, content in TaskComment.objects.values_list(
+            'pk', 'task_id', 'task__project_id', 'task__project__organization_id', 'content'
+        ).iterator()
+    ]
+    SearchEntry.objects.bulk_create(entries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_task_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('project', 'Project'), ('task', 'Task'), ('comment', 'Comment')], max_length=10)),
+                ('object_id', models.BigIntegerField()),
+                ('title', models.CharField(blank=True, max_length=200)),
+                ('body', models.TextField(blank=True)),
+                ('comment', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.taskcomment')),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.organization')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.project')),
+                ('task', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.task')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['organization', 'kind'], name='core_search_organiz_a250c3_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='searchentry',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_search_entry'),
+        ),
+        migrations.RunPython(
+            run_for_vendor({'postgresql': POSTGRESQL_INDEX, 'sqlite': SQLITE_INDEX}),
+            run_for_vendor({'postgresql': POSTGRESQL_DROP, 'sqlite': SQLITE_DROP}),
+        ),
+        migrations.RunPython(populate_entries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 4.2.9 on 2026-10-17 12:38
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+
+BATCH_SIZE = 5000
+
+
+def backfill_in_batches(queryset, organization):
+    """Set organization_id on ``queryset`` one primary key range at a time"""
+    bounds = queryset.aggregate(low=models.Min('pk'), high=models.Max('pk'))
+    if bounds['low'] is None:
+        return
+    for start in range(bounds['low'], bounds['high'] + 1, BATCH_SIZE):
+        queryset.filter(
+            pk__gte=start, pk__lt=start + BATCH_SIZE, organization__isnull=True
+        ).update(organization_id=organization)
+
+
+def backfill_organizations(apps, schema_editor):
+    Project = apps.get_model('core', 'Project')
+    Task = apps.get_model('core', 'Task')
+    TaskComment = apps.get_model('core', 'TaskComment')
+
+    backfill_in_batches(
+        Task.objects.all(),
+        Subquery(Project.objects.filter(pk=OuterRef('project_id')).values('organization_id')[:1]),
+    )
+    backfill_in_batches(
+        TaskComment.objects.all(),
+        Subquery(Task.objects.filter(pk=OuterRef('task_id')).values('organization_id')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+    # Each backfill batch commits on its own so large tables are not
+    # locked for the whole migration
+    atomic = False
+
+    dependencies = [
+        ('core', '0004_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='organization',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='tasks', to='core.organization'),
+        ),
+        migrations.AddField(
+            model_name='taskcomment',
+            name='organization',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='task_comments', to='core.organization'),
+        ),
+        migrations.RunPython(backfill_organizations, migrations.RunPython.noop),
+    ]
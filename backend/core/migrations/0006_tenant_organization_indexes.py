@@ -0,0 +1,36 @@
+# Generated by Django 4.2.9 on 2026-10-17 12:39
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_tenant_organization'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='task',
+            name='organization',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='tasks', to='core.organization'),
+        ),
+        migrations.AlterField(
+            model_name='taskcomment',
+            name='organization',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='task_comments', to='core.organization'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['organization', 'status', 'created_at', 'id'], name='core_task_organiz_2a08ef_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['organization', 'created_at', 'id'], name='core_task_organiz_e2ef86_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='taskcomment',
+            index=models.Index(fields=['organization', 'created_at', 'id'], name='core_taskco_organiz_ad260e_idx'),
+        ),
+    ]
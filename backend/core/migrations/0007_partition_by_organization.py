@@ -0,0 +1,115 @@
+# Generated by Django 4.2.9 on 2026-10-17 12:52
+
+from django.conf import settings
+from django.db import migrations
+
+# Frozen copy of core.partitioning as of this migration, with a fixed
+# number of hash partitions, so that later changes to that module or to the
+# settings cannot change what it does; TASK_PARTITIONING only decides
+# whether it runs
+TABLES = ['core_task', 'core_taskcomment']
+HASH_PARTITIONS = 8
+
+
+def is_partitioned(connection, table):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)', [table])
+        row = cursor.fetchone()
+    return row is not None and row[0] == 'p'
+
+
+def _convert(connection, table, partitions):
+    qn = connection.ops.quote_name
+    old = f'{table}_unpartitioned'
+    default = f'{table}_default'
+    sequence = f'{table}_id_seq'
+
+    with connection.cursor() as cursor:
+        # A partitioned table cannot have a unique constraint on id alone,
+        # which foreign keys pointing at it would need
+        cursor.execute(
+            "SELECT conrelid::regclass::text, conname FROM pg_constraint "
+            "WHERE contype = 'f' AND confrelid = %s::regclass AND conrelid <> confrelid",
+            [table],
+        )
+        for referencing, name in cursor.fetchall():
+            cursor.execute(f'ALTER TABLE {referencing} DROP CONSTRAINT {qn(name)}')
+
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE contype = 'f' AND conrelid = %s::regclass",
+            [table],
+        )
+        foreign_keys = cursor.fetchall()
+        cursor.execute(
+            "SELECT indexdef FROM pg_indexes WHERE schemaname = current_schema() "
+            "AND tablename = %s AND indexname NOT IN ("
+            "  SELECT conname FROM pg_constraint "
+            "  WHERE conrelid = %s::regclass AND contype IN ('p', 'u')"
+            ")",
+            [table, table],
+        )
+        indexes = [indexdef for indexdef, in cursor.fetchall()]
+
+        cursor.execute(f'ALTER TABLE {qn(table)} RENAME TO {qn(old)}')
+        cursor.execute(
+            f'CREATE TABLE {qn(table)} (LIKE {qn(old)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+            f'PARTITION BY LIST (organization_id)'
+        )
+        cursor.execute(
+            f'CREATE TABLE {qn(default)} PARTITION OF {qn(table)} DEFAULT '
+            f'PARTITION BY HASH (organization_id)'
+        )
+        for remainder in range(partitions):
+            cursor.execute(
+                f'CREATE TABLE {qn(f"{table}_p{remainder}")} PARTITION OF {qn(default)} '
+                f'FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})'
+            )
+        cursor.execute(f'INSERT INTO {qn(table)} SELECT * FROM {qn(old)}')
+        cursor.execute(f'SELECT COALESCE(MAX(id), 0) + 1 FROM {qn(old)}')
+        next_id = cursor.fetchone()[0]
+        # Frees the index names and the identity sequence of the old table
+        cursor.execute(f'DROP TABLE {qn(old)}')
+
+        cursor.execute(f'CREATE SEQUENCE {qn(sequence)} OWNED BY {qn(table)}.id')
+        cursor.execute('SELECT setval(%s, %s, false)', [sequence, next_id])
+        cursor.execute(
+            f"ALTER TABLE {qn(table)} ALTER COLUMN id SET DEFAULT nextval('{sequence}')"
+        )
+        cursor.execute(
+            f'ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(f"{table}_pkey")} '
+            f'PRIMARY KEY (organization_id, id)'
+        )
+        cursor.execute(f'CREATE INDEX {qn(f"{table}_id_idx")} ON {qn(table)} (id)')
+        for indexdef in indexes:
+            cursor.execute(indexdef)
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(name)} {definition}')
+
+
+def partition_if_enabled(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql' or not getattr(settings, 'TASK_PARTITIONING', False):
+        return
+    for table in TABLES:
+        if not is_partitioned(connection, table):
+            _convert(connection, table, HASH_PARTITIONS)
+
+
+class Migration(migrations.Migration):
+    """
+    Opt-in (TASK_PARTITIONING=True): convert core_task and core_taskcomment
+    to tables partitioned by organization, with HASH_PARTITIONS hash
+    partitions for the organizations without a partition of their own.
+    Databases migrated without the setting can be converted later, with any
+    number of partitions, by `manage.py partition_tables`. Unapplying
+    leaves the tables as they are.
+    """
+
+    dependencies = [
+        ('core', '0006_tenant_organization_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_if_enabled, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.9 on 2026-10-17 12:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_partition_by_organization'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowOperation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('operation_name', models.CharField(blank=True, max_length=200)),
+                ('operation_type', models.CharField(blank=True, max_length=20)),
+                ('tenant', models.CharField(blank=True, max_length=100)),
+                ('variables', models.JSONField(default=dict)),
+                ('duration', models.FloatField(help_text='Milliseconds')),
+                ('sql_count', models.IntegerField(default=0)),
+                ('sql_duration', models.FloatField(default=0, help_text='Milliseconds')),
+                ('statements', models.JSONField(default=list)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
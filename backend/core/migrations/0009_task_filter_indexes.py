@@ -0,0 +1,33 @@
+# Generated by Django 4.2.9 on 2026-10-17 13:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_slow_operations'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='task',
+            name='core_task_assigne_040aab_idx',
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['organization', 'assignee_email', 'status', 'due_date', 'id'], name='core_task_organiz_1c54d8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['organization', 'assignee_email', 'created_at', 'id'], name='core_task_organiz_6f2691_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['organization', 'status', 'due_date', 'id'], name='core_task_organiz_67aa8b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['organization', 'due_date', 'id'], name='core_task_organiz_907b1a_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.9 on 2026-10-17 13:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_task_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='task',
+            name='core_task_organiz_1c54d8_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='task',
+            name='core_task_organiz_67aa8b_idx',
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['organization', 'assignee_email', 'due_date', 'id'], name='core_task_organiz_39fc47_idx'),
+        ),
+    ]
@@ -1,8 +1,22 @@
-from django.db import models
+from django.db import models, router, transaction
 from django.utils.text import slugify
 
+from .tenancy import TenantManager, TenantQuerySet
 
-class Organization(models.Model):
+
+class TaskCounters(models.Model):
+    """Materialized task counters, maintained by core.counters"""
+    tasks_total = models.IntegerField(default=0)
+    tasks_todo = models.IntegerField(default=0)
+    tasks_in_progress = models.IntegerField(default=0)
+    tasks_done = models.IntegerField(default=0)
+    tasks_blocked = models.IntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+
+class Organization(TaskCounters):
     """Organization model for multi-tenancy"""
     name = models.CharField(max_length=100)
     slug = models.SlugField(unique=True, max_length=100)
@@ -16,13 +30,69 @@ class Organization(models.Model):
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        organization = super().from_db(db, field_names, values)
+        # The slug the organization cache may hold it under (see
+        # core.signals); None when deferred
+        organization._loaded_slug = organization.__dict__.get('slug')
+        return organization
+
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
         super().save(*args, **kwargs)
+        self._loaded_slug = self.slug
+
+
+class CountedDeleteQuerySet(TenantQuerySet):
+    """
+    QuerySet whose delete() keeps the task counters (core.counters) up to
+    date: the rows are locked and read, deleted by primary key, and their
+    counts removed in the same transaction.
+    """
+    counted_fields = ()
+
+    def delete(self):
+        if self.query.is_sliced:
+            raise TypeError("Cannot use 'limit' or 'offset' with delete().")
+        using = self._db or router.db_for_write(self.model)
+        with transaction.atomic(using=using):
+            rows = list(
+                self.using(using).select_for_update(of=('self',)).order_by()
+                .values('pk', *self.counted_fields)
+            )
+            deleted = (
+                self.model._base_manager.using(using)
+                .filter(pk__in=[row['pk'] for row in rows])
+                .delete()
+            )
+            self.rows_deleted(rows)
+        return deleted
 
+    def rows_deleted(self, rows):
+        raise NotImplementedError
 
-class Project(models.Model):
+
+class ProjectQuerySet(CountedDeleteQuerySet):
+    counted_fields = ('organization_id', *(field.name for field in TaskCounters._meta.local_fields))
+
+    def rows_deleted(self, rows):
+        from . import counters
+        counters.projects_deleted(rows)
+
+
+class TaskQuerySet(CountedDeleteQuerySet):
+    counted_fields = ('project_id', 'organization_id', 'status')
+
+    def rows_deleted(self, rows):
+        from . import counters
+        counters.tasks_deleted(
+            (row['project_id'], row['organization_id'], row['status']) for row in rows
+        )
+
+
+class Project(TaskCounters):
     """Project model - organization dependent"""
     STATUS_CHOICES = [
         ('ACTIVE', 'Active'),
@@ -47,22 +117,32 @@ class Project(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = TenantManager.from_queryset(ProjectQuerySet)()
+    all_objects = models.Manager.from_queryset(ProjectQuerySet)()
+
     class Meta:
-        ordering = ['-created_at']
+        ordering = ['-created_at', '-id']
         indexes = [
             models.Index(fields=['organization', 'status']),
+            models.Index(fields=['organization', 'created_at', 'id']),
         ]
 
     def __str__(self):
         return f"{self.organization.name} - {self.name}"
 
+    def delete(self, *args, **kwargs):
+        from . import counters
+        with transaction.atomic(using=router.db_for_write(Project, instance=self)):
+            counters.project_deleted(self)
+            return super().delete(*args, **kwargs)
+
     @property
     def task_count(self):
-        return self.tasks.count()
+        return self.tasks_total
 
     @property
     def completed_tasks(self):
-        return self.tasks.filter(status='DONE').count()
+        return self.tasks_done
 
     @property
     def completion_rate(self):
@@ -81,6 +161,14 @@ class Task(models.Model):
         ('BLOCKED', 'Blocked'),
     ]
 
+    # Denormalized from project so tenant-scoped queries need no join;
+    # indexed by the composite indexes below
+    organization = models.ForeignKey(
+        Organization,
+        on_delete=models.CASCADE,
+        related_name='tasks',
+        db_index=False
+    )
     project = models.ForeignKey(
         Project,
         on_delete=models.CASCADE,
@@ -98,19 +186,68 @@ class Task(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = TenantManager.from_queryset(TaskQuerySet)()
+    all_objects = models.Manager.from_queryset(TaskQuerySet)()
+
     class Meta:
-        ordering = ['-created_at']
+        ordering = ['-created_at', '-id']
         indexes = [
-            models.Index(fields=['project', 'status']),
-            models.Index(fields=['assignee_email']),
+            models.Index(fields=['project', 'status', 'created_at', 'id']),
+            models.Index(fields=['project', 'created_at', 'id']),
+            models.Index(fields=['organization', 'status', 'created_at', 'id']),
+            models.Index(fields=['organization', 'created_at', 'id']),
+            # Organization-wide filters of Query.tasks: an assignee in either
+            # order, and the due window or due date order. Statuses are left
+            # to a residual filter, as a list of them cannot give index order.
+            models.Index(fields=['organization', 'assignee_email', 'created_at', 'id']),
+            models.Index(fields=['organization', 'assignee_email', 'due_date', 'id']),
+            models.Index(fields=['organization', 'due_date', 'id']),
         ]
 
     def __str__(self):
         return f"{self.project.name} - {self.title}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        task = super().from_db(db, field_names, values)
+        # What the task counters include for this row (see core.counters);
+        # None for deferred fields
+        task._counted_state = tuple(
+            task.__dict__.get(name) for name in ('project_id', 'organization_id', 'status')
+        )
+        return task
+
+    def save(self, *args, **kwargs):
+        from . import counters
+        if self.organization_id is None:
+            self.organization_id = self.project.organization_id
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and not counters.COUNTED_TASK_FIELDS.intersection(update_fields):
+            return super().save(*args, **kwargs)
+        with transaction.atomic(using=router.db_for_write(Task, instance=self)):
+            previous = counters.previous_task_state(self)
+            super().save(*args, **kwargs)
+            counters.task_saved(self, previous)
+
+    def delete(self, *args, **kwargs):
+        from . import counters
+        with transaction.atomic(using=router.db_for_write(Task, instance=self)):
+            previous = counters.previous_task_state(self)
+            deleted = super().delete(*args, **kwargs)
+            if deleted[1].get(self._meta.label):
+                counters.task_deleted(previous)
+        return deleted
+
 
 class TaskComment(models.Model):
     """TaskComment model - linking to tasks"""
+    # Denormalized from task.project, see Task.organization
+    organization = models.ForeignKey(
+        Organization,
+        on_delete=models.CASCADE,
+        related_name='task_comments',
+        db_index=False
+    )
     task = models.ForeignKey(
         Task,
         on_delete=models.CASCADE,
@@ -121,8 +258,99 @@ class TaskComment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = TenantManager()
+    all_objects = models.Manager()
+
     class Meta:
-        ordering = ['created_at']
+        ordering = ['created_at', 'id']
+        indexes = [
+            models.Index(fields=['task', 'created_at', 'id']),
+            models.Index(fields=['organization', 'created_at', 'id']),
+        ]
 
     def __str__(self):
         return f"Comment by {self.author_email} on {self.task.title}"
+
+    def save(self, *args, **kwargs):
+        if self.organization_id is None:
+            self.organization_id = self.task.organization_id
+        super().save(*args, **kwargs)
+
+
+class SearchEntry(models.Model):
+    """
+    Full-text search document for a project, task or comment, maintained
+    by core.search. The inverted index over ``title`` and ``body`` is
+    database specific and created by migration 0004: a generated tsvector
+    column with a GIN index on PostgreSQL, an FTS5 table kept in sync by
+    triggers on SQLite.
+    """
+    PROJECT = 'project'
+    TASK = 'task'
+    COMMENT = 'comment'
+    KIND_CHOICES = [
+        (PROJECT, 'Project'),
+        (TASK, 'Task'),
+        (COMMENT, 'Comment'),
+    ]
+
+    organization = models.ForeignKey(
+        Organization,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    project = models.ForeignKey(
+        Project,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    task = models.ForeignKey(
+        Task,
+        on_delete=models.CASCADE,
+        null=True,
+        related_name='+'
+    )
+    comment = models.ForeignKey(
+        TaskComment,
+        on_delete=models.CASCADE,
+        null=True,
+        related_name='+'
+    )
+    title = models.CharField(max_length=200, blank=True)
+    body = models.TextField(blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='unique_search_entry'),
+        ]
+        indexes = [
+            models.Index(fields=['organization', 'kind']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}"
+
+
+class SlowOperation(models.Model):
+    """
+    A GraphQL operation that exceeded GRAPHQL_SLOW_OPERATIONS['THRESHOLD_MS'],
+    recorded by api.slow_operations with its slowest SQL statements and
+    their plans. Only the shape of the variables is kept.
+    """
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    operation_name = models.CharField(max_length=200, blank=True)
+    operation_type = models.CharField(max_length=20, blank=True)
+    tenant = models.CharField(max_length=100, blank=True)
+    variables = models.JSONField(default=dict)
+    duration = models.FloatField(help_text="Milliseconds")
+    sql_count = models.IntegerField(default=0)
+    sql_duration = models.FloatField(default=0, help_text="Milliseconds")
+    statements = models.JSONField(default=list)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.operation_name or self.operation_type} ({self.duration:.0f} ms)"
@@ -0,0 +1,157 @@
+"""
+Optional PostgreSQL partitioning of the task and comment tables.
+
+Each table becomes LIST partitioned on organization_id:
+
+    core_task
+    ├── core_task_org_<id>     dedicated partition of a large tenant
+    └── core_task_default      every other tenant, HASH partitioned
+        ├── core_task_p0
+        └── ...
+
+The Django models do not change. Queries that filter on organization
+(which the tenant managers of core.tenancy add) only touch one partition
+and its indexes; lookups by id alone probe the id index of every partition.
+
+Caveats of the partitioned layout:
+
+- The primary key becomes (organization_id, id), so foreign keys that
+  point at these tables (comments -> tasks, search entries -> tasks and
+  comments) are dropped; Django still cascades deletes itself.
+- ids come from a plain sequence instead of an identity column.
+- Converting rewrites the tables under an exclusive lock, so run it in a
+  maintenance window.
+"""
+PARTITIONED_TABLES = ['core_task', 'core_taskcomment']
+
+
+def is_partitioned(connection, table):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)', [table])
+        row = cursor.fetchone()
+    return row is not None and row[0] == 'p'
+
+
+def partition_tables(connection, partitions, tables=PARTITIONED_TABLES):
+    """Convert ``tables`` to the partitioned layout; returns the converted tables"""
+    if partitions < 1:
+        raise ValueError("partitions must be at least 1")
+    converted = []
+    for table in tables:
+        if not is_partitioned(connection, table):
+            _convert(connection, table, partitions)
+            converted.append(table)
+    return converted
+
+
+def _convert(connection, table, partitions):
+    qn = connection.ops.quote_name
+    old = f'{table}_unpartitioned'
+    default = f'{table}_default'
+    sequence = f'{table}_id_seq'
+
+    with connection.cursor() as cursor:
+        # A partitioned table cannot have a unique constraint on id alone,
+        # which foreign keys pointing at it would need
+        cursor.execute(
+            "SELECT conrelid::regclass::text, conname FROM pg_constraint "
+            "WHERE contype = 'f' AND confrelid = %s::regclass AND conrelid <> confrelid",
+            [table],
+        )
+        for referencing, name in cursor.fetchall():
+            cursor.execute(f'ALTER TABLE {referencing} DROP CONSTRAINT {qn(name)}')
+
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE contype = 'f' AND conrelid = %s::regclass",
+            [table],
+        )
+        foreign_keys = cursor.fetchall()
+        cursor.execute(
+            "SELECT indexdef FROM pg_indexes WHERE schemaname = current_schema() "
+            "AND tablename = %s AND indexname NOT IN ("
+            "  SELECT conname FROM pg_constraint "
+            "  WHERE conrelid = %s::regclass AND contype IN ('p', 'u')"
+            ")",
+            [table, table],
+        )
+        indexes = [indexdef for indexdef, in cursor.fetchall()]
+
+        cursor.execute(f'ALTER TABLE {qn(table)} RENAME TO {qn(old)}')
+        cursor.execute(
+            f'CREATE TABLE {qn(table)} (LIKE {qn(old)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+            f'PARTITION BY LIST (organization_id)'
+        )
+        cursor.execute(
+            f'CREATE TABLE {qn(default)} PARTITION OF {qn(table)} DEFAULT '
+            f'PARTITION BY HASH (organization_id)'
+        )
+        for remainder in range(partitions):
+            cursor.execute(
+                f'CREATE TABLE {qn(f"{table}_p{remainder}")} PARTITION OF {qn(default)} '
+                f'FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})'
+            )
+        cursor.execute(f'INSERT INTO {qn(table)} SELECT * FROM {qn(old)}')
+        cursor.execute(f'SELECT COALESCE(MAX(id), 0) + 1 FROM {qn(old)}')
+        next_id = cursor.fetchone()[0]
+        # Frees the index names and the identity sequence of the old table
+        cursor.execute(f'DROP TABLE {qn(old)}')
+
+        cursor.execute(f'CREATE SEQUENCE {qn(sequence)} OWNED BY {qn(table)}.id')
+        cursor.execute('SELECT setval(%s, %s, false)', [sequence, next_id])
+        cursor.execute(
+            f"ALTER TABLE {qn(table)} ALTER COLUMN id SET DEFAULT nextval('{sequence}')"
+        )
+        cursor.execute(
+            f'ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(f"{table}_pkey")} '
+            f'PRIMARY KEY (organization_id, id)'
+        )
+        cursor.execute(f'CREATE INDEX {qn(f"{table}_id_idx")} ON {qn(table)} (id)')
+        for indexdef in indexes:
+            cursor.execute(indexdef)
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(name)} {definition}')
+
+
+def dedicate_partition(connection, organization_id, tables=PARTITIONED_TABLES):
+    """Move the rows of one (large) organization into partitions of their own"""
+    qn = connection.ops.quote_name
+    organization_id = int(organization_id)
+    created = []
+    with connection.cursor() as cursor:
+        for table in tables:
+            partition = f'{table}_org_{organization_id}'
+            default = f'{table}_default'
+            cursor.execute('SELECT to_regclass(%s)', [partition])
+            if cursor.fetchone()[0] is not None:
+                continue
+            cursor.execute(
+                f'CREATE TABLE {qn(partition)} '
+                f'(LIKE {qn(table)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'
+            )
+            cursor.execute(
+                f'INSERT INTO {qn(partition)} SELECT * FROM {qn(default)} WHERE organization_id = %s',
+                [organization_id],
+            )
+            cursor.execute(
+                f'DELETE FROM {qn(default)} WHERE organization_id = %s', [organization_id]
+            )
+            # Indexes and foreign keys of the parent are created on attach
+            cursor.execute(
+                f'ALTER TABLE {qn(table)} ATTACH PARTITION {qn(partition)} '
+                f'FOR VALUES IN ({organization_id})'
+            )
+            created.append(partition)
+    return created
+
+
+def list_partitions(connection, table):
+    """(partition, bound, estimated rows) of every leaf partition of ``table``"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::bigint "
+            "FROM pg_partition_tree(%s) tree JOIN pg_class c ON c.oid = tree.relid "
+            "WHERE tree.isleaf ORDER BY c.relname",
+            [table],
+        )
+        return cursor.fetchall()
@@ -0,0 +1,107 @@
+"""
+Read-replica routing.
+
+Reads go to the primary unless they happen inside ``read_from_replicas()``,
+which GraphQLView enters for query operations. Writes always go to the
+primary. After a mutation the tenant is marked with ``mark_written()`` and
+its queries stay on the primary for DATABASE_ROUTING['STICKY_SECONDS'], so
+a client reads its own writes while the replicas catch up.
+"""
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .cache import LRUCache
+
+_read_alias = ContextVar('database_read_alias', default=None)
+
+
+def get_options():
+    options = getattr(settings, 'DATABASE_ROUTING', {})
+    return {
+        'REPLICAS': options.get('REPLICAS', []),
+        'STICKY_SECONDS': options.get('STICKY_SECONDS', 5),
+        'STICKY_ALIAS': options.get('STICKY_ALIAS'),
+    }
+
+
+class StickyTenants:
+    """
+    Tenants that wrote recently. Kept in a process-local LRU and, when
+    STICKY_ALIAS names a Django cache, in that shared cache as well so
+    that every worker sees the mark.
+    """
+
+    key_prefix = 'routing:sticky:'
+
+    def __init__(self):
+        options = get_options()
+        self.ttl = options['STICKY_SECONDS']
+        self.alias = options['STICKY_ALIAS']
+        self.local = LRUCache(max_size=10000, ttl=self.ttl)
+
+    @property
+    def shared(self):
+        return caches[self.alias] if self.alias else None
+
+    def mark(self, tenant):
+        until = time.time() + self.ttl
+        self.local.set(tenant, until)
+        if self.shared is not None:
+            self.shared.set(self.key_prefix + str(tenant), until, self.ttl)
+
+    def is_sticky(self, tenant):
+        until = self.local.get(tenant)
+        if until is None and self.shared is not None:
+            until = self.shared.get(self.key_prefix + str(tenant))
+        return until is not None and until > time.time()
+
+
+sticky_tenants = StickyTenants()
+
+
+def mark_written(tenant):
+    """Keep ``tenant`` (an organization slug, or None) on the primary for a while"""
+    if get_options()['REPLICAS'] and sticky_tenants.ttl > 0:
+        sticky_tenants.mark(tenant)
+
+
+def replica_for(tenant):
+    """
+    A replica alias, picked at random, for reads of ``tenant``; None when
+    there are no replicas or the tenant wrote within the sticky window.
+    """
+    replicas = get_options()['REPLICAS']
+    if not replicas or sticky_tenants.is_sticky(tenant):
+        return None
+    return random.choice(replicas)
+
+
+@contextmanager
+def read_from_replicas(tenant):
+    """Send the reads of the block to ``replica_for(tenant)``"""
+    alias = replica_for(tenant)
+    if alias is None:
+        yield None
+        return
+    token = _read_alias.set(alias)
+    try:
+        yield alias
+    finally:
+        _read_alias.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replicas hold the same data as the primary
+        return True
@@ -0,0 +1,204 @@
+"""
+Full-text search over projects, tasks and comments.
+
+Every searchable object has one SearchEntry row (title + body) that is
+upserted when the object is saved (see core.signals; bulk writes call
+index() directly) and deleted with it through its foreign keys. Queries
+go through the database's inverted index: a GIN-indexed tsvector on
+PostgreSQL, FTS5 on SQLite. Other databases fall back to a substring scan.
+"""
+from functools import reduce
+from operator import and_
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Project, SearchEntry, Task, TaskComment
+
+# Must match the configuration of the generated column in migration 0004
+SEARCH_CONFIG = 'english'
+# Relative weight of a match in the title over one in the body (SQLite)
+TITLE_WEIGHT = 10.0
+INDEXED_FIELDS = {
+    Project: {'name', 'description'},
+    Task: {'title', 'description'},
+    TaskComment: {'content'},
+}
+ENTRY_FIELDS = ['organization', 'project', 'task', 'comment', 'title', 'body']
+
+
+def build_entries(instances):
+    """Return unsaved SearchEntry rows for a mix of projects, tasks and comments"""
+    comments = [instance for instance in instances if isinstance(instance, TaskComment)]
+    comment_projects = dict(
+        Task.all_objects.filter(
+            pk__in={comment.task_id for comment in comments}
+        ).values_list('pk', 'project_id')
+    ) if comments else {}
+
+    entries = []
+    for instance in instances:
+        if isinstance(instance, Project):
+            entries.append(SearchEntry(
+                organization_id=instance.organization_id,
+                kind=SearchEntry.PROJECT,
+                object_id=instance.pk,
+                project_id=instance.pk,
+                title=instance.name,
+                body=instance.description,
+            ))
+        elif isinstance(instance, Task):
+            entries.append(SearchEntry(
+                organization_id=instance.organization_id,
+                kind=SearchEntry.TASK,
+                object_id=instance.pk,
+                project_id=instance.project_id,
+                task_id=instance.pk,
+                title=instance.title,
+                body=instance.description,
+            ))
+        elif isinstance(instance, TaskComment):
+            entries.append(SearchEntry(
+                organization_id=instance.organization_id,
+                kind=SearchEntry.COMMENT,
+                object_id=instance.pk,
+                project_id=comment_projects[instance.task_id],
+                task_id=instance.task_id,
+                comment_id=instance.pk,
+                body=instance.content,
+            ))
+    return entries
+
+
+def index(instances, batch_size=1000):
+    """Insert or refresh the search entries of the given objects"""
+    entries = build_entries(list(instances))
+    SearchEntry.objects.bulk_create(
+        entries,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['kind', 'object_id'],
+        update_fields=ENTRY_FIELDS,
+    )
+    return len(entries)
+
+
+def needs_reindex(model, update_fields=None):
+    """Whether a save of ``model`` touching ``update_fields`` changes indexed text"""
+    return update_fields is None or bool(INDEXED_FIELDS[model] & set(update_fields))
+
+
+def to_fts5_query(text, prefix=False):
+    """
+    Quote every term so that user input is never parsed as FTS5 syntax;
+    with ``prefix`` every term also matches the words it starts.
+    """
+    suffix = '*' if prefix else ''
+    return ' '.join('"{}"{}'.format(term.replace('"', '""'), suffix) for term in text.split())
+
+
+def to_prefix_tsquery(text):
+    """A to_tsquery() input matching words that start with every term of ``text``"""
+    return ' & '.join(
+        "'{}':*".format(term.replace('\\', '\\\\').replace("'", "''")) for term in text.split()
+    )
+
+
+def matching_entries(text, prefix=False):
+    """
+    The SearchEntry rows matching every term of ``text``, unranked and
+    unlimited, as a queryset (e.g. to filter another queryset on).
+    """
+    if not text.split():
+        return SearchEntry.objects.none()
+    if connection.vendor == 'postgresql':
+        if prefix:
+            condition = 'search_vector @@ to_tsquery(%s, %s)'
+            params = [SEARCH_CONFIG, to_prefix_tsquery(text)]
+        else:
+            condition = 'search_vector @@ websearch_to_tsquery(%s, %s)'
+            params = [SEARCH_CONFIG, text]
+        ids = RawSQL(f'SELECT id FROM core_searchentry WHERE {condition}', params)
+    elif connection.vendor == 'sqlite':
+        ids = RawSQL(
+            'SELECT rowid FROM core_searchentry_fts WHERE core_searchentry_fts MATCH %s',
+            [to_fts5_query(text, prefix)],
+        )
+    else:
+        return SearchEntry.objects.filter(reduce(and_, (
+            Q(title__icontains=term) | Q(body__icontains=term) for term in text.split()
+        )))
+    return SearchEntry.objects.filter(id__in=ids)
+
+
+def search(text, organization_id=None, kinds=None, limit=20):
+    """
+    Return the best matching SearchEntry rows for ``text``, each with a
+    ``rank`` attribute (higher is better), optionally restricted to one
+    organization and to some kinds.
+    """
+    if not text.split():
+        return []
+
+    columns = ', '.join(f'e.{field.column}' for field in SearchEntry._meta.concrete_fields)
+    filters = []
+    params = []
+    if organization_id is not None:
+        filters.append('e.organization_id = %s')
+        params.append(organization_id)
+    if kinds:
+        filters.append('e.kind IN ({})'.format(', '.join(['%s'] * len(kinds))))
+        params.extend(kinds)
+
+    if connection.vendor == 'postgresql':
+        sql = (
+            f'SELECT {columns}, ts_rank_cd(e.search_vector, query) AS rank '
+            f'FROM core_searchentry e, websearch_to_tsquery(%s, %s) query '
+            f'WHERE e.search_vector @@ query'
+        )
+        params = [SEARCH_CONFIG, text, *params]
+    elif connection.vendor == 'sqlite':
+        sql = (
+            f'SELECT {columns}, -bm25(core_searchentry_fts, %s, 1.0) AS rank '
+            f'FROM core_searchentry_fts '
+            f'JOIN core_searchentry e ON e.id = core_searchentry_fts.rowid '
+            f'WHERE core_searchentry_fts MATCH %s'
+        )
+        params = [TITLE_WEIGHT, to_fts5_query(text), *params]
+    else:
+        terms = text.split()
+        sql = f'SELECT {columns}, 0 AS rank FROM core_searchentry e WHERE ' + ' AND '.join(
+            ['(LOWER(e.title) LIKE %s OR LOWER(e.body) LIKE %s)'] * len(terms)
+        )
+        params = [
+            value for term in terms for value in [f'%{term.lower()}%'] * 2
+        ] + params
+
+    for condition in filters:
+        sql += f' AND {condition}'
+    sql += ' ORDER BY rank DESC, e.id DESC LIMIT %s'
+    params.append(limit)
+    return list(SearchEntry.objects.raw(sql, params))
+
+
+def rebuild_index(organization=None, batch_size=1000):
+    """Recreate the search entries of every object (of one organization)"""
+    sources = [Project.all_objects.all(), Task.all_objects.all(), TaskComment.all_objects.all()]
+    entries = SearchEntry.objects.all()
+    if organization is not None:
+        entries = entries.filter(organization=organization)
+    entries.delete()
+
+    indexed = 0
+    for queryset in sources:
+        if organization is not None:
+            queryset = queryset.filter(organization=organization)
+        batch = []
+        for instance in queryset.order_by('pk').iterator(chunk_size=batch_size):
+            batch.append(instance)
+            if len(batch) >= batch_size:
+                indexed += index(batch, batch_size)
+                batch = []
+        indexed += index(batch, batch_size)
+    return indexed
@@ -0,0 +1,22 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import search
+from .cache import organization_cache
+from .models import Organization, Project, Task, TaskComment
+
+
+@receiver(post_save, sender=Organization)
+@receiver(post_delete, sender=Organization)
+def invalidate_organization_cache(sender, instance, **kwargs):
+    # The slug it was loaded with too, in case it was renamed (see Organization.from_db)
+    slugs = {instance.slug, getattr(instance, '_loaded_slug', None)} - {None}
+    organization_cache.invalidate(*slugs, pk=instance.pk)
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_save, sender=Task)
+@receiver(post_save, sender=TaskComment)
+def update_search_index(sender, instance, raw=False, update_fields=None, **kwargs):
+    if not raw and search.needs_reindex(sender, update_fields):
+        search.index([instance])
@@ -0,0 +1,70 @@
+"""
+Tenant scoping for querysets.
+
+The organization of the current request (or WebSocket connection) is kept
+in a context variable. Tenant-owned models use TenantManager as their
+default manager, which adds ``organization = <current tenant>`` to every
+query while a tenant is active and behaves like a plain manager otherwise
+(admin, management commands, migrations). Reverse related managers
+(``project.tasks``, ``organization.projects``) derive from the default
+manager and are scoped too. ``Model.all_objects`` is never scoped, nor are
+forward foreign key access (``task.project``) and cascades, which use
+Django's base manager.
+
+Naming another organization than the active tenant (e.g. in an
+``organizationSlug`` argument) raises TenantMismatch, as its scoped
+querysets could only come back empty (see core.cache.get_organization).
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.core.exceptions import PermissionDenied
+from django.db import models
+
+_current_organization = ContextVar('current_organization', default=None)
+
+
+class TenantMismatch(PermissionDenied):
+    """An organization other than the active tenant was requested"""
+
+    def __init__(self, slug, tenant):
+        super().__init__(
+            f"Organization '{slug}' does not match the request's organization '{tenant.slug}'"
+        )
+
+
+def get_current_organization():
+    return _current_organization.get()
+
+
+def activate(organization):
+    """Scope tenant managers in the current context to ``organization``"""
+    _current_organization.set(organization)
+
+
+def deactivate():
+    _current_organization.set(None)
+
+
+@contextmanager
+def tenant(organization):
+    """Scope tenant managers to ``organization`` inside the block"""
+    token = _current_organization.set(organization)
+    try:
+        yield organization
+    finally:
+        _current_organization.reset(token)
+
+
+class TenantQuerySet(models.QuerySet):
+    def for_organization(self, organization):
+        return self.filter(organization=organization)
+
+
+class TenantManager(models.Manager.from_queryset(TenantQuerySet)):
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        organization = get_current_organization()
+        if organization is not None:
+            queryset = queryset.for_organization(organization)
+        return queryset
@@ -0,0 +1,363 @@
+import gc
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import threading
+from datetime import datetime, timezone
+from unittest import mock
+
+from django.db import connection
+from django.core.cache import caches
+from django.contrib.admin.sites import site
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from . import export, metrics, search, tenancy
+from .cache import OrganizationCache, organization_cache
+from .counters import rebuild_counters
+from .importer import TenantImporter
+from .models import Organization, Project, SearchEntry, Task, TaskComment
+
+
+class TaskCounterTests(TestCase):
+    """The ORM write paths keep the materialized task counters exact"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(
+            name="Acme", slug='acme', contact_email='admin@acme.example.com'
+        )
+        cls.project = Project.objects.create(organization=cls.organization, name="Website")
+        cls.other_project = Project.objects.create(organization=cls.organization, name="Mobile")
+
+    def create_task(self, project=None, status='TODO'):
+        return Task.objects.create(project=project or self.project, title="Task", status=status)
+
+    def assertCountersExact(self):
+        organization = Organization.objects.get(pk=self.organization.pk)
+        self.assertEqual(rebuild_counters(organization, dry_run=True), [])
+        return organization
+
+    def test_create(self):
+        self.create_task()
+        self.create_task(status='DONE')
+        organization = self.assertCountersExact()
+        self.assertEqual((organization.tasks_total, organization.tasks_done), (2, 1))
+
+    def test_status_change(self):
+        task = self.create_task()
+        task.status = 'IN_PROGRESS'
+        task.save()
+        task.status = 'DONE'
+        task.save(update_fields=['status'])
+        project = Project.objects.get(pk=self.project.pk)
+        self.assertEqual((project.tasks_todo, project.tasks_done), (0, 1))
+        self.assertCountersExact()
+
+    def test_save_without_counted_fields(self):
+        task = self.create_task()
+        task.title = "Renamed"
+        with CaptureQueriesContext(connection) as queries:
+            task.save(update_fields=['title'])
+        self.assertFalse([query for query in queries if 'core_project' in query['sql']])
+        self.assertCountersExact()
+
+    def test_move_to_other_project(self):
+        task = self.create_task(status='BLOCKED')
+        task.project = self.other_project
+        task.save()
+        project = Project.objects.get(pk=self.other_project.pk)
+        self.assertEqual((project.tasks_total, project.tasks_blocked), (1, 1))
+        self.assertCountersExact()
+
+    def test_reloaded_task(self):
+        task = self.create_task()
+        task = Task.objects.only('pk', 'title').get(pk=task.pk)
+        task.status = 'DONE'
+        task.save()
+        self.assertCountersExact()
+
+    def test_instance_delete(self):
+        task = self.create_task()
+        self.create_task()
+        task.delete()
+        organization = self.assertCountersExact()
+        self.assertEqual(organization.tasks_total, 1)
+
+    def test_queryset_delete(self):
+        self.create_task()
+        self.create_task(status='DONE')
+        self.create_task(project=self.other_project)
+        _, deleted = Task.objects.filter(status='TODO').delete()
+        self.assertEqual(deleted['core.Task'], 2)
+        organization = self.assertCountersExact()
+        self.assertEqual(organization.tasks_total, 1)
+
+    def test_project_delete(self):
+        self.create_task()
+        self.create_task(project=self.other_project)
+        self.project.delete()
+        organization = self.assertCountersExact()
+        self.assertEqual(organization.tasks_total, 1)
+
+    def test_project_queryset_delete(self):
+        self.create_task()
+        self.create_task(project=self.other_project, status='DONE')
+        Project.objects.filter(pk=self.other_project.pk).delete()
+        organization = self.assertCountersExact()
+        self.assertEqual((organization.tasks_total, organization.tasks_done), (1, 0))
+
+
+class OrganizationCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(
+            name="Acme", slug='acme', contact_email='admin@acme.example.com'
+        )
+
+    def setUp(self):
+        organization_cache.clear()
+
+    def test_hit(self):
+        with self.assertNumQueries(1):
+            organization_cache.get('acme')
+        with self.assertNumQueries(0):
+            organization = organization_cache.get('acme')
+        self.assertEqual((organization.pk, organization.name), (self.organization.pk, "Acme"))
+
+    def test_rename(self):
+        organization = organization_cache.get('acme')
+        organization.slug = 'acme-corp'
+        # Only the UPDATE: the previous slug is known from loading
+        with self.assertNumQueries(1):
+            organization.save()
+        with self.assertRaises(Organization.DoesNotExist):
+            organization_cache.get('acme')
+        self.assertEqual(organization_cache.get('acme-corp').pk, self.organization.pk)
+
+    def test_delete(self):
+        organization_cache.get('acme')
+        Organization.objects.get(pk=self.organization.pk).delete()
+        with self.assertRaises(Organization.DoesNotExist):
+            organization_cache.get('acme')
+
+    @override_settings(ORGANIZATION_CACHE={'ALIAS': 'default'})
+    def test_shared_cache(self):
+        caches['default'].clear()
+        self.addCleanup(caches['default'].clear)
+        cache = OrganizationCache()
+        cache.get('acme')
+        # Another process: an empty local cache in front of the shared one
+        cache.local.clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(cache.get('acme').pk, self.organization.pk)
+        cache.invalidate('acme')
+        with self.assertNumQueries(1):
+            cache.get('acme')
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(
+            name="Acme", slug='acme', contact_email='admin@acme.example.com'
+        )
+        cls.other = Organization.objects.create(
+            name="Other", slug='other', contact_email='admin@other.example.com'
+        )
+        cls.project = Project.objects.create(organization=cls.organization, name="Website")
+        cls.title_match = Task.objects.create(project=cls.project, title="Login page")
+        cls.body_match = Task.objects.create(
+            project=cls.project, title="Styles", description="Match the login colors"
+        )
+        cls.comment = TaskComment.objects.create(
+            task=cls.body_match, content="The login button is blue", author_email='a@acme.example.com'
+        )
+        other_project = Project.objects.create(organization=cls.other, name="Mobile")
+        cls.other_task = Task.objects.create(project=other_project, title="Login screen")
+
+    def matches(self, text, **kwargs):
+        return [(entry.kind, entry.object_id) for entry in search.search(text, **kwargs)]
+
+    def test_title_matches_rank_first(self):
+        results = self.matches("login", organization_id=self.organization.pk, kinds=[SearchEntry.TASK])
+        self.assertEqual(results, [('task', self.title_match.pk), ('task', self.body_match.pk)])
+
+    def test_tenant_isolation(self):
+        acme = self.matches("login", organization_id=self.organization.pk)
+        self.assertNotIn(('task', self.other_task.pk), acme)
+        other = self.matches("login", organization_id=self.other.pk)
+        self.assertEqual(other, [('task', self.other_task.pk)])
+
+    def test_kinds(self):
+        self.assertEqual(
+            self.matches("login", organization_id=self.organization.pk, kinds=[SearchEntry.COMMENT]),
+            [('comment', self.comment.pk)]
+        )
+
+    def test_index_follows_save_and_delete(self):
+        self.title_match.title = "Sign-in page"
+        self.title_match.save()
+        self.assertNotIn(('task', self.title_match.pk), self.matches("login"))
+        self.assertIn(('task', self.title_match.pk), self.matches("sign"))
+        self.body_match.delete()
+        self.assertEqual(self.matches("colors"), [])
+        self.assertEqual(self.matches("button"), [])
+
+    def test_terms_are_not_query_syntax(self):
+        self.assertEqual(self.matches('login" OR "styles'), [])
+
+    def test_admin_matches_prefixes(self):
+        request = RequestFactory().get('/admin/core/task/')
+        results, _ = site._registry[Task].get_search_results(request, Task.objects.all(), "logi")
+        self.assertEqual(set(results), {self.title_match, self.body_match, self.other_task})
+
+    def test_admin_is_not_capped(self):
+        tasks = Task.objects.bulk_create(
+            Task(organization=self.organization, project=self.project, title=f"Bulk task {index}")
+            for index in range(1005)
+        )
+        search.index(tasks)
+        request = RequestFactory().get('/admin/core/task/')
+        results, _ = site._registry[Task].get_search_results(request, Task.objects.all(), "bulk")
+        self.assertEqual(results.count(), 1005)
+
+
+class TenancyTests(TestCase):
+    def test_reverse_managers_are_scoped(self):
+        organization = Organization.objects.create(
+            name="Acme", slug='acme', contact_email='admin@acme.example.com'
+        )
+        other = Organization.objects.create(
+            name="Other", slug='other', contact_email='admin@other.example.com'
+        )
+        project = Project.objects.create(organization=organization, name="Website")
+        Task.objects.create(project=project, title="Task")
+        with tenancy.tenant(other):
+            self.assertEqual(project.tasks.count(), 0)
+            self.assertEqual(organization.projects.count(), 0)
+        with tenancy.tenant(organization):
+            self.assertEqual(project.tasks.count(), 1)
+
+
+class ImporterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(
+            name="Acme", slug='acme', contact_email='admin@acme.example.com'
+        )
+
+    def import_records(self, records):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'tenant.ndjson')
+        with open(path, 'w') as stream:
+            for record in records:
+                stream.write(json.dumps(record) + '\n')
+        self.logged = []
+        importer = TenantImporter(
+            [path], path + '.import-state', organization=self.organization,
+            use_copy=False, log=self.logged.append
+        )
+        importer.run()
+        return importer
+
+    def test_rows_keep_imported_timestamps(self):
+        created, updated = '2020-01-02T03:04:05+00:00', '2021-06-07T08:09:10+00:00'
+        self.import_records([
+            {'type': 'projects', 'id': 1, 'name': "Website", 'created_at': created, 'updated_at': updated},
+            {'type': 'tasks', 'id': 1, 'project_id': 1, 'title': "Launch", 'status': 'DONE',
+             'created_at': created, 'updated_at': updated},
+            {'type': 'comments', 'id': 1, 'task_id': 1, 'content': "Shipped",
+             'author_email': 'dev@acme.example.com', 'created_at': created, 'updated_at': updated},
+        ])
+
+        expected = (datetime(2020, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+                    datetime(2021, 6, 7, 8, 9, 10, tzinfo=timezone.utc))
+        task = Task.all_objects.get(title="Launch")
+        for obj in (task.project, task, task.comments.get()):
+            self.assertEqual((obj.created_at, obj.updated_at), expected)
+        self.assertEqual(Project.objects.get(pk=task.project_id).tasks_done, 1)
+
+    def test_invalid_rows_are_skipped(self):
+        importer = self.import_records([
+            {'type': 'projects', 'id': 1, 'name': "Website"},
+            {'type': 'tasks', 'id': 1, 'project_id': 1, 'title': "Valid", 'status': 'DONE'},
+            {'type': 'tasks', 'id': 2, 'project_id': 1, 'title': "Bad status", 'status': 'NOPE'},
+            {'type': 'tasks', 'id': 3, 'project_id': 1, 'title': "Bad email",
+             'assignee_email': 'not an email'},
+            {'type': 'comments', 'id': 1, 'task_id': 2, 'content': "On a skipped task",
+             'author_email': 'dev@acme.example.com'},
+        ])
+        self.assertEqual(list(Task.all_objects.values_list('title', flat=True)), ["Valid"])
+        self.assertEqual(importer.counts['tasks'], 1)
+        # The two tasks, then the comment of the skipped task
+        self.assertEqual(importer.skipped, 3)
+        self.assertIn("tasks 2: status:", ' '.join(self.logged))
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(
+            name="Acme", slug='acme', contact_email='admin@acme.example.com'
+        )
+        project = Project.objects.create(
+            organization=cls.organization, name="Website", description="Redesign, phase 1"
+        )
+        for index in range(30):
+            task = Task.objects.create(project=project, title=f"Task {index}", status='DONE')
+            TaskComment.objects.create(
+                task=task, content=f"Comment {index}", author_email='dev@acme.example.com'
+            )
+
+    def export(self, format, compress=False):
+        response = self.client.get(
+            '/export/', {'format': format, 'gzip': '1' if compress else '0'},
+            HTTP_X_ORGANIZATION_SLUG='acme',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        # A small buffer makes the stream span several chunks
+        with mock.patch.object(export, 'BUFFER_SIZE', 512):
+            chunks = list(response.streaming_content)
+        self.assertGreater(len(chunks), 1)
+        data = b''.join(chunks)
+        return gzip.decompress(data) if compress else data
+
+    def round_trip(self, format, data):
+        """Delete the organization, then import ``data`` in its place"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, f'acme.{format}')
+        with open(path, 'wb') as stream:
+            stream.write(data)
+        self.organization.delete()
+        importer = TenantImporter([path], path + '.import-state', use_copy=False, log=lambda line: None)
+        importer.run()
+        self.assertEqual(importer.skipped, 0)
+        organization = Organization.objects.get(slug='acme')
+        self.assertEqual(organization.contact_email, 'admin@acme.example.com')
+        project = Project.objects.get(organization=organization)
+        self.assertEqual(project.description, "Redesign, phase 1")
+        self.assertEqual(project.tasks_done, 30)
+        self.assertEqual(TaskComment.all_objects.filter(organization=organization).count(), 30)
+
+    def test_ndjson_round_trip(self):
+        data = self.export('ndjson')
+        records = [json.loads(line) for line in data.decode().splitlines()]
+        self.assertEqual(records[0], {
+            'type': 'organizations', 'slug': 'acme', 'name': "Acme",
+            'contact_email': 'admin@acme.example.com',
+        })
+        self.assertEqual([record['type'] for record in records].count('tasks'), 30)
+        self.assertTrue(all(record.get('organization') == 'acme' for record in records[1:]))
+        self.round_trip('ndjson', data)
+
+    def test_gzipped_csv_round_trip(self):
+        data = self.export('csv', compress=True)
+        header = data.decode().splitlines()[0].split(',')
+        self.assertEqual(header[:2], ['type', 'organization'])
+        self.round_trip('csv', data)
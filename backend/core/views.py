@@ -0,0 +1,59 @@
+from django.http import (
+    Http404,
+    HttpResponse,
+    HttpResponseBadRequest,
+    HttpResponseNotAllowed,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+
+from . import export, metrics
+from .cache import get_organization
+from .models import Organization
+from .routers import replica_for
+
+
+def export_organization(request):
+    """
+    Stream the projects, tasks and comments of the requesting organization
+    (X-Organization-Slug header or ``organization`` parameter).
+
+    Query parameters: ``format`` (ndjson or csv), ``types`` (comma
+    separated subset of projects,tasks,comments) and ``gzip`` (1 to
+    compress the stream).
+    """
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+
+    slug = request.GET.get('organization')
+    try:
+        organization = get_organization(slug, request) if slug else request.organization
+    except Organization.DoesNotExist:
+        organization = None
+    if organization is None:
+        return JsonResponse({'error': "Organization not found"}, status=404)
+
+    format = request.GET.get('format', 'ndjson')
+    types = [kind for kind in request.GET.get('types', '').split(',') if kind] or list(export.EXPORTS)
+    compress = request.GET.get('gzip') in ('1', 'true')
+    try:
+        chunks = export.export_chunks(
+            organization, format, types, compress, using=replica_for(organization.slug)
+        )
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+
+    response = StreamingHttpResponse(chunks, content_type=export.CONTENT_TYPES[format])
+    if compress:
+        response['Content-Type'] = 'application/gzip'
+    response['Content-Disposition'] = (
+        f'attachment; filename="{export.filename(organization, format, compress)}"'
+    )
+    return response
+
+
+def metrics_view(request):
+    """The core.metrics registry in the Prometheus text format"""
+    if not metrics.enabled():
+        raise Http404
+    return HttpResponse(metrics.registry.render(), content_type=metrics.CONTENT_TYPE)
@@ -1,5 +1,6 @@
 import os
 import sys
+import tempfile
 import django
 
 # Add the backend directory to the path
@@ -9,80 +10,27 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project_management.settings')
 django.setup()
 
+from django.core.management import call_command
+
 from core.models import Organization, Project, Task
-from datetime import date, timedelta
 
-# Create a sample organization
-org, created = Organization.objects.get_or_create(
-    slug="acme-corp",
-    defaults={
-        "name": "Acme Corporation",
-        "contact_email": "contact@acme.com"
-    }
-)
+SAMPLE_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sample_data', 'acme-corp.ndjson')
 
-if created:
-    print(f"✅ Created organization: {org.name}")
-else:
+org = Organization.objects.filter(slug="acme-corp").first()
+if org:
     print(f"ℹ️  Organization already exists: {org.name}")
-
-# Create sample projects
-project1, created = Project.objects.get_or_create(
-    organization=org,
-    name="Website Redesign",
-    defaults={
-        "description": "Complete overhaul of the company website",
-        "status": "ACTIVE",
-        "due_date": date.today() + timedelta(days=30)
-    }
-)
-
-project2, created = Project.objects.get_or_create(
-    organization=org,
-    name="Mobile App Development",
-    defaults={
-        "description": "Develop iOS and Android mobile applications",
-        "status": "ACTIVE",
-        "due_date": date.today() + timedelta(days=60)
-    }
-)
-
-project3, created = Project.objects.get_or_create(
-    organization=org,
-    name="Marketing Campaign Q1",
-    defaults={
-        "description": "Q1 marketing initiatives",
-        "status": "ON_HOLD"
-    }
-)
-
-# Create sample tasks
-tasks_data = [
-    (project1, "Design homepage mockup", "Create modern homepage design", "DONE", "designer@acme.com"),
-    (project1, "Implement responsive navigation", "Build mobile-friendly navigation menu", "IN_PROGRESS", "developer@acme.com"),
-    (project1, "Setup contact form", "Implement and test contact form", "TODO", "developer@acme.com"),
-    (project2, "Setup React Native project", "Initialize project with Expo", "DONE", "mobile-dev@acme.com"),
-    (project2, "Design app wireframes", "Create wireframes for all screens", "IN_PROGRESS", "ux-designer@acme.com"),
-    (project2, "Implement authentication", "Add login and signup functionality", "TODO", "mobile-dev@acme.com"),
-]
-
-for project, title, description, status, email in tasks_data:
-    task, created = Task.objects.get_or_create(
-        project=project,
-        title=title,
-        defaults={
-            "description": description,
-            "status": status,
-            "assignee_email": email
-        }
-    )
+else:
+    with tempfile.TemporaryDirectory() as directory:
+        call_command('import_tenant', SAMPLE_DATA, state=os.path.join(directory, 'import-state'))
+    org = Organization.objects.get(slug="acme-corp")
+    print(f"✅ Created organization: {org.name}")
 
 print("\n" + "="*60)
 print("✅ Sample data setup complete!")
 print("="*60)
 print(f"\nOrganization: {org.name} (slug: {org.slug})")
-print(f"Projects: {Project.objects.count()}")
-print(f"Tasks: {Task.objects.count()}")
+print(f"Projects: {Project.all_objects.filter(organization=org).count()}")
+print(f"Tasks: {Task.all_objects.filter(organization=org).count()}")
 print("\n🚀 Next steps:")
 print("1. Open http://localhost:3000 in your browser")
 print("2. Open browser console (F12) and run:")
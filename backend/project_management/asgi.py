@@ -13,4 +13,16 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project_management.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from api.websockets import GraphQLWebSocketApp  # noqa: E402  (needs the app registry)
+
+websocket_application = GraphQLWebSocketApp()
+
+
+async def application(scope, receive, send):
+    """Route WebSocket connections to GraphQL subscriptions, the rest to Django"""
+    if scope['type'] == 'websocket':
+        await websocket_application(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
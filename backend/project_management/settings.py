@@ -11,7 +11,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -51,6 +51,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -105,9 +106,52 @@ else:
             'PASSWORD': config('DATABASE_PASSWORD', default='postgres'),
             'HOST': config('DATABASE_HOST', default='localhost'),
             'PORT': config('DATABASE_PORT', default='5432'),
+            # Persistent connections: each worker thread keeps its connection
+            # for CONN_MAX_AGE seconds (0 closes it after every request, None
+            # never does) instead of reconnecting per request; with health
+            # checks a connection that went away is replaced before it is
+            # reused. SQLite connections are cheap local file opens and keep
+            # Django's defaults.
+            'CONN_MAX_AGE': config(
+                'DATABASE_CONN_MAX_AGE', default='60',
+                cast=lambda value: None if value.lower() == 'none' else int(value)
+            ),
+            'CONN_HEALTH_CHECKS': config('DATABASE_CONN_HEALTH_CHECKS', default=True, cast=bool),
+            'OPTIONS': {
+                'connect_timeout': config('DATABASE_CONNECT_TIMEOUT', default=5, cast=int),
+            },
+            # Behind PgBouncer in transaction pooling mode, set
+            # DATABASE_PGBOUNCER=True to disable server-side cursors
+            'DISABLE_SERVER_SIDE_CURSORS': config('DATABASE_PGBOUNCER', default=False, cast=bool),
         }
     }
 
+# Opt-in: migration 0007 converts the task and comment tables to tables
+# partitioned by organization, with 8 hash partitions (PostgreSQL only, see
+# core.partitioning; `manage.py partition_tables` converts later)
+TASK_PARTITIONING = config('TASK_PARTITIONING', default=False, cast=bool)
+
+# Read replicas used by GraphQL queries (see core.routers): PostgreSQL hosts
+# ("host" or "host:port") or, with USE_SQLITE, database file paths. After a
+# mutation, the tenant's queries stay on the primary for STICKY_SECONDS;
+# STICKY_ALIAS optionally names an entry in CACHES shared by all workers.
+DATABASE_REPLICAS = config('DATABASE_REPLICAS', default='', cast=Csv())
+for index, replica in enumerate(DATABASE_REPLICAS, start=1):
+    replica_settings = dict(DATABASES['default'], TEST={'MIRROR': 'default'})
+    if USE_SQLITE:
+        replica_settings['NAME'] = replica
+    else:
+        replica_settings['HOST'], _, port = replica.partition(':')
+        replica_settings['PORT'] = port or replica_settings['PORT']
+    DATABASES[f'replica{index}'] = replica_settings
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+DATABASE_ROUTING = {
+    'REPLICAS': [f'replica{index}' for index in range(1, len(DATABASE_REPLICAS) + 1)],
+    'STICKY_SECONDS': config('DATABASE_STICKY_SECONDS', default=5, cast=int),
+    'STICKY_ALIAS': config('DATABASE_STICKY_CACHE_ALIAS', default='') or None,
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -171,12 +215,114 @@ CORS_ALLOW_HEADERS = [
     'x-organization-slug',  # Custom header for multi-tenancy
 ]
 
+# Tenant resolution cache (see core.cache.OrganizationCache)
+# ALIAS optionally names an entry in CACHES used as a shared second tier.
+ORGANIZATION_CACHE = {
+    'TTL': config('ORGANIZATION_CACHE_TTL', default=60, cast=int),
+    'MAX_SIZE': config('ORGANIZATION_CACHE_MAX_SIZE', default=1024, cast=int),
+    'ALIAS': config('ORGANIZATION_CACHE_ALIAS', default='') or None,
+}
+
+# Read-only GraphQL response cache (see api.response_cache)
+# BACKEND is 'local' (per-process LRU) or 'django' (the CACHES entry named by ALIAS).
+GRAPHQL_RESPONSE_CACHE = {
+    'ENABLED': config('GRAPHQL_RESPONSE_CACHE_ENABLED', default=False, cast=bool),
+    'BACKEND': config('GRAPHQL_RESPONSE_CACHE_BACKEND', default='local'),
+    'ALIAS': config('GRAPHQL_RESPONSE_CACHE_ALIAS', default='default'),
+    'TTL': config('GRAPHQL_RESPONSE_CACHE_TTL', default=30, cast=int),
+    'MAX_SIZE': config('GRAPHQL_RESPONSE_CACHE_MAX_SIZE', default=1000, cast=int),
+}
+
+# Parsed/validated document cache and automatic persisted queries (see api.documents)
+GRAPHQL_DOCUMENT_CACHE = {
+    'MAX_SIZE': config('GRAPHQL_DOCUMENT_CACHE_MAX_SIZE', default=500, cast=int),
+}
+GRAPHQL_PERSISTED_QUERIES = {
+    'MAX_SIZE': config('GRAPHQL_PERSISTED_QUERIES_MAX_SIZE', default=1000, cast=int),
+    'ALIAS': config('GRAPHQL_PERSISTED_QUERIES_ALIAS', default='') or None,
+}
+
+# GraphQL subscriptions over WebSockets (see api.broker, api.websockets)
+GRAPHQL_SUBSCRIPTIONS = {
+    'BROKER': config('GRAPHQL_SUBSCRIPTIONS_BROKER', default='api.broker.InMemoryBroker'),
+    'QUEUE_SIZE': config('GRAPHQL_SUBSCRIPTIONS_QUEUE_SIZE', default=1000, cast=int),
+    'CONNECTION_INIT_TIMEOUT': config('GRAPHQL_SUBSCRIPTIONS_INIT_TIMEOUT', default=10, cast=int),
+}
+
+# Static query depth/cost limits (see api.query_cost)
+GRAPHQL_QUERY_LIMITS = {
+    'MAX_DEPTH': config('GRAPHQL_QUERY_MAX_DEPTH', default=8, cast=int),
+    'MAX_COST': config('GRAPHQL_QUERY_MAX_COST', default=5000, cast=int),
+    # Assumed length of lists without pagination arguments
+    'DEFAULT_LIST_SIZE': config('GRAPHQL_QUERY_DEFAULT_LIST_SIZE', default=20, cast=int),
+}
+
+# A JSON array of up to MAX_OPERATIONS operations may be POSTed to /graphql/
+# (0 disables batching).
+GRAPHQL_BATCH = {
+    'MAX_OPERATIONS': config('GRAPHQL_BATCH_MAX_OPERATIONS', default=10, cast=int),
+}
+
+# Prometheus metrics at /metrics (see core.metrics). With several worker
+# processes, set DIRECTORY to a directory shared by them (cleared on deploy)
+# so that every worker reports the totals of all of them.
+METRICS = {
+    'ENABLED': config('METRICS_ENABLED', default=True, cast=bool),
+    'DIRECTORY': config('METRICS_DIRECTORY', default=''),
+    'FLUSH_SECONDS': config('METRICS_FLUSH_SECONDS', default=5, cast=int),
+}
+
+# Per-resolver timings and SQL counts in extensions.tracing (see api.tracing)
+# for this fraction of the GraphQL operations (0 disables, 1 traces all)
+GRAPHQL_TRACING = {
+    'SAMPLE_RATE': config('GRAPHQL_TRACING_SAMPLE_RATE', default=0.0, cast=float),
+}
+
+# Operations taking THRESHOLD_MS or more are recorded with their slowest SQL
+# statements and EXPLAIN plans (see api.slow_operations); 0 disables.
+# STORE: 'log' (the api.slow_operations logger below) and/or 'table'
+# (core.SlowOperation, listed in the admin).
+GRAPHQL_SLOW_OPERATIONS = {
+    'THRESHOLD_MS': config('GRAPHQL_SLOW_OPERATION_MS', default=0, cast=int),
+    'STATEMENTS': config('GRAPHQL_SLOW_OPERATION_STATEMENTS', default=5, cast=int),
+    'EXPLAIN': config('GRAPHQL_SLOW_OPERATION_EXPLAIN', default=True, cast=bool),
+    'ANALYZE': config('GRAPHQL_SLOW_OPERATION_ANALYZE', default=False, cast=bool),
+    'STORE': config('GRAPHQL_SLOW_OPERATION_STORE', default='log', cast=Csv()),
+}
+GRAPHQL_SLOW_OPERATION_LOG = config('GRAPHQL_SLOW_OPERATION_LOG', default='')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        # Records are single JSON objects
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'slow_operations': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': GRAPHQL_SLOW_OPERATION_LOG,
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 5,
+            'formatter': 'message',
+        } if GRAPHQL_SLOW_OPERATION_LOG else {
+            'class': 'logging.StreamHandler',
+            'formatter': 'message',
+        },
+    },
+    'loggers': {
+        'api.slow_operations': {
+            'handlers': ['slow_operations'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
 # GraphQL settings
 GRAPHENE = {
     'SCHEMA': 'api.schema.schema',
-    'MIDDLEWARE': [
-        'graphene_django.debug.DjangoDebugMiddleware',
-    ],
+    'MIDDLEWARE': [],
 }
 
 # REST Framework settings
@@ -27,16 +27,18 @@ const ProjectCard: React.FC<ProjectCardProps> = ({ project, organizationSlug })
             variables: { organizationSlug, status: null }
           })
           
-          const projects = (cachedData as any)?.projects || []
+          const projects = (cachedData as any)?.projects
           
           // Filter out deleted project
-          const updatedProjects = projects.filter((p: Project) => p.id !== project.id)
+          const updatedEdges = (projects?.edges || []).filter(
+            (edge: { node: Project }) => edge.node.id !== project.id
+          )
           
           // Write updated data back to cache
           cache.writeQuery({
             query: GET_PROJECTS,
             variables: { organizationSlug, status: null },
-            data: { projects: updatedProjects }
+            data: { projects: { ...projects, edges: updatedEdges } }
           })
         } catch (error) {
           console.error('Cache update error:', error)
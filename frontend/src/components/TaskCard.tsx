@@ -26,16 +26,18 @@ const TaskCard: React.FC<TaskCardProps> = ({ task, onTaskClick, projectId }) =>
             variables: { projectId, status: null }
           })
           
-          const tasks = (cachedData as any)?.tasks || []
+          const tasks = (cachedData as any)?.tasks
           
           // Filter out deleted task
-          const updatedTasks = tasks.filter((t: Task) => t.id !== task.id)
+          const updatedEdges = (tasks?.edges || []).filter(
+            (edge: { node: Task }) => edge.node.id !== task.id
+          )
           
           // Write updated data back to cache
           cache.writeQuery({
             query: GET_TASKS,
             variables: { projectId, status: null },
-            data: { tasks: updatedTasks }
+            data: { tasks: { ...tasks, edges: updatedEdges } }
           })
         } catch (error) {
           console.error('Cache update error:', error)
@@ -1,7 +1,6 @@
 import React, { useState } from 'react'
 import { useMutation } from '@apollo/client'
 import { CREATE_TASK } from '../graphql/mutations'
-import { GET_TASKS } from '../graphql/queries'
 
 interface TaskFormProps {
   projectId: number
@@ -17,8 +16,8 @@ const TaskForm: React.FC<TaskFormProps> = ({ projectId, onClose }) => {
     dueDate: '',
   })
 
+  // The new task reaches the board through the taskEvents subscription
   const [createTask, { loading }] = useMutation(CREATE_TASK, {
-    refetchQueries: [{ query: GET_TASKS, variables: { projectId } }],
     onCompleted: (data) => {
       if (data.createTask.success) {
         onClose()
@@ -1,17 +1,29 @@
 import { gql } from '@apollo/client'
 
+// Items requested per page of a connection; the server caps pages at 100
+export const PAGE_SIZE = 50
+
 export const GET_PROJECTS = gql`
-  query GetProjects($organizationSlug: String!, $status: String) {
-    projects(organizationSlug: $organizationSlug, status: $status) {
-      id
-      name
-      description
-      status
-      dueDate
-      taskCount
-      completedTasks
-      completionRate
-      createdAt
+  query GetProjects($organizationSlug: String!, $status: String, $first: Int, $after: String) {
+    projects(organizationSlug: $organizationSlug, status: $status, first: $first, after: $after) {
+      edges {
+        cursor
+        node {
+          id
+          name
+          description
+          status
+          dueDate
+          taskCount
+          completedTasks
+          completionRate
+          createdAt
+        }
+      }
+      pageInfo {
+        hasNextPage
+        endCursor
+      }
     }
   }
 `
@@ -33,26 +45,44 @@ export const GET_PROJECT = gql`
 `
 
 export const GET_TASKS = gql`
-  query GetTasks($projectId: Int!, $status: String) {
-    tasks(projectId: $projectId, status: $status) {
-      id
-      title
-      description
-      status
-      assigneeEmail
-      dueDate
-      createdAt
+  query GetTasks($projectId: Int!, $status: String, $first: Int, $after: String) {
+    tasks(projectId: $projectId, status: $status, first: $first, after: $after) {
+      edges {
+        cursor
+        node {
+          id
+          title
+          description
+          status
+          assigneeEmail
+          dueDate
+          createdAt
+        }
+      }
+      pageInfo {
+        hasNextPage
+        endCursor
+      }
     }
   }
 `
 
 export const GET_TASK_COMMENTS = gql`
-  query GetTaskComments($taskId: Int!) {
-    taskComments(taskId: $taskId) {
-      id
-      content
-      authorEmail
-      createdAt
+  query GetTaskComments($taskId: Int!, $first: Int, $after: String) {
+    taskComments(taskId: $taskId, first: $first, after: $after) {
+      edges {
+        cursor
+        node {
+          id
+          content
+          authorEmail
+          createdAt
+        }
+      }
+      pageInfo {
+        hasNextPage
+        endCursor
+      }
     }
   }
 `
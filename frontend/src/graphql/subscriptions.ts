@@ -0,0 +1,30 @@
+import { gql } from '@apollo/client'
+
+export const TASK_EVENTS = gql`
+  subscription TaskEvents($projectId: Int!) {
+    taskEvents(projectId: $projectId) {
+      kind
+      taskId
+      task {
+        id
+        title
+        description
+        status
+        assigneeEmail
+        dueDate
+        createdAt
+      }
+    }
+  }
+`
+
+export const COMMENT_ADDED = gql`
+  subscription CommentAdded($taskId: Int!) {
+    commentAdded(taskId: $taskId) {
+      id
+      content
+      authorEmail
+      createdAt
+    }
+  }
+`
@@ -1,11 +1,38 @@
-import { ApolloClient, InMemoryCache, createHttpLink } from '@apollo/client'
+import { ApolloClient, InMemoryCache, split } from '@apollo/client'
+import { BatchHttpLink } from '@apollo/client/link/batch-http'
 import { setContext } from '@apollo/client/link/context'
+import { createPersistedQueryLink } from '@apollo/client/link/persisted-queries'
+import { GraphQLWsLink } from '@apollo/client/link/subscriptions'
+import { getMainDefinition, relayStylePagination } from '@apollo/client/utilities'
+import { createClient } from 'graphql-ws'
 
-const httpLink = createHttpLink({
-  uri: 'http://localhost:8000/graphql/',
+// The API is served from VITE_API_URL in production and from the page's own
+// origin otherwise (the Vite dev server proxies /graphql to Django).
+const graphqlUrl = new URL('/graphql/', import.meta.env.VITE_API_URL || window.location.origin)
+const graphqlWsUrl = new URL(graphqlUrl)
+graphqlWsUrl.protocol = graphqlUrl.protocol === 'https:' ? 'wss:' : 'ws:'
+
+// Operations started within batchInterval ms of each other (e.g. the
+// queries of a page) are sent as one POST; the server answers with an array
+// of results. batchMax stays within GRAPHQL_BATCH_MAX_OPERATIONS.
+const httpLink = new BatchHttpLink({
+  uri: graphqlUrl.href,
+  batchInterval: 10,
+  batchMax: 10,
 })
 
-const authLink = setContext((_, { headers }) => {
+// Send a SHA-256 of each query instead of its text; the server asks for the
+// full text only the first time it sees a hash.
+const sha256 = async (query: string) => {
+  const digest = await crypto.subtle.digest('SHA-256', new TextEncoder().encode(query))
+  return Array.from(new Uint8Array(digest))
+    .map((byte) => byte.toString(16).padStart(2, '0'))
+    .join('')
+}
+
+const persistedQueryLink = createPersistedQueryLink({ sha256 })
+
+const getOrganizationSlug = () => {
   // Get organization slug from localStorage
   // This will be updated by OrganizationContext whenever it changes
   let organizationSlug = localStorage.getItem('organization')
@@ -21,17 +48,66 @@ const authLink = setContext((_, { headers }) => {
     organizationSlug = 'acme-corp'
   }
   
+  return organizationSlug
+}
+
+const authLink = setContext((_, { headers }) => {
   return {
     headers: {
       ...headers,
-      'X-Organization-Slug': organizationSlug,
+      'X-Organization-Slug': getOrganizationSlug(),
     }
   }
 })
 
+// Subscriptions go over a WebSocket (graphql-transport-ws); the server
+// scopes them to the organization sent in the connection params. The socket
+// is only opened while a subscription is active, so pages without one (and
+// deployments without ASGI) never connect.
+const wsLink = new GraphQLWsLink(
+  createClient({
+    url: graphqlWsUrl.href,
+    lazy: true,
+    connectionParams: () => ({ organizationSlug: getOrganizationSlug() }),
+  })
+)
+
+const link = split(
+  ({ query }) => {
+    const definition = getMainDefinition(query)
+    return definition.kind === 'OperationDefinition' && definition.operation === 'subscription'
+  },
+  wsLink,
+  authLink.concat(persistedQueryLink).concat(httpLink)
+)
+
+// Connections are cached per filter set, and the pages loaded with
+// fetchMore({ variables: { after } }) are appended to the cached edges.
+const cache = new InMemoryCache({
+  typePolicies: {
+    Query: {
+      fields: {
+        projects: relayStylePagination(['organizationSlug', 'status']),
+        tasks: relayStylePagination([
+          'projectId',
+          'organizationSlug',
+          'projectIds',
+          'status',
+          'statuses',
+          'assigneeEmail',
+          'dueAfter',
+          'dueBefore',
+          'orderBy',
+        ]),
+        taskComments: relayStylePagination(['taskId']),
+      },
+    },
+  },
+})
+
 export const apolloClient = new ApolloClient({
-  link: authLink.concat(httpLink),
-  cache: new InMemoryCache(),
+  link,
+  cache,
   defaultOptions: {
     watchQuery: {
       fetchPolicy: 'cache-and-network',
@@ -1,21 +1,28 @@
 import React, { useState } from 'react'
 import { useQuery } from '@apollo/client'
-import { GET_PROJECTS, GET_PROJECT_STATISTICS } from '../graphql/queries'
+import { GET_PROJECTS, GET_PROJECT_STATISTICS, PAGE_SIZE } from '../graphql/queries'
 import ProjectCard from '../components/ProjectCard'
 import ProjectForm from '../components/ProjectForm'
 import { useOrganization } from '../context/OrganizationContext'
+import { Project } from '../types'
 
 const Dashboard: React.FC = () => {
   const [showProjectForm, setShowProjectForm] = useState(false)
   const [statusFilter, setStatusFilter] = useState<string>('')
+  const [loadingMore, setLoadingMore] = useState(false)
   const { organization } = useOrganization()
   
   const organizationSlug = organization?.slug || 'default-org'
 
-  const { data: projectsData, loading: projectsLoading, error: projectsError } = useQuery(
+  const {
+    data: projectsData,
+    loading: projectsLoading,
+    error: projectsError,
+    fetchMore,
+  } = useQuery(
     GET_PROJECTS,
     {
-      variables: { organizationSlug, status: statusFilter || null },
+      variables: { organizationSlug, status: statusFilter || null, first: PAGE_SIZE },
     }
   )
 
@@ -23,7 +30,7 @@ const Dashboard: React.FC = () => {
     variables: { organizationSlug },
   })
 
-  if (projectsLoading) {
+  if (projectsLoading && !projectsData) {
     return (
       <div className="flex items-center justify-center h-64">
         <div className="text-center">
@@ -53,9 +60,18 @@ const Dashboard: React.FC = () => {
     )
   }
 
-  const projects = projectsData?.projects || []
+  const projects = projectsData?.projects.edges.map((edge: { node: Project }) => edge.node) || []
+  const pageInfo = projectsData?.projects.pageInfo
   const stats = statsData?.projectStatistics
 
+  // The next page is appended to the cached list (see lib/apollo.ts)
+  const handleLoadMore = () => {
+    setLoadingMore(true)
+    fetchMore({
+      variables: { after: pageInfo.endCursor },
+    }).finally(() => setLoadingMore(false))
+  }
+
   return (
     <div>
       {/* Statistics Cards */}
@@ -162,6 +178,18 @@ const Dashboard: React.FC = () => {
         </div>
       )}
 
+      {pageInfo?.hasNextPage && (
+        <div className="flex justify-center mt-8">
+          <button
+            onClick={handleLoadMore}
+            disabled={loadingMore}
+            className="bg-white hover:bg-gray-50 text-gray-700 font-semibold py-2.5 px-6 border border-gray-300 rounded-lg shadow-sm transition disabled:opacity-50"
+          >
+            {loadingMore ? 'Loading...' : 'Load more projects'}
+          </button>
+        </div>
+      )}
+
       {/* Project Form Modal */}
       {showProjectForm && (
         <ProjectForm
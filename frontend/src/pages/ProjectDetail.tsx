@@ -1,11 +1,12 @@
-import React, { useState } from 'react'
+import React, { useEffect, useState } from 'react'
 import { useParams, useNavigate } from 'react-router-dom'
 import { useQuery, useMutation } from '@apollo/client'
-import { GET_PROJECT, GET_TASKS, GET_TASK_COMMENTS } from '../graphql/queries'
+import { GET_PROJECT, GET_TASKS, GET_TASK_COMMENTS, PAGE_SIZE } from '../graphql/queries'
 import { UPDATE_TASK, CREATE_TASK_COMMENT } from '../graphql/mutations'
+import { TASK_EVENTS, COMMENT_ADDED } from '../graphql/subscriptions'
 import TaskCard from '../components/TaskCard'
 import TaskForm from '../components/TaskForm'
-import { Task } from '../types'
+import { Task, TaskComment } from '../types'
 
 const ProjectDetail: React.FC = () => {
   const { id } = useParams<{ id: string }>()
@@ -14,6 +15,7 @@ const ProjectDetail: React.FC = () => {
   const [selectedTask, setSelectedTask] = useState<Task | null>(null)
   const [commentText, setCommentText] = useState('')
   const [authorEmail, setAuthorEmail] = useState('')
+  const [loadingMoreTasks, setLoadingMoreTasks] = useState(false)
 
   const projectId = parseInt(id || '0')
 
@@ -21,29 +23,89 @@ const ProjectDetail: React.FC = () => {
     variables: { id: projectId },
   })
 
-  const { data: tasksData, loading: tasksLoading } = useQuery(GET_TASKS, {
-    variables: { projectId },
+  const {
+    data: tasksData,
+    loading: tasksLoading,
+    subscribeToMore: subscribeToTasks,
+    fetchMore: fetchMoreTasks,
+  } = useQuery(GET_TASKS, {
+    variables: { projectId, first: PAGE_SIZE },
   })
 
-  const { data: commentsData } = useQuery(GET_TASK_COMMENTS, {
-    variables: { taskId: selectedTask?.id ? parseInt(selectedTask.id) : 0 },
-    skip: !selectedTask,
-  })
+  const selectedTaskId = selectedTask?.id ? parseInt(selectedTask.id) : 0
 
-  const [updateTask] = useMutation(UPDATE_TASK, {
-    refetchQueries: [{ query: GET_TASKS, variables: { projectId } }],
-  })
+  const {
+    data: commentsData,
+    subscribeToMore: subscribeToComments,
+    fetchMore: fetchMoreComments,
+  } = useQuery(
+    GET_TASK_COMMENTS,
+    {
+      variables: { taskId: selectedTaskId, first: PAGE_SIZE },
+      skip: !selectedTask,
+    }
+  )
+
+  // Apply task deltas pushed by the server instead of refetching the list
+  useEffect(
+    () =>
+      subscribeToTasks({
+        document: TASK_EVENTS,
+        variables: { projectId },
+        updateQuery: (prev, { subscriptionData }) => {
+          const event = subscriptionData.data?.taskEvents
+          if (!event || !prev.tasks) return prev
+          const edges = prev.tasks.edges.filter(
+            (edge: { node: Task }) => edge.node.id !== String(event.taskId)
+          )
+          if (event.kind === 'DELETED') {
+            return { ...prev, tasks: { ...prev.tasks, edges } }
+          }
+          const edge = { __typename: 'TaskEdge', cursor: null, node: event.task }
+          const index = prev.tasks.edges.findIndex(
+            (existing: { node: Task }) => existing.node.id === String(event.taskId)
+          )
+          if (index === -1) {
+            edges.unshift(edge)
+          } else {
+            edges.splice(index, 0, edge)
+          }
+          return { ...prev, tasks: { ...prev.tasks, edges } }
+        },
+      }),
+    [projectId, subscribeToTasks]
+  )
 
-  const [createComment] = useMutation(CREATE_TASK_COMMENT, {
-    refetchQueries: [
-      {
-        query: GET_TASK_COMMENTS,
-        variables: { taskId: selectedTask?.id ? parseInt(selectedTask.id) : 0 },
+  useEffect(() => {
+    if (!selectedTaskId) return
+    return subscribeToComments({
+      document: COMMENT_ADDED,
+      variables: { taskId: selectedTaskId },
+      updateQuery: (prev, { subscriptionData }) => {
+        const comment = subscriptionData.data?.commentAdded
+        if (!comment || !prev.taskComments) return prev
+        if (prev.taskComments.edges.some((edge: { node: TaskComment }) => edge.node.id === comment.id)) {
+          return prev
+        }
+        return {
+          ...prev,
+          taskComments: {
+            ...prev.taskComments,
+            edges: [
+              ...prev.taskComments.edges,
+              { __typename: 'TaskCommentEdge', cursor: null, node: comment },
+            ],
+          },
+        }
       },
-    ],
-  })
+    })
+  }, [selectedTaskId, subscribeToComments])
+
+  const [updateTask] = useMutation(UPDATE_TASK)
 
-  if (projectLoading || tasksLoading) {
+  const [createComment] = useMutation(CREATE_TASK_COMMENT)
+
+  if (projectLoading || (tasksLoading && !tasksData)) {
     return (
       <div className="flex items-center justify-center h-64">
         <div className="text-gray-500">Loading...</div>
@@ -52,8 +114,10 @@ const ProjectDetail: React.FC = () => {
   }
 
   const project = projectData?.project
-  const tasks = tasksData?.tasks || []
-  const comments = commentsData?.taskComments || []
+  const tasks = tasksData?.tasks.edges.map((edge: { node: Task }) => edge.node) || []
+  const comments = commentsData?.taskComments.edges.map((edge: { node: TaskComment }) => edge.node) || []
+  const tasksPageInfo = tasksData?.tasks.pageInfo
+  const commentsPageInfo = commentsData?.taskComments.pageInfo
 
   if (!project) {
     return (
@@ -72,6 +136,20 @@ const ProjectDetail: React.FC = () => {
     })
   }
 
+  // The next page is appended to the cached list (see lib/apollo.ts)
+  const handleLoadMoreTasks = () => {
+    setLoadingMoreTasks(true)
+    fetchMoreTasks({
+      variables: { after: tasksPageInfo.endCursor },
+    }).finally(() => setLoadingMoreTasks(false))
+  }
+
+  const handleLoadMoreComments = () => {
+    fetchMoreComments({
+      variables: { after: commentsPageInfo.endCursor },
+    })
+  }
+
   const handleAddComment = (e: React.FormEvent) => {
     e.preventDefault()
     if (selectedTask && commentText && authorEmail) {
@@ -151,6 +229,18 @@ const ProjectDetail: React.FC = () => {
         ))}
       </div>
 
+      {tasksPageInfo?.hasNextPage && (
+        <div className="flex justify-center mb-6">
+          <button
+            onClick={handleLoadMoreTasks}
+            disabled={loadingMoreTasks}
+            className="bg-white hover:bg-gray-100 text-gray-700 font-semibold py-2 px-4 border border-gray-300 rounded shadow disabled:opacity-50"
+          >
+            {loadingMoreTasks ? 'Loading...' : 'Load more tasks'}
+          </button>
+        </div>
+      )}
+
       {/* Task Detail Modal */}
       {selectedTask && (
         <div className="fixed inset-0 bg-gray-600 bg-opacity-50 overflow-y-auto h-full w-full flex items-center justify-center z-50">
@@ -211,6 +301,15 @@ const ProjectDetail: React.FC = () => {
                     <p className="text-sm">{comment.content}</p>
                   </div>
                 ))}
+                {commentsPageInfo?.hasNextPage && (
+                  <button
+                    type="button"
+                    onClick={handleLoadMoreComments}
+                    className="text-sm text-blue-500 hover:text-blue-700"
+                  >
+                    Load more comments
+                  </button>
+                )}
               </div>
 
               <form onSubmit={handleAddComment}>